@@ -0,0 +1,297 @@
+"""Benchmark suite: parse, the duplicate index, queue processing and LLMClient.
+
+    python benchmarks/run.py --sizes 1000,10000
+    python benchmarks/run.py --sizes 1000 --baseline benchmarks/results/baseline.json --threshold 0.2
+
+Synthetic codebases come from synthetic_repo.py; LLM calls go to
+llmstruct.stub_provider with the --latency distributions, so runs are offline
+and repeatable. Results are written as JSON (benchmarks/results/<timestamp>.json
+by default). With --baseline, every timing that got slower by more than
+--threshold fails the run (exit code 1).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_repo import generate_repo, touch_modules
+
+from llmstruct import LLMClient
+from llmstruct.dep_graph import DependencyGraph
+from llmstruct.incremental import IncrementalParser
+from llmstruct.modules.cli.parse import write_duplicate_index
+from llmstruct.modules.commands.queue import process_cli_queue_enhanced
+from llmstruct.stub_provider import StubProvider, parse_latency_specs
+from llmstruct.struct_io import read_struct, write_struct
+
+SUBSYSTEMS = ("parse", "duplicates", "queue", "llm_client", "semantic_cache", "suggest_index")
+RESULTS_DIR = Path(__file__).parent / "results"
+# Timings below this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.005
+
+
+def _percentiles(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_seconds": statistics.median(ordered),
+        "p95_seconds": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        "mean_seconds": statistics.fmean(ordered),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_parse(root: str) -> dict:
+    options = {
+        "include_patterns": ["*.py"], "exclude_patterns": [], "gitignore_patterns": [],
+        "include_ranges": True, "include_hashes": True, "goals": [], "exclude_dirs": [], "include_dirs": [],
+    }
+    output = os.path.join(root, "struct.json")
+    parser = IncrementalParser(root, output, options)
+    struct_data, full = _timed(parser.full_parse)
+    stats, write = _timed(write_struct, output, struct_data)
+    _, graph = _timed(DependencyGraph.from_struct, root, struct_data)
+    parser.save_fingerprints()
+    touch_modules(root, fraction=0.01)
+    (_, changed, _), incremental = _timed(parser.update)
+    write_struct(output, parser.struct_data)
+    return {
+        "full_seconds": full,
+        "write_seconds": write,
+        "graph_seconds": graph,
+        "incremental_seconds": incremental,
+        "incremental_modules": len(changed),
+        "struct_bytes": stats["bytes"],
+    }
+
+
+def bench_duplicates(root: str) -> dict:
+    """The duplicate index `parse` writes. analyze-duplicates itself needs
+    llmstruct.workflow_orchestrator, which this tree doesn't ship, so it isn't timed."""
+    struct_data = read_struct(os.path.join(root, "struct.json"))
+    _, seconds = _timed(write_duplicate_index, root, struct_data)
+    duplicates = json.loads(Path(root, ".llmstruct_index", "duplicates.json").read_text(encoding="utf-8"))
+    return {
+        "index_seconds": seconds,
+        "duplicate_groups": len(duplicates),
+        "duplicated_functions": sum(len(locations) for locations in duplicates.values()),
+    }
+
+
+async def bench_queue(root: str, stub: StubProvider, commands: int) -> dict:
+    workflow = [{
+        "workflow_id": "bench",
+        "description": "Benchmark workflow",
+        "commands": [
+            {"cmd": "llm", "prompt": f"Summarize module {i}", "model": f"model-{i % 2}"}
+            for i in range(commands)
+        ],
+    }]
+    Path(root, "data", "cli_queue.json").write_text(json.dumps(workflow), encoding="utf-8")
+    client = LLMClient()
+    stub.configure_client(client)
+    args = argparse.Namespace(mode="ollama", model=None, artifact_ids=[])
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, seconds = await _timed_async(
+                process_cli_queue_enhanced(root, os.path.join(root, "struct.json"), args, None, client)
+            )
+    finally:
+        await client.close()
+    expected = commands * stub.latency["ollama"].mean()
+    return {
+        "commands": commands,
+        "total_seconds": seconds,
+        "overhead_seconds": max(0.0, seconds - expected),
+    }
+
+
+async def _timed_async(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - start
+
+
+async def bench_llm_client(root: str, stub: StubProvider, requests: int, concurrency: int) -> dict:
+    context_path = os.path.join(root, "data", "init.json")
+    result = {}
+    for mode in ("grok", "anthropic", "ollama"):
+        client = LLMClient()
+        stub.configure_client(client)
+        try:
+            latencies = []
+            for i in range(requests):
+                _, seconds = await _timed_async(client.query(f"question {i}", context_path, mode=mode))
+                latencies.append(seconds)
+            entry = _percentiles(latencies)
+            entry["overhead_seconds"] = max(0.0, entry["mean_seconds"] - stub.latency[mode].mean())
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(i):
+                async with semaphore:
+                    return await client.query(f"parallel question {i}", context_path, mode=mode)
+
+            answers, seconds = await _timed_async(asyncio.gather(*(one(i) for i in range(requests))))
+            entry["concurrent_qps"] = requests / seconds
+            entry["errors"] = sum(1 for a in answers if not a)
+            result[mode] = entry
+        finally:
+            await client.close()
+    return result
+
+
+def bench_modules(name: str) -> dict:
+    if name == "semantic_cache":
+        from llmstruct.semantic_cache import benchmark
+        raw = benchmark(sizes=(1000,))
+        return {"precision": raw["precision"], "recall": raw["recall"],
+                "lookup_seconds": raw["latency"][1000]["avg_lookup_ms"] / 1000}
+    from llmstruct.suggest_index import benchmark
+    raw = benchmark(entries_per_layer=5000, queries=100)
+    return {
+        "build_seconds": raw["build_seconds"],
+        "cold_load_seconds": raw["cold_load_seconds"],
+        "typo_p95_seconds": raw["typo_ms"]["p95"] / 1000,
+        "prefix_p95_seconds": raw["prefix_ms"]["p95"] / 1000,
+    }
+
+
+async def run(args) -> dict:
+    subsystems = args.only.split(",") if args.only else SUBSYSTEMS
+    results = {}
+    stub = StubProvider(parse_latency_specs(args.latency), args.error_rate, seed=args.seed)
+    await stub.start()
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            with tempfile.TemporaryDirectory(prefix=f"llmstruct-bench-{size}-") as root:
+                counts, seconds = _timed(generate_repo, root, size, args.duplication, seed=args.seed)
+                print(f"Generated {counts['functions']} functions in {counts['modules']} modules ({seconds:.1f}s)")
+                entry = results.setdefault(str(size), {"repo": counts})
+                if {"parse", "duplicates"} & set(subsystems):
+                    entry["parse"] = bench_parse(root)
+                if "duplicates" in subsystems:
+                    entry["duplicates"] = bench_duplicates(root)
+                if "queue" in subsystems:
+                    entry["queue"] = await bench_queue(root, stub, args.requests)
+                if "llm_client" in subsystems:
+                    entry["llm_client"] = await bench_llm_client(root, stub, args.requests, args.concurrency)
+        for name in ("semantic_cache", "suggest_index"):
+            if name in subsystems:
+                results[name] = bench_modules(name)
+    finally:
+        await stub.stop()
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """[(metric, baseline, current, change)] for timings slower by more than threshold, and qps lower by it."""
+    regressions = []
+    old, new = flatten(baseline), flatten(current)
+    for metric, value in new.items():
+        previous = old.get(metric)
+        if not previous:
+            continue
+        if metric.endswith("_seconds"):
+            if max(previous, value) < MIN_COMPARABLE_SECONDS:
+                continue
+            change = value / previous - 1
+        elif metric.endswith("_qps"):
+            change = previous / value - 1 if value else float("inf")
+        else:
+            continue
+        if change > threshold:
+            regressions.append((metric, previous, value, change))
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run llmstruct benchmarks")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated function counts (1k-200k)")
+    parser.add_argument("--duplication", type=float, default=0.1, help="Fraction of duplicated functions")
+    parser.add_argument("--only", help=f"Comma-separated subsystems: {', '.join(SUBSYSTEMS)}")
+    parser.add_argument(
+        "--latency", action="append", default=None,
+        help="Stub latency spec in ms, optionally per provider: 'fixed:20' or 'ollama=lognormal:80:0.4'",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests that fail")
+    parser.add_argument("--requests", type=int, default=50, help="LLM requests per mode / queue commands")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent LLM requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    if args.latency is None:
+        args.latency = ["fixed:20"]
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    for metric, value in flatten(results).items():
+        if metric.endswith(("_seconds", "_qps")):
+            print(f"  {metric:<55} {value:.4f}")
+    print(f"✅ Results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", baseline), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions over {args.threshold:.0%}:")
+            for metric, previous, value, change in regressions:
+                print(f"  {metric}: {previous:.4f} -> {value:.4f} (+{change:.0%})")
+            return 1
+        print(f"✅ No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
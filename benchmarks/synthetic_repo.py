@@ -0,0 +1,121 @@
+"""Synthetic Python codebases for benchmarks.
+
+generate_repo() writes `functions` functions spread over packages and modules.
+Modules import a few earlier modules and call their functions, so struct.json
+gets a realistic import/call graph. A `duplication` fraction of functions
+copies the body of an earlier function: half keep the original name
+(same-name duplicates), half are renamed (found only by any-name analysis).
+"""
+
+import json
+import os
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = [
+    "parse", "load", "build", "merge", "index", "render", "query", "cache", "scan", "split",
+    "filter", "score", "select", "resolve", "update", "flush", "encode", "decode", "check", "emit",
+]
+OPERATIONS = [
+    "    total += {a} * {b}",
+    "    items.append(total % {a})",
+    "    if total > {b}:\n        total -= {a}",
+    "    for i in range({a}):\n        total += i",
+    "    value = {{'k{a}': total, 'v': {b}}}\n    items.append(value['v'])",
+    "    total = sum(items[-{a}:]) if items else total",
+]
+
+
+def _body(rng: random.Random, calls: List[str]) -> List[str]:
+    lines = ["    total = 0", "    items = []"]
+    for _ in range(rng.randint(3, 8)):
+        lines.append(rng.choice(OPERATIONS).format(a=rng.randint(2, 9), b=rng.randint(10, 99)))
+    for call in calls:
+        lines.append(f"    total += len(str({call}(total)))")
+    lines.append("    return total")
+    return lines
+
+
+def generate_repo(
+    root: str,
+    functions: int = 1000,
+    duplication: float = 0.1,
+    functions_per_module: int = 25,
+    modules_per_package: int = 20,
+    seed: int = 0,
+) -> dict:
+    """Write the codebase under root. Returns counts, including the duplicates planted."""
+    rng = random.Random(seed)
+    root_path = Path(root)
+    module_count = max(1, -(-functions // functions_per_module))
+    modules = []  # (dotted name, [function names])
+    bodies = []  # (name, body lines) of original functions, for duplication
+    same_name = renamed = 0
+    written = 0
+
+    for m in range(module_count):
+        package = f"pkg{m // modules_per_package}"
+        dotted = f"synth.{package}.mod{m}"
+        imports = rng.sample(modules, min(len(modules), rng.randint(1, 3))) if modules else []
+        lines = [f'"""Synthetic module {m}."""', ""]
+        for imported_name, imported_functions in imports:
+            lines.append(f"from {imported_name} import {imported_functions[0]}")
+        lines.append("")
+        names = []
+        for f in range(min(functions_per_module, functions - written)):
+            if bodies and rng.random() < duplication:
+                original_name, body = rng.choice(bodies)
+                if rng.random() < 0.5:
+                    name = original_name
+                    same_name += 1
+                else:
+                    name = f"{rng.choice(WORDS)}_{m}_{f}_copy"
+                    renamed += 1
+            else:
+                name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{m}_{f}"
+                calls = []
+                if names and rng.random() < 0.5:
+                    calls.append(rng.choice(names))
+                if imports and rng.random() < 0.3:
+                    calls.append(rng.choice(imports)[1][0])
+                body = _body(rng, calls)
+                bodies.append((name, body))
+            names.append(name)
+            lines.append("")
+            lines.append(f"def {name}(value=0):")
+            lines.append(f'    """{name.replace("_", " ")}."""')
+            lines.extend(body)
+            lines.append("")
+            written += 1
+        package_dir = root_path / "synth" / package
+        package_dir.mkdir(parents=True, exist_ok=True)
+        for init in (root_path / "synth" / "__init__.py", package_dir / "__init__.py"):
+            if not init.exists():
+                init.write_text("", encoding="utf-8")
+        (package_dir / f"mod{m}.py").write_text("\n".join(lines), encoding="utf-8")
+        modules.append((dotted, names))
+
+    # Small context file for LLM benchmarks (data/init.json is what queue/interactive prefer)
+    data_dir = root_path / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    init = {"project": "synthetic", "modules": [name for name, _ in modules[:50]]}
+    (data_dir / "init.json").write_text(json.dumps(init, indent=2), encoding="utf-8")
+
+    return {
+        "functions": written,
+        "modules": module_count,
+        "same_name_duplicates": same_name,
+        "renamed_duplicates": renamed,
+    }
+
+
+def touch_modules(root: str, fraction: float = 0.01, seed: int = 0) -> List[str]:
+    """Append a function to a fraction of modules (at least one). Returns their relative paths."""
+    rng = random.Random(seed)
+    paths = sorted(Path(root, "synth").rglob("mod*.py"))
+    touched = rng.sample(paths, max(1, int(len(paths) * fraction)))
+    for i, path in enumerate(touched):
+        with path.open("a", encoding="utf-8") as f:
+            f.write(f"\n\ndef touched_{i}(value=0):\n    return value + {i}\n")
+    return [os.path.relpath(p, root).replace(os.sep, "/") for p in touched]
@@ -51,12 +51,38 @@ from llmstruct.modules.cli.copilot import copilot
 from llmstruct.modules.cli.audit import audit
 from llmstruct.modules.cli.analyze_duplicates import analyze_duplicates
 from llmstruct.modules.cli import epic
+from llmstruct.modules.cli.daemon import daemon
+from llmstruct.modules.cli.queue import queue
+from llmstruct.modules.cli.deps import deps
+from llmstruct.modules.cli.loadtest import loadtest
+from llmstruct.modules.cli.log import log
+from llmstruct.daemon import forward_to_daemon
 
 def main():
     """Command-line interface for LLMstruct."""
     parser = argparse.ArgumentParser(
         description="Generate structured JSON for codebases and query LLMs"
     )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Run the command in this process even if a daemon is running",
+    )
+    parser.add_argument("--profile", action="store_true", help="Profile the command (see --profile-modes)")
+    parser.add_argument(
+        "--profile-modes",
+        metavar="MODES",
+        help="Profiler modes, implies --profile: comma-separated cpu, memory, async or 'all' (default: cpu)",
+    )
+    parser.add_argument(
+        "--profile-dir", default=".llmstruct_profile", help="Directory for profile reports"
+    )
+    parser.add_argument(
+        "--profile-top", type=int, default=30, help="Entries per section in the profile summary"
+    )
+    parser.add_argument(
+        "--profile-interval", type=float, default=5.0, help="Stack/task sampling interval in milliseconds"
+    )
     subparsers = parser.add_subparsers(
         dest="command", required=True, help="Available commands"
     )
@@ -99,6 +125,13 @@ def main():
     parse_parser.add_argument(
         "--include-hashes", action="store_true", help="Include file hashes"
     )
+    parse_parser.add_argument(
+        "--hash-algorithm", choices=["sha256", "blake2b", "xxh3_128", "blake3", "auto"],
+        help="Hash for --include-hashes (default: sha256; auto prefers xxhash/blake3 when installed)",
+    )
+    parse_parser.add_argument(
+        "--hash-workers", type=int, help="Threads hashing files for --include-hashes"
+    )
     parse_parser.add_argument("--goals", nargs="*", help="Custom project goals")
     parse_parser.add_argument(
         "--use-cache", action="store_true", help="Cache generated JSON"
@@ -108,17 +141,48 @@ def main():
         action="store_true",
         help="Save struct and AST index per file/module in .llmstruct_index/ (модульный индекс для ускоренного анализа)"
     )
+    parse_parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Write indented struct.json (default is compact)",
+    )
+    parse_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-parse only files changed since the previous run",
+    )
+    parse_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep struct.json and .llmstruct_index/ updated as files change (inotify, polling fallback)",
+    )
+    parse_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.3,
+        help="Seconds of quiet to wait before re-parsing a burst of changes",
+    )
+    parse_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Polling interval in seconds when inotify is unavailable",
+    )
 
     query_parser = subparsers.add_parser(
         "query", help="Query LLMs with prompt and context"
     )
-    query_parser.add_argument("--prompt", required=True, help="Prompt for LLM")
+    query_parser.add_argument("--prompt", help="Prompt for LLM (added after --template text if both are given)")
+    query_parser.add_argument("--template", help="Prompt template id from prompts_collection.json (e.g. PROMPT-001)")
+    query_parser.add_argument(
+        "--var", action="append", default=[], help="Template variable name=value (repeatable)"
+    )
     query_parser.add_argument(
         "--context", default="struct.json", help="Context JSON file"
     )
     query_parser.add_argument(
         "--mode",
-        choices=["grok", "anthropic", "ollama", "hybrid"],
+        choices=["grok", "anthropic", "ollama", "hybrid", "auto"],
         default="hybrid",
         help="LLM mode",
     )
@@ -141,6 +205,46 @@ def main():
         help="Output JSON file for LLM response",
     )
     query_parser.add_argument("--use-cache", action="store_true", help="Use JSON cache")
+    query_parser.add_argument(
+        "--write-files",
+        action="store_true",
+        help="Stream the response and write ```filename blocks to --write-dir as they complete",
+    )
+    query_parser.add_argument(
+        "--write-dir", default="./tmp", help="Directory for --write-files output"
+    )
+    query_parser.add_argument("--role", help="Role for rule selection (e.g. engineer, reviewer)")
+    query_parser.add_argument("--scope", help="Scope for rule selection (e.g. code, debug, test)")
+    query_parser.add_argument(
+        "--rule", action="append", help="Include a manual rule from rules_manifest.json by id (repeatable)"
+    )
+
+    interactive_parser = subparsers.add_parser(
+        "interactive", help="Interactive prompt; LLM queries run in the background"
+    )
+    interactive_parser.add_argument("root_dir", help="Root directory of the project")
+    interactive_parser.add_argument(
+        "--context", default="struct.json", help="Context JSON file"
+    )
+    interactive_parser.add_argument(
+        "--mode",
+        choices=["grok", "anthropic", "ollama", "hybrid", "auto"],
+        default="hybrid",
+        help="LLM mode",
+    )
+    interactive_parser.add_argument("--model", help="Ollama model (e.g., mixtral, llama3)")
+    interactive_parser.add_argument(
+        "--context-mode",
+        choices=["FULL", "FOCUSED", "MINIMAL", "SESSION"],
+        help="Default context mode for the modular interactive CLI",
+    )
+    interactive_parser.add_argument(
+        "--artifact-ids",
+        nargs="*",
+        default=[],
+        help="Artifact IDs to include in context",
+    )
+    interactive_parser.add_argument("--use-cache", action="store_true", help="Use JSON cache")
 
     context_parser = subparsers.add_parser(
         "context", help="Generate context.json from input JSON"
@@ -172,7 +276,7 @@ def main():
     )
     review_parser.add_argument(
         "--mode",
-        choices=["grok", "anthropic", "ollama", "hybrid"],
+        choices=["grok", "anthropic", "ollama", "hybrid", "auto"],
         default="hybrid",
         help="LLM mode",
     )
@@ -200,6 +304,9 @@ def main():
     )
     copilot_parser.add_argument("--layer", help="Layer name for load/unload commands")
     copilot_parser.add_argument("--query", help="Query for suggest command")
+    copilot_parser.add_argument(
+        "--limit", type=int, default=10, help="Number of suggestions for suggest command"
+    )
     copilot_parser.add_argument("--file-path", help="File path for validate command")
     copilot_parser.add_argument(
         "--change-type",
@@ -214,7 +321,7 @@ def main():
         help="Export format for export command",
     )
     copilot_parser.add_argument(
-        "--layers", help="Comma-separated list of layers for export command"
+        "--layers", help="Comma-separated list of layers for export/suggest commands"
     )
     copilot_parser.add_argument("--output", help="Output file for export command")
     copilot_parser.add_argument(
@@ -272,6 +379,122 @@ def main():
         help="Show ALL duplicates, including those only in archive/tests (by default только production-код)"
     )
 
+    queue_parser = subparsers.add_parser(
+        "queue", help="Run workflows from data/cli_queue.json"
+    )
+    queue_parser.add_argument("root_dir", help="Root directory of the project")
+    queue_parser.add_argument(
+        "--context", default="struct.json", help="Context JSON file"
+    )
+    queue_parser.add_argument(
+        "--mode",
+        choices=["grok", "anthropic", "ollama", "hybrid", "auto"],
+        default="hybrid",
+        help="LLM mode",
+    )
+    queue_parser.add_argument("--model", help="Ollama model (e.g., mixtral, llama3)")
+    queue_parser.add_argument(
+        "--artifact-ids",
+        nargs="*",
+        default=[],
+        help="Artifact IDs to include in context",
+    )
+    queue_parser.add_argument("--use-cache", action="store_true", help="Use JSON cache")
+
+    deps_parser = subparsers.add_parser(
+        "deps", help="Query the import/call graph: who depends on a file or function"
+    )
+    deps_parser.add_argument("target", help="File path, or path::function for the call graph")
+    deps_parser.add_argument(
+        "--root-dir", default=".", help="Root directory of the project"
+    )
+    deps_parser.add_argument("--struct", default="struct.json", help="struct.json to build the graph from")
+    deps_parser.add_argument(
+        "--forward", action="store_true", help="Show what the target depends on instead of its dependents"
+    )
+    deps_parser.add_argument(
+        "--transitive", action="store_true", help="Include indirect dependencies"
+    )
+    deps_parser.add_argument(
+        "--format", choices=["text", "json"], default="text", help="Output format"
+    )
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest", help="Drive LLMClient.query at a target rate or concurrency and report throughput/latency"
+    )
+    loadtest_parser.add_argument(
+        "--backends", default="ollama", help="Comma-separated modes to test: grok, anthropic, ollama, hybrid, auto"
+    )
+    load_group = loadtest_parser.add_mutually_exclusive_group()
+    load_group.add_argument("--rate", type=float, help="Open loop: requests started per second")
+    load_group.add_argument("--concurrency", type=int, help="Closed loop: requests kept in flight (default: 10)")
+    loadtest_parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load per backend")
+    loadtest_parser.add_argument(
+        "--max-in-flight", type=int, default=1000,
+        help="With --rate, requests beyond this many outstanding are dropped and counted as errors",
+    )
+    loadtest_parser.add_argument(
+        "--provider", choices=["real", "stub"], default="real",
+        help="'stub' serves fake Grok/Anthropic/Ollama endpoints in-process, fully offline",
+    )
+    loadtest_parser.add_argument(
+        "--latency", action="append",
+        help="Stub latency spec in ms, optionally per provider: 'lognormal:80:0.4' or 'ollama=uniform:20:40'",
+    )
+    loadtest_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests that fail")
+    loadtest_parser.add_argument("--prompt", default="Summarize the project structure", help="Prompt (made unique per request)")
+    loadtest_parser.add_argument("--context", default="struct.json", help="Context JSON file")
+    loadtest_parser.add_argument("--model", help="Ollama model (e.g., mixtral, llama3)")
+    loadtest_parser.add_argument(
+        "--retries", type=int, default=1, help="Attempts per request (LLMClient.retry_count)"
+    )
+    loadtest_parser.add_argument(
+        "--no-warmup", dest="warmup", action="store_false", help="Skip the untimed warm-up request"
+    )
+    loadtest_parser.add_argument("--output", help="Write the JSON report to this file")
+    loadtest_parser.add_argument(
+        "--format", choices=["text", "json"], default="text", help="Output format"
+    )
+
+    log_parser = subparsers.add_parser(
+        "log", help="Append-only event log, indexed by time and event type"
+    )
+    log_parser.add_argument(
+        "log_action", choices=["append", "query", "import", "stats"], help="Log action"
+    )
+    log_parser.add_argument(
+        "paths", nargs="*", help="For import: event_log/meta-log or worklog-style JSON files"
+    )
+    log_parser.add_argument(
+        "--root-dir", default=".", help="Root directory of the project"
+    )
+    log_parser.add_argument(
+        "--type", action="append", help="Event type (append); filter, repeatable (query)"
+    )
+    log_parser.add_argument(
+        "--field", action="append", help="Event data as name=value (append), repeatable"
+    )
+    log_parser.add_argument("--since", help="Start of the range: 30m, 2h, 7d or an ISO date/time")
+    log_parser.add_argument("--until", help="End of the range, same formats as --since")
+    log_parser.add_argument("--limit", type=int, help="Return at most this many events")
+    log_parser.add_argument(
+        "--format", choices=["text", "json"], default="text", help="Output format (query)"
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="Long-running daemon that keeps parsed state and LLM connections warm"
+    )
+    daemon_parser.add_argument(
+        "daemon_action", choices=["start", "stop", "status"], help="Daemon action"
+    )
+    daemon_parser.add_argument(
+        "root_dir", nargs="?", default=".", help="Root directory of the project"
+    )
+    daemon_parser.add_argument("--socket", help="Unix socket path (default: <root>/.llmstruct_daemon.sock)")
+    daemon_parser.add_argument(
+        "--background", action="store_true", help="Run in background"
+    )
+
     # Epic management
     epic.add_epic_cli_subparser(subparsers)
 
@@ -300,10 +523,38 @@ def main():
     if hasattr(args, "exclude_dir"):
         args.exclude_dir = normalize_patterns(args.exclude_dir)
 
+    profile_modes = None
+    if args.profile or args.profile_modes:
+        from llmstruct.profiling import parse_profile_modes
+        try:
+            profile_modes = parse_profile_modes(args.profile_modes or "cpu")
+        except ValueError as e:
+            parser.error(str(e))
+
+    # A profiled command has to run in this process
+    status = None if profile_modes else forward_to_daemon(args)
+    if status is not None:
+        if status:
+            sys.exit(status)
+        return
+
+    if profile_modes:
+        from llmstruct.profiling import profile_command
+        with profile_command(
+            args.command, profile_modes, args.profile_dir, args.profile_top, args.profile_interval / 1000
+        ):
+            run_command(args)
+    else:
+        run_command(args)
+
+def run_command(args):
+    """Dispatch a parsed command."""
     if args.command == "parse":
         parse(args)
     elif args.command == "query":
         asyncio.run(query(args))
+    elif args.command == "interactive":
+        asyncio.run(interactive(args))
     elif args.command == "context":
         context(args)
     elif args.command == "dogfood":
@@ -316,6 +567,16 @@ def main():
         audit(args)
     elif args.command == "analyze-duplicates":
         analyze_duplicates(args)
+    elif args.command == "queue":
+        asyncio.run(queue(args))
+    elif args.command == "loadtest":
+        asyncio.run(loadtest(args))
+    elif args.command == "deps":
+        deps(args)
+    elif args.command == "log":
+        log(args)
+    elif args.command == "daemon":
+        daemon(args)
 
 if __name__ == "__main__":
     main()
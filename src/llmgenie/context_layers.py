@@ -0,0 +1,246 @@
+"""Copilot context layer definitions and source reading.
+
+Layers come from `context_layers` in data/copilot_init.json, in the shape
+used by the context orchestration design:
+
+    {"context_layers": {"essential": {"priority": 1, "sources": ["struct.json"]}}}
+
+Without that file the four default layers below are used. ContextLayerManager
+loads layers lazily and unloads the least recently used ones when the
+`[copilot] max_context_tokens` / `max_context_bytes` budget is exceeded.
+Every copilot command reads layer data through it: suggest indexes layers
+from it, validate takes struct.json from the layer listing it, and export
+serializes it.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from llmstruct.retrieval import CHARS_PER_TOKEN
+from llmstruct.struct_io import loads
+
+try:
+    import yaml
+
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+COPILOT_CONFIG = Path("data") / "copilot_init.json"
+DEFAULT_LAYERS = {
+    "essential": {"priority": 1, "sources": ["struct.json", "data/init.json"]},
+    "structural": {"priority": 2, "sources": ["data/cli_enhanced.json", "schema/base_schema.json"]},
+    "operational": {"priority": 3, "sources": ["data/tasks.json", "data/cli_queue_enhanced.json"]},
+    "analytical": {"priority": 4, "sources": ["data/ideas.json", "data/prs.json", "docs.json"]},
+}
+
+# Layer managers per root, reused by long-lived processes (the daemon)
+_manager_cache: Dict[str, "ContextLayerManager"] = {}
+
+
+def load_layer_definitions(root_dir: str) -> Dict[str, dict]:
+    """Layer name -> {"priority", "sources", ...}."""
+    config_path = Path(root_dir) / COPILOT_CONFIG
+    if config_path.exists():
+        try:
+            with config_path.open("r", encoding="utf-8") as f:
+                layers = json.load(f).get("context_layers")
+            if isinstance(layers, dict) and layers:
+                return layers
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to read {config_path}: {e}, using default layers")
+    return DEFAULT_LAYERS
+
+
+def layer_sources(root_dir: str, definition: dict) -> List[Path]:
+    """Existing source files of a layer, in definition order."""
+    paths = []
+    for source in definition.get("sources", []):
+        path = Path(root_dir) / source
+        if path.is_file():
+            paths.append(path)
+    return paths
+
+
+def layer_signature(root_dir: str, definition: dict) -> List[list]:
+    """[[source, mtime_ns, size], ...]; changes whenever a source file changes."""
+    signature = []
+    for path in layer_sources(root_dir, definition):
+        stat = path.stat()
+        signature.append([path.relative_to(root_dir).as_posix(), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def read_source(path: Path) -> Optional[object]:
+    """Parsed JSON, or the text of any other file. None if unreadable."""
+    try:
+        if path.suffix == ".json":
+            with path.open("rb") as f:
+                return loads(f.read())
+        return path.read_text(encoding="utf-8")
+    except (OSError, ValueError, UnicodeDecodeError) as e:
+        logging.warning(f"Failed to read layer source {path}: {e}")
+        return None
+
+
+class ContextLayerManager:
+    """Loads copilot layers on first access and keeps them within a token/byte budget.
+
+    Layers are kept in least-recently-used order; loading one that pushes the
+    total over budget unloads the coldest others. Sizes are estimated from the
+    source files (about CHARS_PER_TOKEN bytes per token).
+    """
+
+    def __init__(self, root_dir: str, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.root_dir = str(Path(root_dir).absolute())
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.definitions = load_layer_definitions(self.root_dir)
+        self._loaded: "OrderedDict[str, dict]" = OrderedDict()  # name -> {"data", "signature", "bytes"}
+        self._stats: Dict[str, dict] = {}
+
+    def _layer_stats(self, name: str) -> dict:
+        return self._stats.setdefault(name, {"hits": 0, "misses": 0, "loads": 0, "evictions": 0})
+
+    @property
+    def loaded_layers(self) -> List[str]:
+        """Loaded layer names, least recently used first."""
+        return list(self._loaded)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(layer["bytes"] for layer in self._loaded.values())
+
+    @property
+    def used_tokens(self) -> int:
+        return self.used_bytes // CHARS_PER_TOKEN
+
+    def _over_budget(self) -> bool:
+        if self.max_bytes is not None and self.used_bytes > self.max_bytes:
+            return True
+        return self.max_tokens is not None and self.used_tokens > self.max_tokens
+
+    def _read_layer(self, name: str) -> dict:
+        definition = self.definitions[name]
+        data, size = {}, 0
+        for path in layer_sources(self.root_dir, definition):
+            content = read_source(path)
+            if content is not None:
+                data[path.relative_to(self.root_dir).as_posix()] = content
+                size += path.stat().st_size
+        self._layer_stats(name)["loads"] += 1
+        return {"data": data, "signature": layer_signature(self.root_dir, definition), "bytes": size}
+
+    def _enforce_budget(self, keep: str) -> None:
+        for name in list(self._loaded):
+            if not self._over_budget():
+                return
+            if name == keep:
+                continue
+            del self._loaded[name]
+            self._layer_stats(name)["evictions"] += 1
+            logging.info(f"Unloaded context layer {name} (over budget)")
+        if self._over_budget():
+            logging.warning(f"Context layer {keep} alone exceeds the copilot context budget")
+
+    def get_layer(self, name: str) -> Optional[Dict[str, object]]:
+        """Source path -> parsed content for a layer, loading it on first access."""
+        if name not in self.definitions:
+            return None
+        stats = self._layer_stats(name)
+        layer = self._loaded.get(name)
+        if layer is not None:
+            stats["hits"] += 1
+            self._loaded.move_to_end(name)
+            return layer["data"]
+        stats["misses"] += 1
+        layer = self._loaded[name] = self._read_layer(name)
+        self._enforce_budget(keep=name)
+        return layer["data"]
+
+    def source_layer(self, source: str) -> Optional[str]:
+        """Highest-priority layer listing `source` (a root-relative path)."""
+        names = sorted(self.definitions, key=lambda n: self.definitions[n].get("priority", 99))
+        return next((n for n in names if source in self.definitions[n].get("sources", [])), None)
+
+    def get_source(self, source: str) -> Optional[object]:
+        """Parsed content of one source file, read through the layer that lists it."""
+        name = self.source_layer(source)
+        if name is None:
+            return None
+        return self.get_layer(name).get(Path(source).as_posix())
+
+    def export_context(self, layers: Optional[List[str]] = None, format_type: str = "json") -> str:
+        """Layer name -> {source: content} for `layers` (default: all, by priority) as JSON or YAML."""
+        if layers is None:
+            layers = sorted(self.definitions, key=lambda n: self.definitions[n].get("priority", 99))
+        unknown = [name for name in layers if name not in self.definitions]
+        if unknown:
+            raise ValueError(f"Unknown context layer(s): {', '.join(unknown)}")
+        exported = {name: self.get_layer(name) for name in layers}
+        if format_type == "yaml":
+            if not YAML_AVAILABLE:
+                raise RuntimeError("PyYAML is not installed (pip install pyyaml)")
+            return yaml.safe_dump(exported, allow_unicode=True, sort_keys=False)
+        return json.dumps(exported, indent=2, ensure_ascii=False)
+
+    def load_context_layer(self, name: str) -> bool:
+        return self.get_layer(name) is not None
+
+    def unload_context_layer(self, name: str) -> bool:
+        return self._loaded.pop(name, None) is not None
+
+    def refresh_changed(self) -> List[str]:
+        """Reload loaded layers whose sources changed; drop layers no longer defined."""
+        self.definitions = load_layer_definitions(self.root_dir)
+        refreshed = []
+        for name in list(self._loaded):
+            if name not in self.definitions:
+                del self._loaded[name]
+                refreshed.append(name)
+            elif self._loaded[name]["signature"] != layer_signature(self.root_dir, self.definitions[name]):
+                self._loaded[name] = self._read_layer(name)
+                self._loaded.move_to_end(name)
+                refreshed.append(name)
+        if refreshed:
+            self._enforce_budget(keep=refreshed[-1])
+        return refreshed
+
+    def get_context_status(self) -> dict:
+        layers = {}
+        for name, definition in self.definitions.items():
+            loaded = self._loaded.get(name)
+            size = loaded["bytes"] if loaded else sum(p.stat().st_size for p in layer_sources(self.root_dir, definition))
+            layers[name] = {
+                "loaded": loaded is not None,
+                "bytes": size,
+                "tokens": size // CHARS_PER_TOKEN,
+                **self._layer_stats(name),
+            }
+        return {
+            "loaded_layers": self.loaded_layers,
+            "available_layers": list(self.definitions),
+            "used_tokens": self.used_tokens,
+            "max_tokens": self.max_tokens,
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+            "layers": layers,
+        }
+
+    def close(self) -> None:
+        self._loaded.clear()
+
+
+def get_layer_manager(root_dir: str, max_tokens: Optional[int] = None,
+                      max_bytes: Optional[int] = None) -> ContextLayerManager:
+    """Manager for a root, reused across calls in long-lived processes (the daemon)."""
+    key = str(Path(root_dir).absolute())
+    manager = _manager_cache.get(key)
+    if manager is None:
+        manager = _manager_cache[key] = ContextLayerManager(key, max_tokens, max_bytes)
+    else:
+        manager.max_tokens, manager.max_bytes = max_tokens, max_bytes
+    return manager
@@ -0,0 +1,281 @@
+"""LLMStruct daemon - keeps parsed state, caches and LLM sessions warm between CLI calls.
+
+Protocol: one JSON request line per Unix socket connection, one JSON response line back.
+
+Requests are served concurrently. Each one carries the caller's cwd, against
+which its path arguments are resolved, and gets its own output buffer: while
+the daemon runs, sys.stdout writes to the buffer of the request the current
+task (or its to_thread worker) belongs to, so commands keep using print().
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import io
+import json
+import logging
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from llmstruct import LLMClient
+from llmstruct.cache import JSONCache
+from llmstruct.modules.cli.utils import (
+    load_config, get_daemon_config, get_ollama_config, get_semantic_cache_config,
+    get_router_config, get_rules_config, get_context_config,
+)
+from llmstruct.modules.cli.parse import parse
+from llmstruct.modules.cli.query import query
+from llmstruct.modules.cli.queue import queue
+from llmstruct.modules.cli.analyze_duplicates import analyze_duplicates
+from llmstruct.modules.cli.deps import deps
+from llmstruct.modules.cli.copilot import copilot, create_layer_manager
+
+DEFAULT_SOCKET_NAME = ".llmstruct_daemon.sock"
+FORWARDED_COMMANDS = {"query", "parse", "analyze-duplicates", "queue", "copilot", "deps"}
+CONNECT_TIMEOUT = 0.2
+# Arguments naming files relative to the caller's working directory
+CWD_PATH_ARGS = ("root_dir", "output", "context", "write_dir", "save_report")
+
+# Output buffer of the request served by the current task/thread (None outside requests)
+_request_output: contextvars.ContextVar[Optional[io.StringIO]] = contextvars.ContextVar(
+    "request_output", default=None
+)
+
+
+class _RequestStdout(io.TextIOBase):
+    """sys.stdout of the daemon: writes go to the current request's buffer."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text: str) -> int:
+        return (_request_output.get() or self.fallback).write(text)
+
+    def flush(self) -> None:
+        if _request_output.get() is None:
+            self.fallback.flush()
+
+
+def resolve_request_args(args: argparse.Namespace, cwd: str) -> argparse.Namespace:
+    """Make the caller's relative paths absolute; commands without --root-dir get the caller's cwd."""
+    for name in CWD_PATH_ARGS:
+        value = getattr(args, name, None)
+        if isinstance(value, str) and value:
+            setattr(args, name, os.path.normpath(os.path.join(cwd, value)))
+    if getattr(args, "root_dir", None) is None:
+        args.root_dir = cwd
+    return args
+
+
+def get_socket_path(root_dir: str = ".", config: Optional[dict] = None) -> str:
+    """Resolve the daemon socket: LLMSTRUCT_DAEMON_SOCKET, [daemon] socket, or default."""
+    env_socket = os.getenv("LLMSTRUCT_DAEMON_SOCKET")
+    if env_socket:
+        return env_socket
+    if config is None:
+        config = load_config(root_dir)
+    socket_name = get_daemon_config(config).get("socket", DEFAULT_SOCKET_NAME)
+    return str(Path(root_dir).absolute() / socket_name)
+
+
+class LLMStructDaemon:
+    """Serves forwarded CLI commands with a shared LLMClient, cache and parse state."""
+
+    def __init__(self, root_dir: str, socket_path: Optional[str] = None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.config = load_config(self.root_dir)
+        self.socket_path = socket_path or get_socket_path(self.root_dir, self.config)
+        self.client = LLMClient()
+        self.client.ollama_pool.configure(get_ollama_config(self.config))
+        self.client.configure_semantic_cache(get_semantic_cache_config(self.config))
+        self.client.configure_router(get_router_config(self.config))
+        self.client.configure_rules(get_rules_config(self.config), self.root_dir)
+        self.client.configure_context(get_context_config(self.config))
+        self.cache = None
+        self.parsers = {}
+        self.started_at = time.time()
+        self.requests_served = 0
+        # parse shares IncrementalParser state per root, so parses of one root run one at a time
+        self._parse_locks = {}
+        # copilot subcommands share one ContextLayerManager per root, so they run one at a time too
+        self._copilot_locks = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _get_cache(self) -> JSONCache:
+        if self.cache is None:
+            self.cache = JSONCache()
+        return self.cache
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "root_dir": self.root_dir,
+            "uptime": time.time() - self.started_at,
+            "requests_served": self.requests_served,
+            "parse_states": len(self.parsers),
+            "cached_contexts": len(self.client._context_cache),
+            "ollama_models": self.client.ollama_pool.stats(),
+            "ollama_hosts": self.client.ollama_pool.host_stats(),
+            "prefix_cache": self.client.prefix_cache.stats(),
+            "semantic_cache": self.client.semantic_cache.stats() if self.client.semantic_cache else None,
+            "coalescing": self.client.single_flight.stats(),
+            "router": self.client.router.stats_dict(),
+        }
+
+    async def serve(self) -> None:
+        """Listen on the Unix socket until a shutdown request arrives."""
+        if os.path.exists(self.socket_path):
+            if ping(self.socket_path) is not None:
+                logging.error(f"Daemon already running on {self.socket_path}")
+                return
+            os.unlink(self.socket_path)
+        self._stopping = asyncio.Event()
+        real_stdout = sys.stdout
+        sys.stdout = _RequestStdout(real_stdout)
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        logging.info(f"LLMStruct daemon listening on {self.socket_path}")
+        warm_up = None
+        if self.client.ollama_pool.preload_models:
+            warm_up = asyncio.create_task(self.client.ollama_pool.preload())
+        try:
+            await self._stopping.wait()
+        finally:
+            if warm_up is not None:
+                warm_up.cancel()
+            server.close()
+            await server.wait_closed()
+            await self.client.close()
+            if self.cache is not None:
+                self.cache.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+            sys.stdout = real_stdout
+            logging.info("LLMStruct daemon stopped")
+
+    async def _handle_connection(self, reader, writer) -> None:
+        try:
+            request = json.loads(await reader.readline())
+            response = await self.dispatch(request)
+        except Exception as e:
+            logging.error(f"Daemon request failed: {e}")
+            response = {"ok": False, "error": str(e)}
+        writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        with contextlib.suppress(ConnectionError):
+            await writer.drain()
+        writer.close()
+
+    async def dispatch(self, request: dict) -> dict:
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "status": self.status()}
+        if command == "shutdown":
+            self._stopping.set()
+            return {"ok": True, "output": "🛑 Daemon stopping\n"}
+        if command not in FORWARDED_COMMANDS:
+            return {"ok": False, "error": f"Unsupported command: {command}"}
+
+        args = resolve_request_args(
+            argparse.Namespace(**request.get("args", {})), request.get("cwd") or self.root_dir
+        )
+        buffer = io.StringIO()
+        # Set in this connection's task; to_thread() workers inherit it
+        _request_output.set(buffer)
+        try:
+            await self._run_command(command, args)
+        except Exception as e:
+            return {"ok": False, "output": buffer.getvalue(), "error": str(e)}
+        finally:
+            _request_output.set(None)
+            self.requests_served += 1
+        return {"ok": True, "output": buffer.getvalue()}
+
+    async def _run_command(self, command: str, args: argparse.Namespace) -> None:
+        if command == "query":
+            await query(args, client=self.client)
+        elif command == "parse":
+            lock = self._parse_locks.setdefault(os.path.abspath(args.root_dir), asyncio.Lock())
+            async with lock:
+                await asyncio.to_thread(parse, args, self.parsers)
+        elif command == "analyze-duplicates":
+            await asyncio.to_thread(analyze_duplicates, args)
+        elif command == "queue":
+            cache = self._get_cache() if getattr(args, "use_cache", False) else None
+            await queue(args, client=self.client, cache=cache)
+        elif command == "copilot":
+            # The manager lives in _manager_cache, so loaded layers persist between requests
+            lock = self._copilot_locks.setdefault(os.path.abspath(args.root_dir), asyncio.Lock())
+            async with lock:
+                await asyncio.to_thread(copilot, args, layer_manager=create_layer_manager(args.root_dir))
+        elif command == "deps":
+            # A stale graph is rebuilt from struct.json here
+            await asyncio.to_thread(deps, args)
+
+
+def send_request(socket_path: str, request: dict, timeout: Optional[float] = None) -> Optional[dict]:
+    """Send one request to the daemon. Returns None if no daemon is reachable."""
+    if not os.path.exists(socket_path):
+        return None
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.settimeout(timeout)
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError as e:
+        logging.debug(f"Daemon not reachable at {socket_path}: {e}")
+        return None
+    data = b"".join(chunks)
+    return json.loads(data) if data else None
+
+
+def ping(socket_path: str) -> Optional[dict]:
+    """Return daemon status, or None if it is not running."""
+    response = send_request(socket_path, {"command": "ping"}, timeout=2)
+    if response and response.get("ok"):
+        return response.get("status")
+    return None
+
+
+def _serializable_args(args: argparse.Namespace) -> dict:
+    result = {}
+    for key, value in vars(args).items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        result[key] = value
+    return result
+
+
+def forward_to_daemon(args: argparse.Namespace) -> Optional[int]:
+    """Run the command in a running daemon and return its exit status. None to run it locally instead."""
+    if args.command not in FORWARDED_COMMANDS or getattr(args, "no_daemon", False):
+        return None
+    if getattr(args, "watch", False):
+        return None
+    socket_path = get_socket_path(os.getcwd())
+    request = {
+        "command": args.command,
+        "cwd": os.getcwd(),
+        "args": _serializable_args(args),
+    }
+    response = send_request(socket_path, request)
+    if response is None:
+        return None
+    if response.get("output"):
+        print(response["output"], end="")
+    if not response.get("ok"):
+        logging.error(f"Daemon command failed: {response.get('error')}")
+        return 1
+    return 0
@@ -0,0 +1,297 @@
+"""Module import graph and function call graph derived from struct.json.
+
+Both graphs are stored with their reverse adjacency precomputed in
+.llmstruct_index/graph.json, so "who depends on X" is a dictionary lookup.
+Transitive closures are computed on first use and cached for the lifetime
+of the loaded graph version.
+
+Nodes are root-relative module paths ("src/pkg/mod.py") and functions
+("src/pkg/mod.py::name", methods "src/pkg/mod.py::Class.name").
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from llmstruct.incremental import INDEX_DIR, module_key
+from llmstruct.struct_io import read_struct, write_struct
+
+GRAPH_FILE = "graph.json"
+GRAPH_VERSION = 1
+MODULES = "modules"
+FUNCTIONS = "functions"
+
+# Loaded graphs per root, reused by long-lived processes (the daemon)
+_graph_cache: Dict[str, "DependencyGraph"] = {}
+
+
+def _dotted_name(path: str) -> str:
+    parts = list(Path(path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _module_resolver(paths: Iterable[str]):
+    """Map an import name to a module path by the longest unambiguous dotted suffix.
+
+    Import names and file paths rarely share a prefix (src/ layouts, packages
+    installed under another name), so suffixes are matched instead.
+    """
+    by_suffix: Dict[str, List[str]] = {}
+    for path in paths:
+        parts = _dotted_name(path).split(".")
+        for i in range(len(parts)):
+            by_suffix.setdefault(".".join(parts[i:]), []).append(path)
+
+    def resolve(name: str) -> Optional[str]:
+        parts = name.lstrip(".").split(".")
+        for i in range(len(parts)):
+            candidates = by_suffix.get(".".join(parts[i:]))
+            if candidates:
+                return candidates[0] if len(candidates) == 1 else None
+        return None
+
+    return resolve
+
+
+def _module_functions(path: str, module: dict) -> Dict[str, str]:
+    """Callable name -> node id for functions and methods defined in a module."""
+    names = {}
+    for class_info in module.get("classes", []):
+        for method in class_info.get("methods", []):
+            node = f"{path}::{class_info.get('name')}.{method.get('name')}"
+            names[f"{class_info.get('name')}.{method.get('name')}"] = node
+            names.setdefault(method.get("name"), node)
+    # Top-level functions win over methods of the same name
+    for func in module.get("functions", []):
+        names[func.get("name")] = f"{path}::{func.get('name')}"
+    return names
+
+
+def _reverse(adjacency: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    reverse: Dict[str, List[str]] = {}
+    for source, targets in adjacency.items():
+        for target in targets:
+            reverse.setdefault(target, []).append(source)
+    return {node: sorted(sources) for node, sources in reverse.items()}
+
+
+def struct_version(struct_data: dict) -> str:
+    """Digest of module paths and hashes; changes whenever struct.json content does."""
+    digest = hashlib.sha1()
+    for module in struct_data.get("modules", []):
+        digest.update(module.get("path", "").encode("utf-8"))
+        content = module.get("hash") or (module.get("dependencies"), module.get("callgraph"))
+        digest.update(str(content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DependencyGraph:
+    """Forward and reverse adjacency of the import and call graphs."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.path = Path(root_dir) / INDEX_DIR / GRAPH_FILE
+        self.version: Optional[str] = None
+        self.forward: Dict[str, Dict[str, List[str]]] = {MODULES: {}, FUNCTIONS: {}}
+        self.reverse: Dict[str, Dict[str, List[str]]] = {MODULES: {}, FUNCTIONS: {}}
+        self._closures: Dict[Tuple[str, bool, str], List[str]] = {}
+        self.mtime: Optional[int] = None  # graph.json mtime this instance matches
+
+    @classmethod
+    def from_struct(cls, root_dir: str, struct_data: dict) -> "DependencyGraph":
+        graph = cls(root_dir)
+        modules = {
+            module_key(root_dir, module.get("path", "")): module
+            for module in struct_data.get("modules", [])
+        }
+        resolve = _module_resolver(modules)
+        defined = {path: _module_functions(path, module) for path, module in modules.items()}
+
+        imports: Dict[str, List[str]] = {}
+        for path, module in modules.items():
+            targets = {resolve(name) for name in module.get("dependencies") or []}
+            targets.discard(None)
+            targets.discard(path)
+            imports[path] = sorted(targets)
+
+        by_name: Dict[str, List[Tuple[str, str]]] = {}
+        for path, names in defined.items():
+            for name, node in names.items():
+                by_name.setdefault(name, []).append((path, node))
+
+        calls: Dict[str, List[str]] = {}
+        for path, module in modules.items():
+            local = defined[path]
+            imported = set(imports[path])
+            for caller, callees in (module.get("callgraph") or {}).items():
+                targets = set()
+                for callee in callees:
+                    if callee in local:
+                        targets.add(local[callee])
+                        continue
+                    # Otherwise the callee must come from a module this one imports
+                    for owner, node in by_name.get(callee, ()):
+                        if owner in imported:
+                            targets.add(node)
+                caller_node = local.get(caller, f"{path}::{caller}")
+                targets.discard(caller_node)
+                calls[caller_node] = sorted(targets)
+
+        graph.version = struct_version(struct_data)
+        graph.forward = {MODULES: imports, FUNCTIONS: calls}
+        graph.reverse = {MODULES: _reverse(imports), FUNCTIONS: _reverse(calls)}
+        return graph
+
+    def load(self) -> bool:
+        try:
+            data = read_struct(self.path)
+        except (OSError, ValueError):
+            return False
+        if data.get("graph_version") != GRAPH_VERSION:
+            return False
+        self.version = data.get("version")
+        self.forward = data["forward"]
+        self.reverse = data["reverse"]
+        self._closures.clear()
+        self.mtime = _mtime_ns(self.path)
+        return True
+
+    def save(self) -> None:
+        write_struct(
+            self.path,
+            {
+                "graph_version": GRAPH_VERSION,
+                "version": self.version,
+                "forward": self.forward,
+                "reverse": self.reverse,
+            },
+            index=False,
+        )
+        self.mtime = _mtime_ns(self.path)
+
+    def _closure(self, kind: str, reverse: bool, node: str) -> List[str]:
+        key = (kind, reverse, node)
+        cached = self._closures.get(key)
+        if cached is not None:
+            return cached
+        adjacency = (self.reverse if reverse else self.forward)[kind]
+        seen = {node}
+        stack = [node]
+        while stack:
+            for neighbour in adjacency.get(stack.pop(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        seen.discard(node)
+        result = self._closures[key] = sorted(seen)
+        return result
+
+    def dependents(self, node: str, kind: str = MODULES, transitive: bool = False) -> List[str]:
+        """Modules importing (or functions calling) node."""
+        if transitive:
+            return self._closure(kind, True, node)
+        return self.reverse[kind].get(node, [])
+
+    def dependencies(self, node: str, kind: str = MODULES, transitive: bool = False) -> List[str]:
+        """Modules imported (or functions called) by node."""
+        if transitive:
+            return self._closure(kind, False, node)
+        return self.forward[kind].get(node, [])
+
+    def has_module(self, path: str) -> bool:
+        return path in self.forward[MODULES]
+
+    def functions_of(self, path: str) -> List[str]:
+        prefix = f"{path}::"
+        nodes = set(n for n in self.forward[FUNCTIONS] if n.startswith(prefix))
+        nodes.update(n for n in self.reverse[FUNCTIONS] if n.startswith(prefix))
+        return sorted(nodes)
+
+    def node_key(self, target: str) -> Tuple[str, str]:
+        """(kind, node) for a file path or "path::function" target."""
+        path, sep, name = target.partition("::")
+        path = module_key(self.root_dir, path)
+        if sep:
+            return FUNCTIONS, f"{path}::{name}"
+        return MODULES, path
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_graph(
+    root_dir: str, struct_path: str = "struct.json", load_struct: Optional[Callable[[], Optional[dict]]] = None
+) -> Optional[DependencyGraph]:
+    """Load (or reuse) the graph for root_dir; rebuilt when struct.json is newer. None without either.
+
+    load_struct, if given, supplies the struct data for a rebuild (e.g. from a copilot layer).
+    """
+    key = os.path.abspath(root_dir)
+    struct_file = Path(key, struct_path)
+    struct_mtime = _mtime_ns(struct_file)
+    graph_mtime = _mtime_ns(Path(key) / INDEX_DIR / GRAPH_FILE)
+    stale = struct_mtime is not None and (graph_mtime is None or struct_mtime > graph_mtime)
+    graph = _graph_cache.get(key)
+    if graph is not None and not stale and graph.mtime == graph_mtime:
+        return graph
+    graph = DependencyGraph(key)
+    if stale or not graph.load():
+        if struct_mtime is None:
+            return None
+        struct_data = load_struct() if load_struct is not None else None
+        graph = DependencyGraph.from_struct(key, struct_data if struct_data is not None else read_struct(struct_file))
+        graph.save()
+        logging.info(f"Dependency graph rebuilt from {struct_file}")
+    _graph_cache[key] = graph
+    return graph
+
+
+def write_graph_index(root_dir: str, struct_data: dict) -> DependencyGraph:
+    """Build and save the graph for freshly generated struct data."""
+    graph = DependencyGraph.from_struct(root_dir, struct_data)
+    graph.save()
+    _graph_cache[os.path.abspath(root_dir)] = graph
+    return graph
+
+
+def validate_change(graph: DependencyGraph, file_path: str, change_type: str = "edit") -> dict:
+    """Impact of editing, deleting or adding a file: {"valid", "warnings", "errors", "dependents"}."""
+    _, path = graph.node_key(file_path.partition("::")[0])
+    result = {"valid": True, "warnings": [], "errors": [], "dependents": []}
+    if change_type == "add":
+        if graph.has_module(path):
+            result["warnings"].append(f"{path} already exists in struct.json")
+        return result
+    if not graph.has_module(path):
+        result["warnings"].append(f"{path} is not in struct.json; no dependency information")
+        return result
+
+    direct = graph.dependents(path)
+    transitive = graph.dependents(path, transitive=True)
+    result["dependents"] = transitive
+    callers = set()
+    for func in graph.functions_of(path):
+        callers.update(c for c in graph.dependents(func, FUNCTIONS) if not c.startswith(f"{path}::"))
+
+    if change_type == "delete":
+        for dependent in direct:
+            result["errors"].append(f"{dependent} imports {path}")
+        for caller in sorted(callers):
+            result["errors"].append(f"{caller} calls into {path}")
+        result["valid"] = not result["errors"]
+    elif direct or callers:
+        result["warnings"].append(
+            f"{len(direct)} modules import {path} directly, {len(transitive)} transitively; "
+            f"{len(callers)} external functions call into it"
+        )
+        for dependent in direct:
+            result["warnings"].append(f"imported by {dependent}")
+    return result
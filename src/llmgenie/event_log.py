@@ -0,0 +1,406 @@
+"""Append-only event log: JSONL segments with a binary sidecar index.
+
+Layout under `event_log/events/`:
+
+    segment-000001.jsonl   one JSON event per line
+    segment-000001.idx     one fixed-size record per event: timestamp,
+                           byte offset of the line, crc32 of the event type
+    segments.json          summary of sealed segments (time range, counts per type)
+    CURRENT                number of the segment being appended to
+    LOCK                   flock()ed by writers
+
+An append writes one line and one index record under an exclusive lock, so it
+costs the same however long the history is; when the segment passes
+`max_segment_bytes` it is sealed (summarized into segments.json) and a new one
+started. Timestamps never go backwards within a segment, so a query skips
+segments by their time range and types, bisects the index of the rest for
+`since`, and reads only the lines whose type matches. Readers take no lock:
+the line is written before its index record, and a torn trailing record is
+ignored until the next writer truncates it.
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # No flock() (Windows): a single writer process is assumed
+    fcntl = None
+
+LOG_DIR = "event_log/events"
+MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+INDEX_RECORD = struct.Struct("<dQI")
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# Index records read per chunk while scanning a segment
+SCAN_CHUNK = 4096
+RELATIVE_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+META_LOG_RE = re.compile(r"^\[(\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}(?::\d{2})?)?)\]\s*([^:]+):\s*(.*)$")
+
+# Logs per directory, reused by long-lived processes (the daemon)
+_log_cache: Dict[str, "EventLog"] = {}
+
+
+def type_hash(event_type: str) -> int:
+    return zlib.crc32(event_type.encode("utf-8"))
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """'30m', '2h', '7d', '1w' ago, or an ISO date/datetime (local time unless it has an offset)."""
+    value = value.strip()
+    match = RELATIVE_RE.match(value)
+    if match:
+        return (now if now is not None else time.time()) - float(match.group(1)) * UNITS[match.group(2)]
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time '{value}': use e.g. 30m, 2h, 7d or 2025-06-01T12:00")
+    return parsed.timestamp()
+
+
+class Segment:
+    """One segment's files and, once sealed, its summary."""
+
+    def __init__(self, directory: Path, number: int, summary: Optional[dict] = None):
+        self.number = number
+        self.data_path = directory / f"segment-{number:06d}.jsonl"
+        self.index_path = directory / f"segment-{number:06d}.idx"
+        self.summary = summary
+
+    def records(self) -> int:
+        try:
+            return self.index_path.stat().st_size // INDEX_RECORD.size
+        except OSError:
+            return 0
+
+    def summarize(self) -> dict:
+        """Time range and counts per type, from a full read (done once, when sealing)."""
+        types: Dict[str, int] = {}
+        first = last = None
+        with self.index_path.open("rb") as index, self.data_path.open("rb") as data:
+            for ts, offset, _ in self._iter_index(index, 0):
+                data.seek(offset)
+                event_type = json.loads(data.readline()).get("type", "")
+                types[event_type] = types.get(event_type, 0) + 1
+                first = ts if first is None else first
+                last = ts
+        return {"segment": self.number, "first_ts": first, "last_ts": last,
+                "events": sum(types.values()), "types": types}
+
+    def overlaps(self, since: Optional[float], until: Optional[float], types: Optional[set]) -> bool:
+        s = self.summary
+        if s is None:  # The active segment
+            return True
+        if not s["events"]:
+            return False
+        if since is not None and s["last_ts"] < since:
+            return False
+        if until is not None and s["first_ts"] > until:
+            return False
+        return types is None or not types.isdisjoint(s["types"])
+
+    def _iter_index(self, index, start: int) -> Iterator[Tuple[float, int, int]]:
+        count = os.fstat(index.fileno()).st_size // INDEX_RECORD.size
+        position = start
+        while position < count:
+            index.seek(position * INDEX_RECORD.size)
+            chunk = index.read(min(SCAN_CHUNK, count - position) * INDEX_RECORD.size)
+            yield from INDEX_RECORD.iter_unpack(chunk)
+            position += len(chunk) // INDEX_RECORD.size
+
+    def _lower_bound(self, index, since: float) -> int:
+        lo, hi = 0, os.fstat(index.fileno()).st_size // INDEX_RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            index.seek(mid * INDEX_RECORD.size)
+            if INDEX_RECORD.unpack(index.read(INDEX_RECORD.size))[0] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, since: Optional[float], until: Optional[float], types: Optional[set]) -> Iterator[Tuple[float, dict]]:
+        hashes = {type_hash(t) for t in types} if types is not None else None
+        try:
+            index, data = self.index_path.open("rb"), self.data_path.open("rb")
+        except FileNotFoundError:
+            return
+        with index, data:
+            start = self._lower_bound(index, since) if since is not None else 0
+            for ts, offset, event_hash in self._iter_index(index, start):
+                if until is not None and ts > until:
+                    return
+                if hashes is not None and event_hash not in hashes:
+                    continue
+                data.seek(offset)
+                event = json.loads(data.readline())
+                # crc32 can collide; the line itself is authoritative
+                if types is None or event.get("type") in types:
+                    yield ts, event
+
+
+class EventLog:
+    """Segmented, indexed JSONL log in one directory."""
+
+    def __init__(self, directory: str, max_segment_bytes: int = MAX_SEGMENT_BYTES):
+        self.dir = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+        # (segment number, data file, index file) kept open between appends
+        self._open: Optional[Tuple[int, object, object]] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.dir / "segments.json"
+
+    def _read_current(self) -> int:
+        try:
+            return int((self.dir / "CURRENT").read_text().strip() or 1)
+        except (OSError, ValueError):
+            return 1
+
+    def _read_manifest(self) -> List[dict]:
+        try:
+            with self.manifest_path.open("r", encoding="utf-8") as f:
+                return json.load(f).get("segments", [])
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read event log manifest {self.manifest_path}: {e}")
+            return []
+
+    def _write_atomic(self, path: Path, text: str) -> None:
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _acquire(self) -> None:
+        if self._lock_depth == 0:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self.dir / "LOCK", os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        self._lock_depth += 1
+
+    def _release(self) -> None:
+        self._lock_depth -= 1
+        if self._lock_depth == 0 and fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _active_files(self) -> Tuple[int, object, object]:
+        """Open (or reuse) the current segment and repair a torn tail left by a crashed writer."""
+        number = self._read_current()
+        if self._open is not None and self._open[0] == number:
+            return self._open
+        self.close_files()
+        segment = Segment(self.dir, number)
+        data = segment.data_path.open("ab")
+        index = segment.index_path.open("a+b")
+        index_size = os.fstat(index.fileno()).st_size
+        if index_size % INDEX_RECORD.size:
+            index.truncate(index_size - index_size % INDEX_RECORD.size)
+        if os.fstat(data.fileno()).st_size:
+            with segment.data_path.open("rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data.write(b"\n")
+                    data.flush()
+        self._open = (number, data, index)
+        return self._open
+
+    def _last_ts(self, index) -> float:
+        size = os.fstat(index.fileno()).st_size
+        if size < INDEX_RECORD.size:
+            return 0.0
+        return INDEX_RECORD.unpack(os.pread(index.fileno(), INDEX_RECORD.size, size - INDEX_RECORD.size))[0]
+
+    def _write(self, data, index, ts: float, event_type: str, fields: Optional[dict]) -> dict:
+        stamp = datetime.fromtimestamp(ts, timezone.utc)
+        # Index the microsecond value the line shows, so `--since <a logged ts>` includes that event
+        ts = stamp.timestamp()
+        event = {"ts": stamp.strftime(TS_FORMAT), "type": event_type, "data": fields or {}}
+        offset = os.fstat(data.fileno()).st_size
+        data.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+        data.flush()
+        index.write(INDEX_RECORD.pack(ts, offset, type_hash(event_type)))
+        index.flush()
+        return event
+
+    def append(self, event_type: str, data: Optional[dict] = None) -> dict:
+        """Append one event stamped now. Returns the stored event."""
+        self._acquire()
+        try:
+            _, data_file, index_file = self._active_files()
+            ts = max(time.time(), self._last_ts(index_file))
+            event = self._write(data_file, index_file, ts, event_type, data)
+            if os.fstat(data_file.fileno()).st_size >= self.max_segment_bytes:
+                self.rotate()
+            return event
+        finally:
+            self._release()
+
+    def import_events(self, events: Iterable[Tuple[float, str, dict]]) -> int:
+        """Append events with their own timestamps, in segments of their own.
+
+        They are sorted first, and the log rotates before and after so that
+        every segment stays in timestamp order.
+        """
+        events = sorted(events, key=lambda e: e[0])
+        if not events:
+            return 0
+        self._acquire()
+        try:
+            self.rotate()
+            for ts, event_type, fields in events:
+                _, data_file, index_file = self._active_files()
+                self._write(data_file, index_file, ts, event_type, fields)
+                if os.fstat(data_file.fileno()).st_size >= self.max_segment_bytes:
+                    self.rotate()
+            self.rotate()
+        finally:
+            self._release()
+        return len(events)
+
+    def rotate(self) -> None:
+        """Seal the current segment (if it has events) and start the next one."""
+        self._acquire()
+        try:
+            number = self._read_current()
+            segment = Segment(self.dir, number)
+            if not segment.records():
+                return
+            self.close_files()
+            manifest = [s for s in self._read_manifest() if s["segment"] != number]
+            manifest.append(segment.summarize())
+            # Manifest first: a reader that saw the old CURRENT still finds the sealed segment
+            self._write_atomic(self.manifest_path, json.dumps({"segments": manifest}, ensure_ascii=False))
+            self._write_atomic(self.dir / "CURRENT", f"{number + 1}\n")
+            logging.info(f"Sealed event log segment {number} ({manifest[-1]['events']} events)")
+        finally:
+            self._release()
+
+    def close_files(self) -> None:
+        if self._open is not None:
+            self._open[1].close()
+            self._open[2].close()
+            self._open = None
+
+    def segments(self) -> List[Segment]:
+        # CURRENT before the manifest, so a concurrent rotation can't hide a segment
+        current = self._read_current()
+        segments = {s["segment"]: Segment(self.dir, s["segment"], s) for s in self._read_manifest()}
+        if current not in segments:
+            segments[current] = Segment(self.dir, current)
+        return [segments[n] for n in sorted(segments)]
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        types: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """Events in [since, until] of the given types, oldest first."""
+        types = set(types) if types else None
+        streams = [
+            s.query(since, until, types) for s in self.segments() if s.overlaps(since, until, types)
+        ]
+        for count, (_, event) in enumerate(heapq.merge(*streams, key=lambda item: item[0])):
+            if limit is not None and count >= limit:
+                return
+            yield event
+
+    def stats(self) -> dict:
+        segments = self.segments()
+        types: Dict[str, int] = {}
+        sealed_events = 0
+        for segment in segments:
+            if segment.summary:
+                sealed_events += segment.summary["events"]
+                for event_type, count in segment.summary["types"].items():
+                    types[event_type] = types.get(event_type, 0) + count
+        active = segments[-1]
+        return {
+            "directory": str(self.dir),
+            "segments": len(segments),
+            "sealed_events": sealed_events,
+            "active_segment": active.number,
+            "active_events": active.records(),
+            "sealed_types": dict(sorted(types.items(), key=lambda kv: -kv[1])),
+        }
+
+
+def get_event_log(root_dir: str = ".", path: str = LOG_DIR, max_segment_bytes: int = MAX_SEGMENT_BYTES) -> EventLog:
+    directory = os.path.abspath(os.path.join(root_dir, path))
+    log = _log_cache.get(directory)
+    if log is None:
+        log = _log_cache[directory] = EventLog(directory, max_segment_bytes)
+    log.max_segment_bytes = max_segment_bytes
+    return log
+
+
+def read_legacy(path: str) -> List[Tuple[float, str, dict]]:
+    """Events from the old formats: the free-text event_log/meta-log and worklog-style JSON."""
+    events = []
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        entries = doc.get("log", []) if isinstance(doc, dict) else doc
+        for entry in entries:
+            if not isinstance(entry, dict) or "timestamp" not in entry:
+                continue
+            fields = {k: v for k, v in entry.items() if k != "timestamp"}
+            fields["source"] = os.path.basename(path)
+            if isinstance(doc, dict) and doc.get("session_id"):
+                fields.setdefault("session_id", doc["session_id"])
+            events.append((parse_time(entry["timestamp"]), entry.get("type", "worklog"), fields))
+        return events
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            match = META_LOG_RE.match(line.strip())
+            if match:
+                stamp, author, text = match.groups()
+                fields = {"author": author.strip(), "text": text.strip(), "source": os.path.basename(path)}
+                events.append((parse_time(stamp), "meta", fields))
+            elif line.strip() and events:
+                # Continuation of a multi-line entry
+                events[-1][2]["text"] += "\n" + line.strip()
+    return events
+
+
+def benchmark(directory: str = ".llmstruct_event_log_bench", appends: int = 20000) -> dict:
+    """Append cost at the start vs. the end of a long log, and a narrow query over it."""
+    import shutil
+    shutil.rmtree(directory, ignore_errors=True)
+    log = EventLog(directory, max_segment_bytes=256 * 1024)
+    timings = []
+    for batch in range(2):
+        start = time.perf_counter()
+        for i in range(appends):
+            log.append("query" if i % 10 else "error", {"i": i, "batch": batch})
+        timings.append((time.perf_counter() - start) / appends * 1e6)
+    since = time.time() - 0.05
+    start = time.perf_counter()
+    matched = sum(1 for _ in log.query(since=since, types=["error"]))
+    query_ms = (time.perf_counter() - start) * 1000
+    result = {"events": 2 * appends, "segments": len(log.segments()),
+              "append_us_first_batch": timings[0], "append_us_second_batch": timings[1],
+              "recent_errors": matched, "query_ms": query_ms}
+    log.close_files()
+    shutil.rmtree(directory, ignore_errors=True)
+    return result
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
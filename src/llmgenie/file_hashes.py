@@ -0,0 +1,218 @@
+"""Content hashes for `parse --include-hashes`.
+
+Files are hashed in a thread pool so reads overlap with hashing (hashlib,
+xxhash and blake3 release the GIL on large buffers); files of MMAP_THRESHOLD
+bytes or more are mapped instead of read into memory. Results are kept in
+`.llmstruct_index/hashes.json` keyed by path and checked against (inode,
+mtime_ns, size), so an unchanged file is never read again, which is what
+matters on network-mounted checkouts.
+
+`algorithm = "sha256"` (the default) keeps hashes compatible with earlier
+struct.json files. `"auto"` picks xxh3_128 or blake3 when installed and falls
+back to blake2b; hashes other than sha256 carry an `<algorithm>:` prefix.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from llmstruct.struct_io import read_struct, write_struct
+
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import blake3
+
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+ALGORITHMS = ("sha256", "blake2b", "xxh3_128", "blake3", "auto")
+CACHE_FILE = ".llmstruct_index/hashes.json"
+MMAP_THRESHOLD = 1024 * 1024
+READ_BUFFER = 1024 * 1024
+# Files modified this recently may change again within the same mtime tick; don't trust their cache entry
+RACY_SECONDS = 2
+
+# Hashers per root, reused by long-lived processes (the daemon)
+_hasher_cache: Dict[str, "FileHasher"] = {}
+
+
+def resolve_algorithm(algorithm: str) -> str:
+    if algorithm == "auto":
+        return "xxh3_128" if XXHASH_AVAILABLE else "blake3" if BLAKE3_AVAILABLE else "blake2b"
+    if (algorithm == "xxh3_128" and not XXHASH_AVAILABLE) or (algorithm == "blake3" and not BLAKE3_AVAILABLE):
+        logging.warning(f"{algorithm} is not installed, falling back to blake2b")
+        return "blake2b"
+    if algorithm not in ALGORITHMS:
+        logging.warning(f"Unknown hash algorithm '{algorithm}', using sha256")
+        return "sha256"
+    return algorithm
+
+
+def _new_hash(algorithm: str):
+    if algorithm == "xxh3_128":
+        return xxhash.xxh3_128()
+    if algorithm == "blake3":
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+
+def hash_file(path: str, algorithm: str = "sha256") -> str:
+    digest = _new_hash(algorithm)
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            while True:
+                chunk = f.read(READ_BUFFER)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    value = digest.hexdigest()
+    return value if algorithm == "sha256" else f"{algorithm}:{value}"
+
+
+class FileHasher:
+    """Parallel, cached content hashes for files under one root."""
+
+    def __init__(self, root_dir: str, algorithm: str = "sha256", workers: Optional[int] = None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.algorithm = resolve_algorithm(algorithm)
+        # Mostly waiting on I/O, so more threads than cores pays off on slow filesystems
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.cache_path = Path(self.root_dir) / CACHE_FILE
+        # rel path -> [inode, mtime_ns, size, hash]
+        self.cache: Dict[str, list] = {}
+        self.dirty = False
+        self.last_stats: dict = {}
+        self._load()
+
+    def _load(self) -> None:
+        data = None
+        if self.cache_path.exists():
+            try:
+                data = read_struct(self.cache_path)
+            except Exception as e:
+                logging.warning(f"Failed to load hash cache {self.cache_path}: {e}")
+        if isinstance(data, dict) and data.get("algorithm") == self.algorithm:
+            self.cache = data.get("files", {})
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_struct(self.cache_path, {"algorithm": self.algorithm, "files": self.cache}, index=False)
+        self.dirty = False
+
+    def _hash_one(self, rel_path: str, racy_before_ns: int):
+        full_path = os.path.join(self.root_dir, rel_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return rel_path, None, False
+        key = [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+        entry = self.cache.get(rel_path)
+        if entry is not None and entry[:3] == key:
+            return rel_path, entry[3], False
+        try:
+            value = hash_file(full_path, self.algorithm)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to hash {rel_path}: {e}")
+            return rel_path, None, False
+        if stat.st_mtime_ns < racy_before_ns:
+            self.cache[rel_path] = key + [value]
+        else:
+            self.cache.pop(rel_path, None)
+        self.dirty = True
+        return rel_path, value, True
+
+    def hash_paths(self, rel_paths: Iterable[str]) -> Dict[str, str]:
+        """{rel path: hash} for the given root-relative paths (unreadable files are left out)."""
+        rel_paths = list(dict.fromkeys(rel_paths))
+        start = time.perf_counter()
+        racy_before_ns = time.time_ns() - RACY_SECONDS * 1_000_000_000
+        workers = max(1, min(self.workers, len(rel_paths)))
+        if workers == 1:
+            results = [self._hash_one(p, racy_before_ns) for p in rel_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as pool:
+                results = list(pool.map(lambda p: self._hash_one(p, racy_before_ns), rel_paths))
+        hashes = {path: value for path, value, _ in results if value is not None}
+        read = sum(1 for _, _, was_read in results if was_read)
+        self.last_stats = {
+            "files": len(rel_paths),
+            "read": read,
+            "cached": len(hashes) - read,
+            "seconds": time.perf_counter() - start,
+            "algorithm": self.algorithm,
+            "workers": workers,
+        }
+        logging.info(
+            f"Hashed {len(rel_paths)} files ({read} read, {len(hashes) - read} unchanged) "
+            f"in {self.last_stats['seconds']:.2f}s with {self.algorithm}"
+        )
+        return hashes
+
+    def retain(self, rel_paths: Iterable[str]) -> None:
+        """Drop cache entries of files not in rel_paths (after a full parse)."""
+        keep = set(rel_paths)
+        stale = [path for path in self.cache if path not in keep]
+        for path in stale:
+            del self.cache[path]
+        self.dirty = self.dirty or bool(stale)
+
+    def apply(self, modules: List[dict], key_of) -> None:
+        """Set module["hash"] on struct.json modules; key_of maps a module path to its rel path."""
+        keys = [key_of(module.get("path", "")) for module in modules]
+        hashes = self.hash_paths(keys)
+        for module, key in zip(modules, keys):
+            if key in hashes:
+                module["hash"] = hashes[key]
+
+
+def get_file_hasher(root_dir: str, algorithm: str = "sha256", workers: Optional[int] = None) -> FileHasher:
+    root_dir = os.path.abspath(root_dir)
+    hasher = _hasher_cache.get(root_dir)
+    if hasher is None or hasher.algorithm != resolve_algorithm(algorithm):
+        hasher = _hasher_cache[root_dir] = FileHasher(root_dir, algorithm, workers)
+    elif workers:
+        hasher.workers = workers
+    return hasher
+
+
+def benchmark(root_dir: str = ".", algorithm: str = "sha256", patterns: Iterable[str] = ("*.py", "*.js", "*.md", "*.json")) -> dict:
+    """Cold (uncached, in parallel and serially) and warm hashing of a tree."""
+    files = sorted(
+        p.relative_to(root_dir).as_posix()
+        for pattern in patterns for p in Path(root_dir).rglob(pattern)
+        if ".git" not in p.parts and p.is_file()
+    )
+    result = {"files": len(files), "algorithm": resolve_algorithm(algorithm)}
+    for label, workers in (("serial", 1), ("parallel", None)):
+        hasher = FileHasher(root_dir, algorithm, workers)
+        hasher.cache = {}
+        hasher.hash_paths(files)
+        result[f"cold_{label}_seconds"] = hasher.last_stats["seconds"]
+    hasher.hash_paths(files)
+    result["warm_seconds"] = hasher.last_stats["seconds"]
+    result["warm_read"] = hasher.last_stats["read"]
+    return result
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    print(json.dumps(benchmark(*sys.argv[1:3]), indent=2))
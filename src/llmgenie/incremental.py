@@ -0,0 +1,196 @@
+"""Incremental struct.json updates driven by file fingerprints."""
+
+import fnmatch
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from llmstruct.file_hashes import get_file_hasher
+from llmstruct.generators.json_generator import generate_json
+from llmstruct.struct_io import read_struct, write_struct
+
+INDEX_DIR = ".llmstruct_index"
+DEFAULT_INCLUDE_PATTERNS = ["*.py", "*.js"]
+ALWAYS_EXCLUDED_DIRS = {".git", "__pycache__", INDEX_DIR}
+
+
+def _matches(rel_path: str, patterns: List[str]) -> bool:
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern)
+        for pattern in patterns
+    )
+
+
+def scan_fingerprints(
+    root_dir: str,
+    include_patterns: Optional[List[str]] = None,
+    exclude_patterns: Optional[List[str]] = None,
+    exclude_dirs: Optional[List[str]] = None,
+) -> Dict[str, List[int]]:
+    """Return {relative path: [mtime_ns, size]} for every parseable file."""
+    include = include_patterns or DEFAULT_INCLUDE_PATTERNS
+    exclude = exclude_patterns or []
+    skip_dirs = ALWAYS_EXCLUDED_DIRS | {d.strip("/") for d in (exclude_dirs or [])}
+    fingerprints = {}
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        rel_dir = Path(dirpath).relative_to(root_dir).as_posix()
+        rel_dir = "" if rel_dir == "." else rel_dir + "/"
+        dirnames[:] = [
+            d for d in dirnames
+            if d not in skip_dirs and f"{rel_dir}{d}" not in skip_dirs
+        ]
+        for name in filenames:
+            rel_path = f"{rel_dir}{name}"
+            if not _matches(rel_path, include) or _matches(rel_path, exclude):
+                continue
+            try:
+                stat = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            fingerprints[rel_path] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprints
+
+
+def module_key(root_dir: str, module_path: str) -> str:
+    """Normalize a module path from struct.json to a root-relative POSIX path."""
+    path = Path(module_path)
+    if path.is_absolute():
+        try:
+            path = path.relative_to(root_dir)
+        except ValueError:
+            pass
+    return path.as_posix()
+
+
+def generate(root_dir: str, options: dict, include_patterns: Optional[List[str]] = None) -> dict:
+    """generate_json() with --include-hashes done by the parallel, cached FileHasher.
+
+    `hash_algorithm` and `hash_workers` in options configure the hasher.
+    """
+    options = dict(options)
+    include_hashes = options.pop("include_hashes", False)
+    algorithm = options.pop("hash_algorithm", "sha256")
+    workers = options.pop("hash_workers", None)
+    if include_patterns is not None:
+        options["include_patterns"] = include_patterns
+    struct_data = generate_json(root_dir, include_hashes=False, **options)
+    if include_hashes:
+        hasher = get_file_hasher(root_dir, algorithm, workers)
+        modules = struct_data.get("modules", [])
+        hasher.apply(modules, lambda path: module_key(root_dir, path))
+        if include_patterns is None:
+            hasher.retain(module_key(root_dir, module.get("path", "")) for module in modules)
+        hasher.save()
+    return struct_data
+
+
+class IncrementalParser:
+    """Keeps struct data and fingerprints for one output file and re-parses only changed modules."""
+
+    def __init__(self, root_dir: str, output: str, options: dict):
+        self.root_dir = os.path.abspath(root_dir)
+        self.output = os.path.abspath(output)
+        self.options = dict(options)
+        self.struct_data: Optional[dict] = None
+        self.fingerprints: Dict[str, List[int]] = {}
+        self.fingerprints_path = (
+            Path(self.root_dir) / INDEX_DIR / f"{Path(output).stem}.fingerprints.json"
+        )
+
+    def _scan(self) -> Dict[str, List[int]]:
+        return scan_fingerprints(
+            self.root_dir,
+            include_patterns=self.options.get("include_patterns"),
+            exclude_patterns=self.options.get("exclude_patterns"),
+            exclude_dirs=self.options.get("exclude_dirs"),
+        )
+
+    def load(self) -> bool:
+        """Load previous struct data and fingerprints from disk."""
+        if not Path(self.output).exists() or not self.fingerprints_path.exists():
+            return False
+        try:
+            self.struct_data = read_struct(self.output)
+            with self.fingerprints_path.open("r", encoding="utf-8") as f:
+                self.fingerprints = json.load(f)
+            return True
+        except Exception as e:
+            logging.warning(f"Failed to load previous parse state: {e}")
+            self.struct_data = None
+            self.fingerprints = {}
+            return False
+
+    def save_fingerprints(self) -> None:
+        write_struct(self.fingerprints_path, self.fingerprints, index=False)
+
+    def full_parse(self) -> dict:
+        """Parse the whole tree and reset fingerprints."""
+        self.fingerprints = self._scan()
+        self.struct_data = generate(self.root_dir, self.options)
+        return self.struct_data
+
+    def update(
+        self, changed_paths: Optional[Iterable[str]] = None
+    ) -> Tuple[dict, List[str], List[str]]:
+        """Bring struct data up to date.
+
+        Returns (struct_data, changed, removed). If changed_paths is given,
+        only those files are checked; otherwise the whole tree is rescanned.
+        """
+        if self.struct_data is None and not self.load():
+            struct_data = self.full_parse()
+            return struct_data, sorted(self.fingerprints), []
+
+        if changed_paths is None:
+            current = self._scan()
+            candidates = set(current) | set(self.fingerprints)
+        else:
+            include = self.options.get("include_patterns") or DEFAULT_INCLUDE_PATTERNS
+            exclude = self.options.get("exclude_patterns") or []
+            current = dict(self.fingerprints)
+            candidates = set()
+            for path in changed_paths:
+                rel_path = module_key(self.root_dir, path)
+                if not _matches(rel_path, include) or _matches(rel_path, exclude):
+                    continue
+                candidates.add(rel_path)
+                full_path = Path(self.root_dir) / rel_path
+                try:
+                    stat = full_path.stat()
+                    current[rel_path] = [stat.st_mtime_ns, stat.st_size]
+                except OSError:
+                    current.pop(rel_path, None)
+
+        changed = sorted(
+            p for p in candidates if p in current and current[p] != self.fingerprints.get(p)
+        )
+        removed = sorted(p for p in candidates if p not in current and p in self.fingerprints)
+        if not changed and not removed:
+            return self.struct_data, [], []
+
+        new_modules = []
+        if changed:
+            partial = generate(self.root_dir, self.options, include_patterns=changed)
+            new_modules = partial.get("modules", [])
+        self._merge_modules(new_modules, changed + removed)
+        for path in changed:
+            self.fingerprints[path] = current[path]
+        for path in removed:
+            self.fingerprints.pop(path, None)
+        logging.info(
+            f"Incremental parse: {len(changed)} changed, {len(removed)} removed"
+        )
+        return self.struct_data, changed, removed
+
+    def _merge_modules(self, new_modules: List[dict], touched: List[str]) -> None:
+        touched_set = set(touched)
+        modules = [
+            module for module in self.struct_data.get("modules", [])
+            if module_key(self.root_dir, module.get("path", "")) not in touched_set
+        ]
+        modules.extend(new_modules)
+        modules.sort(key=lambda module: module_key(self.root_dir, module.get("path", "")))
+        self.struct_data["modules"] = modules
@@ -2,12 +2,27 @@ import asyncio
 import json
 import logging
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Union
 
 import aiohttp
 from dotenv import load_dotenv
 
+from llmstruct.ollama_balancer import OllamaBalancer, OllamaHost
+from llmstruct.prompt_cache import (
+    OllamaContextCache,
+    PrefixCacheStats,
+    PromptParts,
+    anthropic_content,
+)
+from llmstruct.router import BackendRouter, estimate_tokens
+from llmstruct.rules_engine import RuleQuery, RulesEngine, get_rules_engine, render_rules
+from llmstruct.semantic_cache import SemanticCache
+from llmstruct.single_flight import SingleFlight, request_key
+from llmstruct.struct_io import StructReader
+
 try:
     if not load_dotenv():
         logging.warning("No .env file found or failed to parse .env")
@@ -30,51 +45,297 @@ class LLMClient:
         self.grok_api_key = os.getenv("GROK_API_KEY")
         logging.info(f"Grok API key: {self.grok_api_key}")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+        # Overridable so benchmarks and load tests can point at llmstruct.stub_provider
+        self.grok_url = os.getenv("GROK_API_URL", "https://api.x.ai/v1/chat/completions")
+        self.anthropic_url = os.getenv("ANTHROPIC_API_URL", "https://api.anthropic.com/v1/messages")
         self.ollama_host = ollama_host or os.getenv(
             "OLLAMA_HOST", "http://localhost:11434"
         )
+        # Several hosts (OLLAMA_HOSTS or [ollama] hosts) are load-balanced
+        ollama_hosts = [h.strip() for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()]
+        if ollama_host or not ollama_hosts:
+            ollama_hosts = [self.ollama_host]
         self.retry_count = int(os.getenv("RETRY_COUNT", 3))
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Serialized context files, least recently used first (configure_context)
+        self._context_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._context_cache_lock = threading.Lock()
+        self.context_cache_entries = 8
+        # Per-function fields left out of context files (configure_context)
+        self.context_drop_fields = ("source",)
+        self.prefix_cache_enabled = os.getenv("LLM_PREFIX_CACHE", "1") != "0"
+        self.prefix_cache = PrefixCacheStats()
+        self._ollama_contexts = OllamaContextCache()
+        self.semantic_cache: Optional[SemanticCache] = None
+        # Identical concurrent queries share one provider call unless LLM_COALESCE=0
+        self.coalesce_enabled = os.getenv("LLM_COALESCE", "1") != "0"
+        self.single_flight = SingleFlight()
+        # Live per-backend statistics; mode="auto" routes with them
+        self.router = BackendRouter()
+        # Rules from rules_manifest.json added to prompts (configure_rules)
+        self.rules_engine: Optional[RulesEngine] = None
+        self.default_rules = RuleQuery()
+        if os.getenv("LLM_SEMANTIC_CACHE") == "1":
+            self.configure_semantic_cache({"enabled": True})
+        preload_models = os.getenv("OLLAMA_PRELOAD_MODELS", "")
+        self.ollama_pool = OllamaBalancer(
+            ollama_hosts,
+            self._get_session,
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            preload_models=[m.strip() for m in preload_models.split(",") if m.strip()],
+        )
 
-    async def query(
+    def configure_semantic_cache(self, config: dict) -> None:
+        """Apply a [semantic_cache] section from llmstruct.toml (enabled, threshold, max_entries, dim)."""
+        if not config.get("enabled"):
+            return
+        try:
+            self.semantic_cache = SemanticCache(
+                **{k: config[k] for k in ("threshold", "max_entries", "dim") if k in config}
+            )
+        except RuntimeError as e:
+            logging.warning(f"Semantic cache disabled: {e}")
+
+    def configure_router(self, config: dict) -> None:
+        """Apply a [router] section from llmstruct.toml (see llmstruct.router)."""
+        self.router.configure(config)
+        # Ollama's window is whatever num_ctx the pool requests, unless set explicitly
+        num_ctx = self.ollama_pool.options.get("num_ctx")
+        if num_ctx and "ollama" not in (config.get("context_windows") or {}):
+            self.router.settings["ollama"]["context_window"] = num_ctx
+
+    def configure_rules(self, config: dict, root_dir: str = ".") -> None:
+        """Apply a [rules] section from llmstruct.toml (enabled, manifest, role, scope)."""
+        if not config.get("enabled", True):
+            self.rules_engine = None
+            return
+        self.rules_engine = get_rules_engine(root_dir, config.get("manifest", "rules_manifest.json"))
+        self.default_rules = RuleQuery(config.get("role"), config.get("scope"), tuple(config.get("rules", ())))
+
+    def _rules_text(self, prompt: str, rules: Optional[RuleQuery]) -> str:
+        if self.rules_engine is None:
+            return ""
+        query = self.default_rules if rules is None else RuleQuery(
+            rules.role or self.default_rules.role,
+            rules.scope or self.default_rules.scope,
+            tuple(self.default_rules.ids) + tuple(rules.ids),
+        )
+        return render_rules(self.rules_engine.select(query, prompt))
+
+    def _available_backends(self) -> List[str]:
+        """Backends auto mode may use: hosted APIs need a key, Ollama is always tried."""
+        available = ["ollama"]
+        if self.grok_api_key:
+            available.append("grok")
+        if self.anthropic_api_key:
+            available.append("anthropic")
+        return available
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def configure_context(self, config: dict) -> None:
+        """Apply a [context] section from llmstruct.toml (drop_function_fields, cache_entries)."""
+        fields = config.get("drop_function_fields", self.context_drop_fields)
+        with self._context_cache_lock:
+            self.context_cache_entries = max(1, int(config.get("cache_entries", self.context_cache_entries)))
+            if tuple(fields) != self.context_drop_fields:
+                self.context_drop_fields = tuple(fields)
+                self._context_cache.clear()
+            while len(self._context_cache) > self.context_cache_entries:
+                self._context_cache.popitem(last=False)
+
+    def _context_text(self, context_path: str) -> str:
+        """Serialized context, built once per file version so prompt prefixes stay byte-identical.
+
+        struct.json modules are serialized one at a time without
+        context_drop_fields (function sources by default); only the text is kept,
+        for the context_cache_entries most recently used files.
+        """
+        path = Path(context_path)
+        stat = path.stat()
+        key = str(path.resolve())
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._context_cache_lock:
+            cached = self._context_cache.get(key)
+            if cached and cached[0] == signature:
+                self._context_cache.move_to_end(key)
+                return cached[1]
+        text = StructReader(path).dump(drop_function_fields=self.context_drop_fields)
+        with self._context_cache_lock:
+            self._context_cache[key] = (signature, text)
+            self._context_cache.move_to_end(key)
+            while len(self._context_cache) > self.context_cache_entries:
+                self._context_cache.popitem(last=False)
+        return text
+
+    def _build_prompt_parts(
         self,
         prompt: str,
         context_path: str = None,
-        mode: str = "hybrid",
-        model: Optional[str] = None,
         artifact_ids: Optional[List[str]] = None,
-    ) -> Optional[str]:
-        """Query LLMs with prompt, context, and optional model."""
-        logging.info(f"Querying in {mode} mode with prompt: {prompt}")
+        context_text: Optional[str] = None,
+        rules: Optional[RuleQuery] = None,
+    ) -> Optional[PromptParts]:
+        """Split the request into a stable prefix (context, artifacts, active rules) and the prompt.
 
+        context_text, when given, replaces the context file. None if the context can't be loaded.
+        """
         # Load context from file if provided
-        context = {}
-        if context_path and Path(context_path).exists():
-            try:
-                with Path(context_path).open("r", encoding="utf-8") as f:
-                    context = json.load(f)
-            except Exception as e:
-                logging.error(f"Failed to load context from {context_path}: {e}")
-                return None
+        if context_text is None:
+            context_text = "{}"
+            if context_path and Path(context_path).exists():
+                try:
+                    context_text = self._context_text(context_path)
+                except Exception as e:
+                    logging.error(f"Failed to load context from {context_path}: {e}")
+                    return None
 
         # Handle artifact_ids
         artifact_context = ""
         if artifact_ids:
             artifact_context = f"Artifacts included: {', '.join(artifact_ids)}"
 
-        # Combine prompt with context
-        full_prompt = f"{prompt}\n\nContext:\n{json.dumps(context, indent=2)}\n{artifact_context}".strip()
+        rules_context = self._rules_text(prompt, rules)
+
+        prefix = f"Context:\n{context_text}\n{artifact_context}\n{rules_context}".strip()
+        return PromptParts(prefix, prompt)
+
+    def _build_prompt(
+        self,
+        prompt: str,
+        context_path: str = None,
+        artifact_ids: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Combine prompt, context file and artifact ids. None if the context can't be loaded."""
+        parts = self._build_prompt_parts(prompt, context_path, artifact_ids)
+        return parts.text if parts else None
+
+    def _prompt_for_provider(self, parts: PromptParts) -> Union[str, PromptParts]:
+        return parts if self.prefix_cache_enabled else parts.text
+
+    def _record_usage(self, provider: str, cached_tokens: int) -> None:
+        if self.prefix_cache_enabled:
+            self.prefix_cache.record(provider, cached_tokens > 0, cached_tokens)
+
+    async def query(
+        self,
+        prompt: str,
+        context_path: str = None,
+        mode: str = "hybrid",
+        model: Optional[str] = None,
+        artifact_ids: Optional[List[str]] = None,
+        coalesce: Optional[bool] = None,
+        rules: Optional[RuleQuery] = None,
+    ) -> Optional[str]:
+        """Query LLMs with prompt, context, and optional model.
+
+        Identical concurrent queries share one provider call; pass coalesce=False
+        when every caller needs its own sample. `rules` (role, scope, rule ids)
+        refines the rule selection configured with configure_rules().
+        """
+        logging.info(f"Querying in {mode} mode with prompt: {prompt}")
+
+        # Reading and serializing a large context file would block the event loop
+        parts = await asyncio.to_thread(self._build_prompt_parts, prompt, context_path, artifact_ids, rules=rules)
+        if parts is None:
+            return None
+        return await self._query_parts(prompt, parts, mode, model, coalesce)
+
+    async def query_with_context(
+        self,
+        prompt: str,
+        context_data: dict,
+        mode: str = "hybrid",
+        model: Optional[str] = None,
+        artifact_ids: Optional[List[str]] = None,
+        coalesce: Optional[bool] = None,
+        rules: Optional[RuleQuery] = None,
+    ) -> Optional[str]:
+        """Query with an already selected context (e.g. FOCUSED retrieval) instead of a file."""
+        logging.info(f"Querying in {mode} mode with prepared context, prompt: {prompt}")
+        parts = self._build_prompt_parts(
+            prompt, artifact_ids=artifact_ids, context_text=json.dumps(context_data, indent=2), rules=rules
+        )
+        return await self._query_parts(prompt, parts, mode, model, coalesce)
+
+    async def warm_up(
+        self,
+        context_path: str = None,
+        mode: str = "hybrid",
+        model: Optional[str] = None,
+        artifact_ids: Optional[List[str]] = None,
+    ) -> None:
+        """Prepare for a query that hasn't been typed yet.
+
+        Loads and serializes the context; for Ollama also loads the model and
+        evaluates the context prefix, so the real query only sends the question.
+        """
+        parts = await asyncio.to_thread(self._build_prompt_parts, "", context_path, artifact_ids)
+        if parts is None or mode not in ("ollama", "hybrid"):
+            return
+        model = model or "mixtral"
+        try:
+            if self.prefix_cache_enabled and parts.cacheable:
+                async with self.ollama_pool.host_for(model) as host:
+                    await self._ollama_prefix_context(parts, model, host)
+            else:
+                await self.ollama_pool.preload([model], all_hosts=False)
+        except Exception as e:
+            logging.warning(f"Ollama warm-up for {model} failed: {e}")
+
+    async def _query_parts(
+        self,
+        prompt: str,
+        parts: PromptParts,
+        mode: str,
+        model: Optional[str],
+        coalesce: Optional[bool] = None,
+    ) -> Optional[str]:
+        full_prompt = self._prompt_for_provider(parts)
+
+        # Answers are only reused for the same mode, model and context
+        scope = f"{mode}:{model}:{parts.prefix_hash}"
+        semantic_cache = self.semantic_cache
+        if semantic_cache is not None and not semantic_cache.accepts(prompt):
+            semantic_cache = None
+        if semantic_cache is not None:
+            cached = semantic_cache.lookup(scope, prompt)
+            if cached is not None:
+                logging.info("Semantic cache hit")
+                return cached
+
+        async def send():
+            result = await self._query_mode(full_prompt, mode, model)
+            if result and semantic_cache is not None:
+                semantic_cache.store(scope, prompt, result)
+            return result
+
+        if self.coalesce_enabled if coalesce is None else coalesce:
+            return await self.single_flight.do(request_key(mode, model, parts.prefix_hash, prompt), send)
+        return await send()
 
+    async def _query_mode(
+        self, full_prompt: Union[str, PromptParts], mode: str, model: Optional[str]
+    ) -> Optional[str]:
         # Select query method based on mode
         for attempt in range(self.retry_count):
             try:
-                if mode == "grok":
-                    return await self._query_grok(full_prompt)
-                elif mode == "anthropic":
-                    return await self._query_anthropic(full_prompt)
-                elif mode == "ollama":
-                    return await self._query_ollama(full_prompt, model or "mixtral")
+                if mode in ("grok", "anthropic", "ollama"):
+                    return await self._call_backend(mode, full_prompt, model)
                 elif mode == "hybrid":
                     return await self._query_hybrid(full_prompt, model)
+                elif mode == "auto":
+                    return await self._query_auto(full_prompt, model)
                 else:
                     logging.error(f"Unsupported mode: {mode}")
                     return None
@@ -85,41 +346,229 @@ class LLMClient:
                     return None
                 await asyncio.sleep(1)
 
-    async def _query_grok(self, prompt: str) -> Optional[str]:
+    async def stream_query(
+        self,
+        prompt: str,
+        context_path: str = None,
+        mode: str = "hybrid",
+        model: Optional[str] = None,
+        artifact_ids: Optional[List[str]] = None,
+        rules: Optional[RuleQuery] = None,
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as the provider generates them.
+
+        Hybrid mode has no single stream, so it yields the combined response once.
+        Auto mode streams from the best-ranked backend, without falling back.
+        Streams are not retried: a partial response can't be replayed.
+        """
+        logging.info(f"Streaming query in {mode} mode with prompt: {prompt}")
+        if mode not in ("grok", "anthropic", "ollama", "auto"):
+            result = await self.query(prompt, context_path, mode, model, artifact_ids, rules=rules)
+            if result:
+                yield result
+            return
+        parts = await asyncio.to_thread(self._build_prompt_parts, prompt, context_path, artifact_ids, rules=rules)
+        if parts is None:
+            return
+        full_prompt = self._prompt_for_provider(parts)
+        if mode == "auto":
+            ranked = self.router.choose(parts.text, self._available_backends())
+            if not ranked:
+                return
+            mode = ranked[0]
+        if mode == "grok":
+            stream = self._stream_grok(full_prompt)
+        elif mode == "anthropic":
+            stream = self._stream_anthropic(full_prompt)
+        else:
+            stream = self._stream_ollama(full_prompt, model or "mixtral")
+        async for chunk in stream:
+            yield chunk
+
+    async def _iter_sse(self, response) -> AsyncIterator[dict]:
+        """Parse server-sent events into JSON payloads."""
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == "[DONE]":
+                break
+            yield json.loads(payload)
+
+    async def _stream_grok(self, prompt: Union[str, PromptParts]) -> AsyncIterator[str]:
+        """Stream a Grok chat completion."""
+        if not self.grok_api_key:
+            logging.error("GROK_API_KEY not set")
+            return
+        url = self.grok_url
+        headers = {
+            "Authorization": f"Bearer {self.grok_api_key}",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": "grok-3",
+            # Grok caches matching prompt prefixes on its own; the context goes first
+            "messages": [{"role": "user", "content": getattr(prompt, "text", prompt)}],
+            "max_tokens": 4096,
+            "stream": True,
+        }
+        session = await self._get_session()
+        async with session.post(url, headers=headers, json=data) as response:
+            if response.status != 200:
+                logging.error(f"Grok API error: {response.status}")
+                return
+            async for event in self._iter_sse(response):
+                text = event.get("choices", [{}])[0].get("delta", {}).get("content")
+                if text:
+                    yield text
+
+    async def _stream_anthropic(self, prompt: Union[str, PromptParts]) -> AsyncIterator[str]:
+        """Stream an Anthropic message."""
+        if not self.anthropic_api_key:
+            logging.error("ANTHROPIC_API_KEY not set")
+            return
+        url = self.anthropic_url
+        headers = {
+            "x-api-key": self.anthropic_api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": "claude-3-opus-20240229",
+            "messages": [{"role": "user", "content": anthropic_content(prompt)}],
+            "max_tokens": 4096,
+            "stream": True,
+        }
+        session = await self._get_session()
+        async with session.post(url, headers=headers, json=data) as response:
+            if response.status != 200:
+                logging.error(f"Anthropic API error: {response.status}")
+                return
+            async for event in self._iter_sse(response):
+                if event.get("type") == "message_start":
+                    usage = event.get("message", {}).get("usage") or {}
+                    self._record_usage("anthropic", usage.get("cache_read_input_tokens", 0))
+                elif event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
+
+    async def _ollama_request(
+        self, prompt: Union[str, PromptParts], model: str, stream: bool, host: OllamaHost
+    ) -> dict:
+        """Build an /api/generate body, continuing from a cached prefix context when possible."""
+        data = {
+            "model": model,
+            "prompt": getattr(prompt, "text", prompt),
+            "stream": stream,
+            **self.ollama_pool.request_options(model),
+        }
+        if isinstance(prompt, PromptParts) and prompt.cacheable:
+            context = await self._ollama_prefix_context(prompt, model, host)
+            if context is not None:
+                # context + continuation is exactly the text an uncached request sends
+                data["prompt"] = prompt.continuation
+                data["context"] = context
+        return data
+
+    async def _ollama_prefix_context(
+        self, parts: PromptParts, model: str, host: OllamaHost
+    ) -> Optional[List[int]]:
+        """Ollama `context` state after evaluating parts.prefix, evaluated once per model and prefix.
+
+        The tokens work on any host; the one that evaluated them also has them in its KV cache.
+        """
+        cached = self._ollama_contexts.get(model, parts.prefix_hash)
+        if cached is not None:
+            self._record_usage("ollama", cached[1])
+            return cached[0]
+        self._record_usage("ollama", 0)
+        # Evaluate the prefix alone. num_predict=0 generates nothing, so the returned
+        # context holds only the prefix and no reply token ends up in later prompts.
+        data = {
+            "model": model,
+            "prompt": parts.prefix,
+            "stream": False,
+            **self.ollama_pool.request_options(model),
+        }
+        data["options"] = {**data.get("options", {}), "num_predict": 0}
+        session = await self._get_session()
+        async with session.post(f"{host.url}/api/generate", json=data) as response:
+            host.observe(response.status)
+            if response.status != 200:
+                logging.warning(f"Ollama prefix evaluation failed on {host.url}: {response.status}")
+                return None
+            result = await response.json()
+        host.pool.record(model, result, preload=True)
+        context = result.get("context")
+        if not context:
+            return None
+        self._ollama_contexts.put(model, parts.prefix_hash, context, result.get("prompt_eval_count", 0))
+        return context
+
+    async def _stream_ollama(self, prompt: Union[str, PromptParts], model: str) -> AsyncIterator[str]:
+        """Stream an Ollama generation (newline-delimited JSON)."""
+        async with self.ollama_pool.host_for(model) as host:
+            data = await self._ollama_request(prompt, model, stream=True, host=host)
+            session = await self._get_session()
+            async with session.post(f"{host.url}/api/generate", json=data) as response:
+                host.observe(response.status)
+                if response.status != 200:
+                    logging.error(f"Ollama API error on {host.url}: {response.status}")
+                    return
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event.get("response"):
+                        yield event["response"]
+                    if event.get("done"):
+                        host.pool.record(model, event)
+                        break
+
+    async def _query_grok(self, prompt: Union[str, PromptParts]) -> Optional[str]:
         """Query Grok API."""
         if not self.grok_api_key:
             logging.error("GROK_API_KEY not set")
             return None
-        url = "https://api.x.ai/v1/chat/completions"
+        url = self.grok_url
         headers = {
             "Authorization": f"Bearer {self.grok_api_key}",
             "Content-Type": "application/json",
         }
         data = {
             "model": "grok-3",
-            "messages": [{"role": "user", "content": prompt}],
+            # Grok caches matching prompt prefixes on its own; the context goes first
+            "messages": [{"role": "user", "content": getattr(prompt, "text", prompt)}],
             "max_tokens": 4096,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    logging.info("Grok query successful")
-                    return (
-                        result.get("choices", [{}])[0]
-                        .get("message", {})
-                        .get("content", "")
-                    )
-                else:
-                    logging.error(f"Grok API error: {response.status}")
-                    return None
+        session = await self._get_session()
+        async with session.post(url, headers=headers, json=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                usage = result.get("usage") or {}
+                self._record_usage(
+                    "grok", (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+                )
+                logging.info("Grok query successful")
+                return (
+                    result.get("choices", [{}])[0]
+                    .get("message", {})
+                    .get("content", "")
+                )
+            else:
+                logging.error(f"Grok API error: {response.status}")
+                return None
 
-    async def _query_anthropic(self, prompt: str) -> Optional[str]:
+    async def _query_anthropic(self, prompt: Union[str, PromptParts]) -> Optional[str]:
         """Query Anthropic API."""
         if not self.anthropic_api_key:
             logging.error("ANTHROPIC_API_KEY not set")
             return None
-        url = "https://api.anthropic.com/v1/messages"
+        url = self.anthropic_url
         headers = {
             "x-api-key": self.anthropic_api_key,
             "anthropic-version": "2023-06-01",
@@ -127,46 +576,85 @@ class LLMClient:
         }
         data = {
             "model": "claude-3-opus-20240229",
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [{"role": "user", "content": anthropic_content(prompt)}],
             "max_tokens": 4096,
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    logging.info("Anthropic query successful")
-                    return result.get("content", [{}])[0].get("text", "")
-                else:
-                    logging.error(f"Anthropic API error: {response.status}")
-                    return None
+        session = await self._get_session()
+        async with session.post(url, headers=headers, json=data) as response:
+            if response.status == 200:
+                result = await response.json()
+                usage = result.get("usage") or {}
+                self._record_usage("anthropic", usage.get("cache_read_input_tokens", 0))
+                logging.info("Anthropic query successful")
+                return result.get("content", [{}])[0].get("text", "")
+            else:
+                logging.error(f"Anthropic API error: {response.status}")
+                return None
 
-    async def _query_ollama(self, prompt: str, model: str) -> Optional[str]:
+    async def _query_ollama(self, prompt: Union[str, PromptParts], model: str) -> Optional[str]:
         """Query Ollama API with specified model."""
-        url = f"{self.ollama_host.rstrip('/')}/api/generate"
-        data = {"model": model, "prompt": prompt, "stream": False}
-        async with aiohttp.ClientSession() as session:
+        async with self.ollama_pool.host_for(model) as host:
+            url = f"{host.url}/api/generate"
+            data = await self._ollama_request(prompt, model, stream=False, host=host)
+            session = await self._get_session()
             logging.debug(f"Sending request to Ollama: url={url}, data={data}")
             async with session.post(url, json=data) as response:
+                host.observe(response.status)
                 if response.status == 200:
                     result = await response.json()
-                    logging.info(f"Ollama query successful with model {model}")
+                    host.pool.record(model, result)
+                    logging.info(f"Ollama query successful with model {model} on {host.url}")
                     return result.get("response", "")
                 else:
-                    logging.error(f"Ollama API error: {response.status}")
+                    logging.error(f"Ollama API error on {host.url}: {response.status}")
                     return None
 
     async def _query_hybrid(
-        self, prompt: str, model: Optional[str] = None
+        self, prompt: Union[str, PromptParts], model: Optional[str] = None
     ) -> Optional[str]:
         """Query multiple LLMs and combine results."""
-        tasks = [
-            self._query_grok(prompt),
-            self._query_anthropic(prompt),
-            self._query_ollama(prompt, model or "mixtral"),
-        ]
+        tasks = [self._call_backend(backend, prompt, model) for backend in ("grok", "anthropic", "ollama")]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         valid_results = [r for r in results if r and not isinstance(r, Exception)]
         logging.info(
             f"Hybrid query completed with {len(valid_results)} valid responses"
         )
         return "\n".join(valid_results) if valid_results else None
+
+    async def _call_backend(
+        self, backend: str, prompt: Union[str, PromptParts], model: Optional[str] = None
+    ) -> Optional[str]:
+        """Query one backend, feeding its latency and outcome to the router."""
+        tokens = estimate_tokens(getattr(prompt, "text", prompt))
+        started = self.router.begin(backend)
+        try:
+            if backend == "grok":
+                result = await self._query_grok(prompt)
+            elif backend == "anthropic":
+                result = await self._query_anthropic(prompt)
+            else:
+                result = await self._query_ollama(prompt, model or "mixtral")
+        except asyncio.CancelledError:
+            self.router.cancel(backend)
+            raise
+        except Exception:
+            self.router.end(backend, started, tokens, ok=False)
+            raise
+        self.router.end(backend, started, tokens, ok=bool(result))
+        return result
+
+    async def _query_auto(
+        self, prompt: Union[str, PromptParts], model: Optional[str] = None
+    ) -> Optional[str]:
+        """Route to the best-scoring backend, falling back down the ranking on failure."""
+        ranked = self.router.choose(getattr(prompt, "text", prompt), self._available_backends())
+        for backend in ranked:
+            try:
+                result = await self._call_backend(backend, prompt, model)
+            except Exception as e:
+                logging.warning(f"Auto mode: {backend} failed: {e}")
+                continue
+            if result:
+                return result
+            logging.warning(f"Auto mode: no answer from {backend}, trying the next backend")
+        return None
@@ -9,7 +9,7 @@ def analyze_duplicates(args):
         if deep_mode == 'any-name':
             print("⚠️  'any-name' mode: comparing all function bodies regardless of name. This may be slow on large codebases!")
         print("🔍 Analyzing Function Duplication...")
-        orchestrator = WorkflowOrchestrator(".", debug=debug)
+        orchestrator = WorkflowOrchestrator(getattr(args, "root_dir", None) or ".", debug=debug)
         if debug:
             print("🔧 [DEBUG] Calling analyze_codebase_for_duplicates...")
         no_prod_filter = getattr(args, 'no_prod_filter', False)
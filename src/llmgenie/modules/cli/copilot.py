@@ -1,113 +1,171 @@
+import json
 import logging
 import shutil
 from pathlib import Path
-
-def copilot(args):
-    """Copilot integration and context management."""
-    try:
-        from llmstruct.copilot import initialize_copilot
-        manager = initialize_copilot(args.root_dir)
-
-        if args.copilot_command == "init":
-            config_path = Path(args.root_dir) / "data" / "copilot_init.json"
-            if config_path.exists() and not args.force:
-                logging.info(f"Copilot already initialized at {config_path}")
-            else:
-                template_path = (
-                    Path(__file__).parent.parent.parent / "templates" / "copilot_init.json"
-                )
-                if template_path.exists():
-                    shutil.copy(template_path, config_path)
-                    logging.info(f"Initialized copilot configuration at {config_path}")
-                else:
-                    logging.error("Copilot template not found")
-
-        elif args.copilot_command == "status":
-            status = manager.get_context_status()
-            print(f"Loaded layers: {', '.join(status['loaded_layers'])}")
-            print(f"Available layers: {', '.join(status['available_layers'])}")
-
-        elif args.copilot_command == "load":
-            if hasattr(args, "layer") and args.layer:
-                success = manager.load_context_layer(args.layer)
-                if success:
-                    logging.info(f"Loaded context layer: {args.layer}")
-                else:
-                    logging.error(f"Failed to load context layer: {args.layer}")
-            else:
-                logging.error("Layer name required for load command")
-
-        elif args.copilot_command == "unload":
-            if hasattr(args, "layer") and args.layer:
-                success = manager.unload_context_layer(args.layer)
-                if success:
-                    logging.info(f"Unloaded context layer: {args.layer}")
-                else:
-                    logging.error(f"Failed to unload context layer: {args.layer}")
-            else:
-                logging.error("Layer name required for unload command")
-
-        elif args.copilot_command == "refresh":
-            success = manager.refresh_all_contexts()
-            if success:
-                logging.info("Refreshed all context layers")
-            else:
-                logging.error("Failed to refresh some context layers")
-
-        elif args.copilot_command == "suggest":
-            from llmstruct.copilot import smart_suggest
-            if hasattr(args, "query") and args.query:
-                context_type = getattr(args, "context", "code")
-                suggestions = smart_suggest(manager, args.query, context_type)
-                print("Suggestions:")
-                for i, suggestion in enumerate(suggestions, 1):
-                    print(f"{i}. {suggestion}")
-            else:
-                logging.error("Query required for suggest command")
-
-        elif args.copilot_command == "validate":
-            if hasattr(args, "file_path") and args.file_path:
-                change_type = getattr(args, "change_type", "edit")
-                result = manager.validate_change(args.file_path, change_type)
-
-                if result["valid"]:
-                    print("✓ Validation passed")
-                else:
-                    print("✗ Validation failed")
-
-                if result["warnings"]:
-                    print("Warnings:")
-                    for warning in result["warnings"]:
-                        print(f"  - {warning}")
-
-                if result["errors"]:
-                    print("Errors:")
-                    for error in result["errors"]:
-                        print(f"  - {error}")
+from llmstruct.context_layers import COPILOT_CONFIG, DEFAULT_LAYERS, get_layer_manager
+from llmstruct.dep_graph import get_graph, validate_change
+from llmstruct.suggest_index import get_suggestion_index
+from llmstruct.modules.cli.utils import load_config, get_copilot_config
+
+LAYER_COMMANDS = ("status", "load", "unload", "refresh")
+# Only meaningful in a process that outlives the command (the daemon)
+RESIDENT_COMMANDS = ("load", "unload")
+
+
+def suggest(args, manager):
+    """Ranked suggestions from the persistent index over all copilot layers."""
+    if not getattr(args, "query", None):
+        logging.error("Query required for suggest command")
+        return
+    layers = args.layers.split(",") if getattr(args, "layers", None) else None
+    index = get_suggestion_index(args.root_dir, layer_manager=manager)
+    suggestions = index.search(args.query, limit=args.limit, layers=layers)
+    print("Suggestions:")
+    for i, suggestion in enumerate(suggestions, 1):
+        detail = f" — {suggestion['detail']}" if suggestion["detail"] else ""
+        print(f"{i}. {suggestion['label']}{detail} [{suggestion['layer']}: {suggestion['source']}]")
+
+
+def _format_size(size):
+    return f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / (1024 * 1024):.1f} MB"
+
+
+def create_layer_manager(root_dir):
+    """Layer manager with the [copilot] max_context_tokens/max_context_bytes budget."""
+    copilot_config = get_copilot_config(load_config(root_dir))
+    return get_layer_manager(
+        root_dir,
+        max_tokens=copilot_config.get("max_context_tokens"),
+        max_bytes=copilot_config.get("max_context_bytes"),
+    )
+
+
+def manage_layers(args, manager):
+    """status/load/unload/refresh of lazily loaded, budgeted context layers."""
+    if args.copilot_command == "status":
+        status = manager.get_context_status()
+        print(f"Loaded layers: {', '.join(status['loaded_layers'])}")
+        print(f"Available layers: {', '.join(status['available_layers'])}")
+        budget = f"{status['max_tokens']} tokens" if status["max_tokens"] is not None else "unlimited"
+        if status["max_bytes"] is not None:
+            budget += f", {_format_size(status['max_bytes'])}"
+        print(f"Budget: ~{status['used_tokens']} tokens ({_format_size(status['used_bytes'])}) used, {budget}")
+        for name, layer in status["layers"].items():
+            state = "loaded" if layer["loaded"] else "not loaded"
+            print(
+                f"  {name}: {state}, ~{layer['tokens']} tokens ({_format_size(layer['bytes'])}), "
+                f"hits={layer['hits']} misses={layer['misses']} evictions={layer['evictions']}"
+            )
+    elif args.copilot_command in ("load", "unload"):
+        if not getattr(args, "layer", None):
+            logging.error(f"Layer name required for {args.copilot_command} command")
+            return
+        if args.copilot_command == "load":
+            if manager.load_context_layer(args.layer):
+                logging.info(f"Loaded context layer: {args.layer}")
+                print(f"✅ Loaded {args.layer}; in memory: {', '.join(manager.loaded_layers)}")
             else:
-                logging.error("File path required for validate command")
-
-        elif args.copilot_command == "export":
-            format_type = getattr(args, "format", "json")
-            layers = getattr(args, "layers", None)
-            if layers:
-                layers = layers.split(",")
-
-            exported = manager.export_context(layers, format_type)
-
-            output_file = getattr(args, "output", None)
-            if output_file:
-                with open(output_file, "w", encoding="utf-8") as f:
-                    f.write(exported)
-                logging.info(f"Exported context to {output_file}")
-            else:
-                print(exported)
-
+                logging.error(f"Failed to load context layer: {args.layer}")
+        elif manager.unload_context_layer(args.layer):
+            logging.info(f"Unloaded context layer: {args.layer}")
+            print(f"✅ Unloaded {args.layer}")
         else:
-            logging.error(f"Unknown copilot command: {args.copilot_command}")
-
-        manager.close()
-
-    except Exception as e:
-        logging.error(f"Copilot command failed: {e}")
-        raise 
\ No newline at end of file
+            logging.error(f"Failed to unload context layer: {args.layer}")
+    elif args.copilot_command == "refresh":
+        refreshed = manager.refresh_changed()
+        print(f"Context layers reloaded: {', '.join(refreshed) or 'none'}")
+        index = get_suggestion_index(args.root_dir)
+        changed = index.refresh(manager)
+        if changed:
+            index.save()
+        print(f"Suggestion index: {len(index)} entries, re-indexed layers: {', '.join(changed) or 'none'}")
+
+
+def validate(args, manager):
+    """Impact of a change from the precomputed reverse import/call graph."""
+    if not getattr(args, "file_path", None):
+        logging.error("File path required for validate command")
+        return
+    # A rebuild takes struct.json from the layer that lists it, if any
+    graph = get_graph(args.root_dir, load_struct=lambda: manager.get_source("struct.json"))
+    if graph is None:
+        logging.error("struct.json not found; run `parse` first")
+        return
+    result = validate_change(graph, args.file_path, getattr(args, "change_type", "edit"))
+
+    if result["valid"]:
+        print("✓ Validation passed")
+    else:
+        print("✗ Validation failed")
+
+    if result["warnings"]:
+        print("Warnings:")
+        for warning in result["warnings"]:
+            print(f"  - {warning}")
+
+    if result["errors"]:
+        print("Errors:")
+        for error in result["errors"]:
+            print(f"  - {error}")
+
+
+def init(args, manager):
+    """Write data/copilot_init.json from the template, or with the default layers."""
+    config_path = Path(args.root_dir) / COPILOT_CONFIG
+    if config_path.exists() and not args.force:
+        logging.info(f"Copilot already initialized at {config_path}")
+        return
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    template_path = Path(__file__).parent.parent.parent / "templates" / "copilot_init.json"
+    if template_path.exists():
+        shutil.copy(template_path, config_path)
+    else:
+        with config_path.open("w", encoding="utf-8") as f:
+            json.dump({"context_layers": DEFAULT_LAYERS}, f, indent=2)
+    manager.refresh_changed()
+    logging.info(f"Initialized copilot configuration at {config_path}")
+
+
+def export(args, manager):
+    """Serialize layers (all, or --layers) as JSON or YAML."""
+    layers = args.layers.split(",") if getattr(args, "layers", None) else None
+    try:
+        exported = manager.export_context(layers, getattr(args, "format", "json"))
+    except (ValueError, RuntimeError) as e:
+        logging.error(f"Export failed: {e}")
+        return
+    output_file = getattr(args, "output", None)
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(exported)
+        logging.info(f"Exported context to {output_file}")
+    else:
+        print(exported)
+
+
+def copilot(args, layer_manager=None):
+    """Copilot integration and context management.
+
+    Every subcommand works on one ContextLayerManager. The daemon passes its
+    long-lived one; a one-shot process gets a fresh manager, so load/unload
+    there would be forgotten on exit and are refused.
+    """
+    if layer_manager is None and args.copilot_command in RESIDENT_COMMANDS:
+        logging.error(
+            f"copilot {args.copilot_command} needs a running daemon (`llmstruct daemon start {args.root_dir}`); "
+            "layers loaded by a one-shot command are dropped when it exits"
+        )
+        return
+    manager = layer_manager or create_layer_manager(args.root_dir)
+    if args.copilot_command == "suggest":
+        suggest(args, manager)
+    elif args.copilot_command in LAYER_COMMANDS:
+        manage_layers(args, manager)
+    elif args.copilot_command == "validate":
+        validate(args, manager)
+    elif args.copilot_command == "init":
+        init(args, manager)
+    elif args.copilot_command == "export":
+        export(args, manager)
+    else:
+        logging.error(f"Unknown copilot command: {args.copilot_command}")
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from llmstruct.daemon import LLMStructDaemon, get_socket_path, ping, send_request
+
+def daemon(args):
+    """Start, stop or inspect the LLMStruct daemon."""
+    root_dir = os.path.abspath(args.root_dir)
+    socket_path = args.socket or get_socket_path(root_dir)
+
+    if args.daemon_action == "start":
+        if ping(socket_path) is not None:
+            print(f"⚠️ Daemon already running on {socket_path}")
+            return
+        if args.background:
+            log_path = Path(root_dir) / ".llmstruct_daemon.log"
+            with log_path.open("a", encoding="utf-8") as log_file:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "llmstruct.cli", "daemon", "start", root_dir, "--socket", socket_path],
+                    cwd=root_dir,
+                    stdout=log_file,
+                    stderr=log_file,
+                    start_new_session=True,
+                )
+            print(f"✅ Daemon started in background (PID: {process.pid}), log: {log_path}")
+            return
+        print(f"🚀 Starting daemon on {socket_path}. Press Ctrl+C to stop")
+        try:
+            asyncio.run(LLMStructDaemon(root_dir, socket_path).serve())
+        except KeyboardInterrupt:
+            print("\n🛑 Daemon stopped")
+
+    elif args.daemon_action == "status":
+        status = ping(socket_path)
+        if status is None:
+            print("❌ Daemon Status: STOPPED")
+            return
+        print("✅ Daemon Status: RUNNING")
+        print(f"   PID: {status['pid']}")
+        print(f"   Root: {status['root_dir']}")
+        print(f"   Uptime: {status['uptime']:.0f}s")
+        print(f"   Requests served: {status['requests_served']}")
+        print(f"   Parse states: {status['parse_states']}")
+        print(f"   Cached contexts: {status['cached_contexts']}")
+        for model, stats in status.get("ollama_models", {}).items():
+            print(
+                f"   Ollama {model}: {stats['requests']} requests, {stats['cold_loads']} loads, "
+                f"last load {stats['last_load_seconds']:.2f}s"
+            )
+        for provider, stats in status.get("prefix_cache", {}).items():
+            print(f"   Prefix cache {provider}: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})")
+        semantic = status.get("semantic_cache")
+        if semantic:
+            print(
+                f"   Semantic cache: {semantic['entries']} entries, {semantic['hits']} hits "
+                f"({semantic['hit_rate']:.0%}), {semantic['avg_lookup_ms']:.2f} ms/lookup"
+            )
+        coalescing = status.get("coalescing")
+        if coalescing:
+            print(
+                f"   Coalescing: {coalescing['requests']} queries, {coalescing['provider_calls']} provider calls, "
+                f"{coalescing['coalesced']} coalesced ({coalescing['coalesced_rate']:.0%}), "
+                f"{coalescing['in_flight']} in flight"
+            )
+        for backend, stats in status.get("router", {}).items():
+            latency = stats["ewma_latency_seconds"]
+            latency = f"{latency:.2f}s" if latency is not None else "n/a"
+            print(
+                f"   Router {backend}: chosen {stats['chosen']}, {stats['requests']} requests, "
+                f"{stats['errors']} errors ({stats['error_rate']:.0%} recent), latency {latency} "
+                f"(x{stats['latency_ratio']:.2f} of predicted), {stats['in_flight']} in flight"
+            )
+        for url, host in status.get("ollama_hosts", {}).items():
+            state = "healthy" if host["healthy"] else "ejected"
+            loaded = ", ".join(host["loaded_models"]) or "none"
+            print(
+                f"   Ollama host {url}: {state}, {host['outstanding']} outstanding, {host['requests']} requests, "
+                f"{host['failures']} failures, {host['ejections']} ejections, loaded: {loaded}"
+            )
+
+    elif args.daemon_action == "stop":
+        response = send_request(socket_path, {"command": "shutdown"}, timeout=5)
+        if response is None:
+            print("⚠️ Daemon is not running")
+        else:
+            print(response.get("output", "").strip() or "✅ Daemon stopped")
@@ -0,0 +1,25 @@
+import json
+import logging
+from llmstruct.dep_graph import get_graph, MODULES
+
+def deps(args):
+    """Who depends on a file or function (--reverse, default) or what it depends on (--forward)."""
+    graph = get_graph(args.root_dir, args.struct)
+    if graph is None:
+        logging.error(f"{args.struct} not found; run `parse` first")
+        return
+    kind, node = graph.node_key(args.target)
+    if kind == MODULES and not graph.has_module(node):
+        logging.error(f"{node} is not in {args.struct}")
+        return
+    lookup = graph.dependencies if args.forward else graph.dependents
+    nodes = lookup(node, kind, transitive=args.transitive)
+    if args.format == "json":
+        print(json.dumps({"target": node, "kind": kind, "forward": args.forward,
+                          "transitive": args.transitive, "nodes": nodes}, indent=2))
+        return
+    relation = "Dependencies of" if args.forward else "Dependents of"
+    scope = " (transitive)" if args.transitive else ""
+    print(f"{relation} {node}{scope}: {len(nodes)}")
+    for item in nodes:
+        print(f"  {item}")
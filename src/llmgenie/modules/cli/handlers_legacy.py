@@ -1,5 +1,7 @@
+import asyncio
 import os
 import logging
+import signal
 import json
 import re
 import time
@@ -8,7 +10,11 @@ from llmstruct import LLMClient
 from llmstruct.cache import JSONCache
 from llmstruct.generators.json_generator import get_folder_structure
 from llmstruct.self_run import attach_to_llm_request
-from llmstruct.modules.cli.utils import load_gitignore, read_file_content, write_to_file
+from llmstruct.modules.cli.utils import (
+    load_gitignore, read_file_content, write_to_file, load_config, get_rules_config,
+    get_context_config
+)
+from llmstruct.modules.cli.repl import AsyncLineReader, BackgroundQueries
 
 # LEGACY: Архивная реализация интерактивного CLI (используется только как fallback)
 async def interactive_legacy(args):
@@ -16,6 +22,9 @@ async def interactive_legacy(args):
     client = LLMClient()
     cache = JSONCache() if args.use_cache else None
     root_dir = os.path.abspath(args.root_dir)
+    config = load_config(root_dir)
+    client.configure_rules(get_rules_config(config), root_dir)
+    client.configure_context(get_context_config(config))
     context_path = args.context
     if not Path(context_path).exists():
         logging.warning(
@@ -28,14 +37,82 @@ async def interactive_legacy(args):
         "files/folders, '/queue run' to process command queue, '/cache stats' for "
         "cache info, '/auto-update' for struct.json auto-update, '/struct status' "
         "for struct info, '/workflow trigger' for workflow events, or enter "
-        "/commands to scan/write."
+        "/commands to scan/write. Prompts run in the background: '/jobs' lists "
+        "them, '/cancel [N]' or Ctrl-C cancels one."
     )
+    context_json = os.path.join(root_dir, "data", "init.json")
+    context_path_to_use = (
+        context_json if os.path.exists(context_json) else context_path
+    )
+    # Load the context (and warm the Ollama model) while the first prompt is being typed
+    warm_up = asyncio.create_task(
+        client.warm_up(context_path_to_use, args.mode, args.model, args.artifact_ids)
+    )
+    reader = AsyncLineReader("Prompt> ")
+
+    def report(tag, label, task, elapsed):
+        if task.cancelled():
+            reader.echo(f"[#{tag}] ⚠️ Cancelled after {elapsed:.1f}s")
+        elif task.exception() is not None:
+            logging.error(f"LLM query failed: {task.exception()}")
+            reader.echo(f"[#{tag}] Query failed: {task.exception()}")
+        elif task.result():
+            reader.echo(f"[#{tag}] LLM Response ({elapsed:.1f}s):\n{task.result()}")
+        else:
+            reader.echo(f"[#{tag}] Query failed, please try again")
+
+    async def answer(prompt):
+        await asyncio.shield(warm_up)
+        prompt_with_context = await asyncio.to_thread(
+            attach_to_llm_request, context_path_to_use, prompt, cache=cache
+        )
+        return await client.query(
+            prompt=prompt_with_context,
+            context_path=context_path_to_use,
+            mode=args.mode,
+            model=args.model,
+            artifact_ids=args.artifact_ids,
+        )
+
+    queries = BackgroundQueries(report)
+
+    def interrupt():
+        # Ctrl-C cancels the latest in-flight request; with nothing running it quits
+        tag = queries.cancel()
+        if tag is None:
+            reader.stop()
+        else:
+            reader.echo(f"[#{tag}] Cancelling...")
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, interrupt)
+    except (NotImplementedError, RuntimeError):
+        pass
+    reader.start()
+    try:
+        await _repl_loop(reader, queries, answer, root_dir)
+        if queries:
+            print(f"Waiting for {len(queries)} running queries (Ctrl-C cancels)...")
+            await queries.wait()
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+        warm_up.cancel()
+        if cache:
+            cache.close()
+        await client.close()
+
+async def _repl_loop(reader, queries, answer, root_dir):
     while True:
-        user_input = input("Prompt> ").strip()
-        if user_input.lower() == "exit":
-            if cache:
-                cache.close()
+        user_input = await reader.readline()
+        if user_input is None or user_input.strip().lower() == "exit":
             break
+        user_input = user_input.strip()
+        if not user_input:
+            continue
         elif user_input.startswith("/"):
             cmd, *args_list = user_input[1:].split(maxsplit=1)
             args_str = args_list[0] if args_list else ""
@@ -121,29 +198,22 @@ async def interactive_legacy(args):
                 else:
                     print(f"Path {full_path} does not exist")
                 continue
+            elif cmd == "jobs":
+                jobs = queries.jobs()
+                if not jobs:
+                    print("No queries running")
+                for tag, label, elapsed in jobs:
+                    print(f"[#{tag}] {elapsed:.1f}s  {label[:60]}")
+                continue
+            elif cmd == "cancel":
+                target = args_str.strip().lstrip("#")
+                if target and not target.isdigit():
+                    print("Usage: /cancel [N]")
+                    continue
+                tag = queries.cancel(int(target) if target else None)
+                print(f"[#{tag}] Cancelling..." if tag else "No matching query running")
+                continue
             # ... остальные команды (queue, cache, auto-update, struct, workflow) реализуются аналогично ...
         else:
-            prompt = user_input
-            context_json = os.path.join(root_dir, "data", "init.json")
-            context_path_to_use = (
-                context_json if os.path.exists(context_json) else context_path
-            )
-            prompt_with_context = attach_to_llm_request(
-                context_path_to_use, prompt, cache=cache
-            )
-            try:
-                result = await client.query(
-                    prompt=prompt_with_context,
-                    context_path=context_path_to_use,
-                    mode=args.mode,
-                    model=args.model,
-                    artifact_ids=args.artifact_ids,
-                )
-                if result:
-                    print(f"LLM Response:\n{result}")
-                else:
-                    print("Query failed, please try again")
-            except Exception as e:
-                logging.error(f"LLM query failed: {e}")
-                print(f"Query failed: {e}")
-                continue 
\ No newline at end of file
+            tag = queries.submit(answer(user_input), user_input)
+            print(f"[#{tag}] Started")
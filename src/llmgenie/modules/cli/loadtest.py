@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import List, Optional
+from llmstruct import LLMClient
+from llmstruct.modules.cli.utils import (
+    load_config, get_ollama_config, get_semantic_cache_config, get_router_config,
+    get_rules_config, get_context_config
+)
+from llmstruct.stub_provider import StubProvider, parse_latency_specs
+
+PERCENTILES = (50, 90, 95, 99)
+
+def _percentile(ordered: List[float], pct: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * pct / 100)) - 1))]
+
+def summarize(samples: List[tuple], elapsed: float, dropped: int = 0) -> dict:
+    """samples: (start offset, latency seconds, ok) per finished request."""
+    latencies = sorted(latency for _, latency, ok in samples if ok)
+    errors = sum(1 for _, _, ok in samples if not ok) + dropped
+    total = len(samples) + dropped
+    result = {
+        "requests": total,
+        "ok": len(latencies),
+        "errors": errors,
+        "dropped": dropped,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_qps": len(latencies) / elapsed if elapsed else 0.0,
+        "elapsed_seconds": elapsed,
+        "latency_seconds": {
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "max": latencies[-1] if latencies else None,
+            **{f"p{p}": _percentile(latencies, p) for p in PERCENTILES},
+        },
+    }
+    # Per-second buckets so capacity and latency collapse can be charted over the run
+    timeline = {}
+    for start, latency, ok in samples:
+        bucket = timeline.setdefault(int(start), {"second": int(start), "ok": 0, "errors": 0, "latencies": []})
+        if ok:
+            bucket["ok"] += 1
+            bucket["latencies"].append(latency)
+        else:
+            bucket["errors"] += 1
+    result["timeline"] = []
+    for second in sorted(timeline):
+        bucket = timeline[second]
+        ordered = sorted(bucket.pop("latencies"))
+        bucket["p50"] = _percentile(ordered, 50)
+        bucket["p99"] = _percentile(ordered, 99)
+        result["timeline"].append(bucket)
+    return result
+
+async def _one(client, args, mode, i, scheduled, t0, samples):
+    """Run one query. Latency counts from the scheduled start, so a backed-up client shows up as latency."""
+    ok = False
+    try:
+        result = await client.query(
+            f"{args.prompt} (request {i})", args.context, mode=mode, model=args.model,
+        )
+        ok = bool(result)
+    except Exception as e:
+        logging.debug(f"Load test request {i} failed: {e}")
+    samples.append((scheduled - t0, time.perf_counter() - scheduled, ok))
+
+async def run_fixed_rate(client, args, mode) -> dict:
+    """Open loop: start requests at --rate per second regardless of how many are still running."""
+    samples, tasks = [], set()
+    dropped = 0
+    interval = 1.0 / args.rate
+    t0 = time.perf_counter()
+    i = 0
+    while True:
+        scheduled = t0 + i * interval
+        if scheduled - t0 >= args.duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= args.max_in_flight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(_one(client, args, mode, i, scheduled, t0, samples))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        i += 1
+    if tasks:
+        await asyncio.wait(tasks)
+    return summarize(samples, time.perf_counter() - t0, dropped)
+
+async def run_fixed_concurrency(client, args, mode) -> dict:
+    """Closed loop: --concurrency workers each send the next request as soon as the previous returns."""
+    samples = []
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    counter = iter(range(10 ** 9))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await _one(client, args, mode, next(counter), time.perf_counter(), t0, samples)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(samples, time.perf_counter() - t0)
+
+def _print_summary(mode, result):
+    latency = result["latency_seconds"]
+
+    def ms(value):
+        return f"{value * 1000:.1f}ms" if value is not None else "-"
+
+    print(
+        f"{mode:<10} {result['throughput_qps']:8.1f} qps  ok={result['ok']} errors={result['errors']} "
+        f"({result['error_rate']:.1%})  p50={ms(latency['p50'])} p95={ms(latency['p95'])} "
+        f"p99={ms(latency['p99'])} max={ms(latency['max'])}"
+    )
+
+async def loadtest(args):
+    """Drive LLMClient.query at a fixed rate or concurrency and report throughput and latency per backend."""
+    if not args.rate and not args.concurrency:
+        args.concurrency = 10
+    if args.context and not Path(args.context).exists():
+        logging.error(f"Context file {args.context} does not exist")
+        return
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    stub = None
+    if args.provider == "stub":
+        stub = StubProvider(parse_latency_specs(args.latency), args.error_rate, seed=0)
+        await stub.start()
+    config = load_config(".")
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "provider": args.provider,
+            "load": {"rate": args.rate} if args.rate else {"concurrency": args.concurrency},
+            "duration": args.duration,
+            "latency": args.latency if stub else None,
+            "context": args.context,
+        },
+        "backends": {},
+    }
+    try:
+        for mode in backends:
+            client = LLMClient()
+            client.ollama_pool.configure(get_ollama_config(config))
+            client.configure_semantic_cache(get_semantic_cache_config(config))
+            client.configure_router(get_router_config(config))
+            client.configure_rules(get_rules_config(config))
+            client.configure_context(get_context_config(config))
+            client.retry_count = args.retries
+            if stub:
+                stub.configure_client(client)
+            try:
+                if args.warmup:
+                    await client.query(f"{args.prompt} (warm-up)", args.context, mode=mode, model=args.model)
+                run = run_fixed_rate if args.rate else run_fixed_concurrency
+                result = await run(client, args, mode)
+                result["coalesced"] = client.single_flight.coalesced
+                if mode == "auto":
+                    result["router"] = client.router.stats_dict()
+            finally:
+                await client.close()
+            report["backends"][mode] = result
+            if args.format == "text":
+                _print_summary(mode, result)
+    finally:
+        if stub:
+            await stub.stop()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        if args.format == "text":
+            print(f"✅ Results saved to {args.output}")
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,61 @@
+import json
+import logging
+from llmstruct.event_log import get_event_log, parse_time, read_legacy, LOG_DIR, MAX_SEGMENT_BYTES
+from llmstruct.modules.cli.utils import load_config, get_event_log_config
+
+def _open_log(args):
+    config = get_event_log_config(load_config(args.root_dir))
+    return get_event_log(
+        args.root_dir, config.get("dir", LOG_DIR), config.get("max_segment_bytes", MAX_SEGMENT_BYTES)
+    )
+
+def _parse_fields(pairs):
+    """["author=@me", "text=done"] -> {"author": "@me", "text": "done"}; values that parse as JSON are kept typed."""
+    fields = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Event field must be name=value: {pair}")
+        try:
+            fields[name.strip()] = json.loads(value)
+        except ValueError:
+            fields[name.strip()] = value
+    return fields
+
+def _print_event(event):
+    data = event.get("data") or {}
+    text = data.get("text") or data.get("event") or ""
+    rest = {k: v for k, v in data.items() if k not in ("text", "event")}
+    line = f"{event['ts']}  {event['type']:<16} {text}"
+    if rest:
+        line += f"  {json.dumps(rest, ensure_ascii=False)}"
+    print(line.rstrip())
+
+def log(args):
+    """Append to, query, import into or summarize the indexed event log."""
+    event_log = _open_log(args)
+    try:
+        if args.log_action == "append":
+            if not args.type:
+                logging.error("log append needs --type")
+                return
+            event = event_log.append(args.type[0], _parse_fields(args.field))
+            print(json.dumps(event, ensure_ascii=False))
+        elif args.log_action == "query":
+            since = parse_time(args.since) if args.since else None
+            until = parse_time(args.until) if args.until else None
+            for event in event_log.query(since, until, args.type, args.limit):
+                if args.format == "json":
+                    print(json.dumps(event, ensure_ascii=False))
+                else:
+                    _print_event(event)
+        elif args.log_action == "import":
+            for path in args.paths:
+                count = event_log.import_events(read_legacy(path))
+                print(f"Imported {count} events from {path}")
+        elif args.log_action == "stats":
+            print(json.dumps(event_log.stats(), indent=2, ensure_ascii=False))
+    except (ValueError, OSError) as e:
+        logging.error(f"log {args.log_action} failed: {e}")
+    finally:
+        event_log.close_files()
@@ -1,16 +1,15 @@
 import os
-import json
 import logging
 from pathlib import Path
-from llmstruct.modules.cli.utils import load_config
-from llmstruct.generators.json_generator import generate_json
+from typing import Optional
+from llmstruct.modules.cli.utils import load_config, load_gitignore, atomic_write_json
 from llmstruct.cache import JSONCache
+from llmstruct.incremental import IncrementalParser, generate, module_key
+from llmstruct.dep_graph import write_graph_index
+from llmstruct.struct_io import write_struct
 
-def parse(args):
-    """Parse codebase and generate struct.json."""
-    root_dir = os.path.abspath(args.root_dir)
-    config = load_config(root_dir)
-
+def get_parse_options(args, root_dir: str, config: dict) -> dict:
+    """Build generate() options (generate_json keyword arguments plus hashing settings) from CLI args and llmstruct.toml."""
     goals = args.goals if args.goals is not None else config.get("goals", [])
     if not goals:
         logging.warning(
@@ -26,68 +25,176 @@ def parse(args):
     exclude_patterns = (args.exclude or parsing_config.get("exclude_patterns") or cli_config.get("exclude_patterns"))
     include_ranges = args.include_ranges or parsing_config.get("include_ranges") or cli_config.get("include_ranges", False)
     include_hashes = args.include_hashes or parsing_config.get("include_hashes") or cli_config.get("include_hashes", False)
+    hash_algorithm = getattr(args, "hash_algorithm", None) or parsing_config.get("hash_algorithm", "sha256")
+    hash_workers = getattr(args, "hash_workers", None) or parsing_config.get("hash_workers")
     use_gitignore = parsing_config.get("use_gitignore", cli_config.get("use_gitignore", True))
     exclude_dirs = (args.exclude_dir or parsing_config.get("exclude_dirs") or cli_config.get("exclude_dirs", []))
     include_dirs = args.include_dir or []
 
-    gitignore_patterns = load_config(root_dir) if use_gitignore else []
+    gitignore_patterns = load_gitignore(root_dir) if use_gitignore else []
 
     # Комментарий: include_dirs пока не используется в генераторе, но можно добавить фильтрацию по ним при необходимости
 
-    try:
-        struct_data = generate_json(
-            root_dir,
-            include_patterns=include_patterns,
-            exclude_patterns=exclude_patterns,
-            gitignore_patterns=gitignore_patterns,
-            include_ranges=include_ranges,
-            include_hashes=include_hashes,
-            goals=goals,
-            exclude_dirs=exclude_dirs,
-            include_dirs=include_dirs,
-        )
-        with Path(args.output).open("w", encoding="utf-8") as f:
-            json.dump(struct_data, f, indent=2)
-        logging.info(f"Generated {args.output}")
-        # Cache the generated JSON
-        if args.use_cache:
-            cache = JSONCache()
-            cache.cache_json(
-                args.output,
-                args.output,
-                summary="Generated struct.json",
-                tags=["struct"],
-            )
-            cache.close()
-        # --- Модульный индекс ---
-        if getattr(args, 'modular_index', False):
-            index_root = Path(root_dir) / ".llmstruct_index"
-            for module in struct_data.get("modules", []):
-                mod_path = Path(module["path"])
-                mod_dir = index_root / mod_path.parent
-                mod_dir.mkdir(parents=True, exist_ok=True)
-                # Сохраняем struct.json для модуля
-                struct_path = mod_dir / (mod_path.stem + ".struct.json")
-                with struct_path.open("w", encoding="utf-8") as f:
-                    json.dump(module, f, indent=2, ensure_ascii=False)
-                # Сохраняем ast.json (только AST-хеши и исходники функций)
-                ast_data = {
-                    "module": module["path"],
-                    "functions": [
-                        {
-                            "name": func["name"],
-                            "ast_hash": func.get("ast_hash"),
-                            "source": func.get("source"),
-                            "start_line": func.get("start_line"),
-                            "end_line": func.get("end_line"),
-                        }
-                        for func in module.get("functions", [])
-                    ],
+    return {
+        "include_patterns": include_patterns,
+        "exclude_patterns": exclude_patterns,
+        "gitignore_patterns": gitignore_patterns,
+        "include_ranges": include_ranges,
+        "include_hashes": include_hashes,
+        "hash_algorithm": hash_algorithm,
+        "hash_workers": hash_workers,
+        "goals": goals,
+        "exclude_dirs": exclude_dirs,
+        "include_dirs": include_dirs,
+    }
+
+def write_modular_index(root_dir: str, modules: list) -> None:
+    """Save struct and AST index per module in .llmstruct_index/."""
+    index_root = Path(root_dir) / ".llmstruct_index"
+    for module in modules:
+        mod_path = Path(module_key(root_dir, module["path"]))
+        mod_dir = index_root / mod_path.parent
+        mod_dir.mkdir(parents=True, exist_ok=True)
+        # Сохраняем struct.json для модуля
+        struct_path = mod_dir / (mod_path.stem + ".struct.json")
+        atomic_write_json(struct_path, module, indent=2, ensure_ascii=False)
+        # Сохраняем ast.json (только AST-хеши и исходники функций)
+        ast_data = {
+            "module": module["path"],
+            "functions": [
+                {
+                    "name": func["name"],
+                    "ast_hash": func.get("ast_hash"),
+                    "source": func.get("source"),
+                    "start_line": func.get("start_line"),
+                    "end_line": func.get("end_line"),
                 }
-                ast_path = mod_dir / (mod_path.stem + ".ast.json")
-                with ast_path.open("w", encoding="utf-8") as f:
-                    json.dump(ast_data, f, indent=2, ensure_ascii=False)
-            logging.info(f"Модульный индекс сохранён в {index_root}")
+                for func in module.get("functions", [])
+            ],
+        }
+        ast_path = mod_dir / (mod_path.stem + ".ast.json")
+        atomic_write_json(ast_path, ast_data, indent=2, ensure_ascii=False)
+    logging.info(f"Модульный индекс сохранён в {index_root}")
+
+def remove_modular_index(root_dir: str, paths: list) -> None:
+    """Drop index entries of modules that no longer exist."""
+    index_root = Path(root_dir) / ".llmstruct_index"
+    for path in paths:
+        mod_path = Path(path)
+        for suffix in (".struct.json", ".ast.json"):
+            entry = index_root / mod_path.parent / (mod_path.stem + suffix)
+            if entry.exists():
+                entry.unlink()
+
+def write_duplicate_index(root_dir: str, struct_data: dict) -> None:
+    """Save {ast_hash: ["path::function", ...]} for hashes shared by several functions."""
+    by_hash = {}
+    for module in struct_data.get("modules", []):
+        path = module_key(root_dir, module.get("path", ""))
+        for func in module.get("functions", []):
+            ast_hash = func.get("ast_hash")
+            if ast_hash:
+                by_hash.setdefault(ast_hash, []).append(f"{path}::{func.get('name')}")
+    duplicates = {h: sorted(locations) for h, locations in by_hash.items() if len(locations) > 1}
+    atomic_write_json(Path(root_dir) / ".llmstruct_index" / "duplicates.json", duplicates, indent=2)
+
+def write_parse_outputs(args, root_dir: str, struct_data: dict, changed=None, removed=None) -> None:
+    """Write struct.json, cache entry, dependency graph, duplicate index and modular index.
+
+    `changed`/`removed` limit the modular index update to touched modules;
+    None means everything was regenerated.
+    """
+    pretty = getattr(args, "pretty", False) or load_config(root_dir).get("parsing", {}).get("pretty_json", False)
+    stats = write_struct(args.output, struct_data, pretty=pretty)
+    logging.info(
+        f"Generated {args.output} ({stats['bytes'] / 1024:.0f} KB, {stats['modules']} modules, "
+        f"{stats['seconds']:.2f}s, {stats['backend']})"
+    )
+    # Cache the generated JSON
+    if args.use_cache:
+        cache = JSONCache()
+        cache.cache_json(
+            args.output,
+            args.output,
+            summary="Generated struct.json",
+            tags=["struct"],
+        )
+        cache.close()
+    # Import/call graph with reverse edges for copilot validate and deps
+    write_graph_index(root_dir, struct_data)
+    # Shared AST hashes span modules, so rebuilt from the whole tree on every pass
+    write_duplicate_index(root_dir, struct_data)
+    # --- Модульный индекс ---
+    if getattr(args, 'modular_index', False):
+        if changed is not None:
+            changed_set = set(changed)
+            modules = [
+                module for module in struct_data.get("modules", [])
+                if module_key(root_dir, module["path"]) in changed_set
+            ]
+            remove_modular_index(root_dir, removed or [])
+        else:
+            modules = struct_data.get("modules", [])
+        write_modular_index(root_dir, modules)
+
+def watch(args, root_dir: str, incremental: IncrementalParser) -> None:
+    """Keep struct.json and indexes fresh until interrupted."""
+    from llmstruct.watcher import collect_changes, create_watcher
+    watcher = create_watcher(root_dir, incremental.options, polling_interval=args.poll_interval)
+    print(f"👀 Watching {root_dir} for changes. Press Ctrl+C to stop")
+    try:
+        while True:
+            paths = collect_changes(watcher, debounce=args.debounce)
+            if not paths:
+                continue
+            try:
+                struct_data, changed, removed = incremental.update(
+                    None if "*" in paths else paths
+                )
+                if not changed and not removed:
+                    continue
+                write_parse_outputs(args, root_dir, struct_data, changed, removed)
+                incremental.save_fingerprints()
+                print(f"🔄 Updated {args.output}: {len(changed)} changed, {len(removed)} removed")
+            except Exception as e:
+                logging.error(f"Watch update failed: {e}")
+    except KeyboardInterrupt:
+        print("\n🛑 Watch stopped")
+    finally:
+        watcher.close()
+
+def parse(args, parsers: Optional[dict] = None):
+    """Parse codebase and generate struct.json.
+
+    With --incremental only modules whose files changed since the previous run
+    are re-parsed; --watch does the same continuously. `parsers` lets a long-lived caller (the daemon) keep
+    IncrementalParser state in memory between calls.
+    """
+    root_dir = os.path.abspath(args.root_dir)
+    config = load_config(root_dir)
+    options = get_parse_options(args, root_dir, config)
+
+    try:
+        incremental = None
+        changed = removed = None
+        if getattr(args, "incremental", False) or getattr(args, "watch", False):
+            key = (root_dir, os.path.abspath(args.output))
+            incremental = parsers.get(key) if parsers is not None else None
+            if incremental is None or incremental.options != options:
+                incremental = IncrementalParser(root_dir, args.output, options)
+                if parsers is not None:
+                    parsers[key] = incremental
+            struct_data, changed, removed = incremental.update()
+        else:
+            struct_data = generate(root_dir, options)
+        if incremental is not None and not changed and not removed:
+            logging.info(f"{args.output} is up to date")
+        else:
+            write_parse_outputs(args, root_dir, struct_data, changed, removed)
+            if incremental is not None:
+                incremental.save_fingerprints()
     except Exception as e:
         logging.error(f"Failed to generate JSON: {e}")
-        raise 
\ No newline at end of file
+        raise
+    if getattr(args, "watch", False):
+        watch(args, root_dir, incremental)
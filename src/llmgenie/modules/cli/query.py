@@ -1,22 +1,76 @@
+import asyncio
 import json
 import logging
 from pathlib import Path
 from llmstruct.cache import JSONCache
 from llmstruct import LLMClient
+from llmstruct.modules.cli.utils import (
+    write_files_from_stream, load_config, get_ollama_config, get_semantic_cache_config,
+    get_context_config, get_router_config, get_rules_config
+)
+from llmstruct.retrieval import build_focused_context, DEFAULT_TOKEN_BUDGET, DEFAULT_TOP_K
+from llmstruct.rules_engine import RuleQuery
+from llmstruct.prompt_templates import TemplateError, get_template_collection, parse_vars
 import os
 
-def query(args):
-    """Query LLMs with prompt and context."""
+async def query(args, client=None):
+    """Query LLMs with prompt and context.
+
+    A long-lived caller (the daemon) may pass its own warm LLMClient.
+    Project files (llmstruct.toml, templates, docs) are read from args.root_dir,
+    default the working directory.
+    """
+    root_dir = getattr(args, "root_dir", None) or "."
     if not Path(args.context).exists():
         logging.error(f"Context file {args.context} does not exist")
         return
+    if getattr(args, "template", None):
+        try:
+            rendered = get_template_collection(root_dir).render(args.template, parse_vars(args.var))
+        except TemplateError as e:
+            logging.error(str(e))
+            return
+        args.prompt = f"{rendered}\n\n{args.prompt}" if args.prompt else rendered
+    if not args.prompt:
+        logging.error("Either --prompt or --template is required")
+        return
     
     cache = JSONCache() if args.use_cache else None
-    client = LLMClient()
+    config = load_config(root_dir)
+    owns_client = client is None
+    if owns_client:
+        client = LLMClient()
+        client.ollama_pool.configure(get_ollama_config(config))
+        client.configure_semantic_cache(get_semantic_cache_config(config))
+        client.configure_router(get_router_config(config))
+        client.configure_rules(get_rules_config(config), root_dir)
+        client.configure_context(get_context_config(config))
+    rules = RuleQuery(
+        getattr(args, "role", None), getattr(args, "scope", None), tuple(getattr(args, "rule", None) or ())
+    )
     
-    # Use context orchestrator if available and context mode is specified
+    # FOCUSED mode sends only the struct/doc chunks relevant to the prompt
     context_data = None
-    if hasattr(args, 'context_mode') and args.context_mode:
+    if getattr(args, "context_mode", None) == "FOCUSED":
+        try:
+            context_config = get_context_config(config)
+            # The index refresh re-reads changed modules and docs; keep it off the event loop
+            context_data = await asyncio.to_thread(
+                build_focused_context,
+                root_dir,
+                args.context,
+                args.prompt,
+                token_budget=context_config.get("focused_token_budget", DEFAULT_TOKEN_BUDGET),
+                top_k=context_config.get("focused_top_k", DEFAULT_TOP_K),
+                doc_sources=context_config.get("retrieval_sources"),
+            )
+            if context_data:
+                logging.info(f"Using {len(context_data['chunks'])} retrieved chunks as FOCUSED context")
+        except Exception as e:
+            logging.warning(f"Focused retrieval failed, using raw context file: {e}")
+
+    # Use context orchestrator if available and context mode is specified
+    if context_data is None and hasattr(args, 'context_mode') and args.context_mode:
         try:
             from llmstruct.context_orchestrator import create_context_orchestrator
             
@@ -37,21 +91,38 @@ def query(args):
             logging.warning(f"Failed to use context orchestrator: {e}")
     
     # Query with optimized or raw context
-    if context_data:
-        result = client.query_with_context(
+    if getattr(args, "write_files", False):
+        # Stream the response and write fenced files as soon as each one closes
+        response_text, written = await write_files_from_stream(
+            client.stream_query(
+                prompt=args.prompt,
+                context_path=args.context,
+                mode=args.mode,
+                model=args.model,
+                artifact_ids=args.artifact_ids,
+                rules=rules,
+            ),
+            base_dir=args.write_dir,
+        )
+        result = response_text or None
+        logging.info(f"Wrote {len(written)} files to {args.write_dir}")
+    elif context_data:
+        result = await client.query_with_context(
             prompt=args.prompt,
             context_data=context_data,
             mode=args.mode,
             model=args.model,
             artifact_ids=args.artifact_ids,
+            rules=rules,
         )
     else:
-        result = client.query(
+        result = await client.query(
             prompt=args.prompt,
             context_path=args.context,
             mode=args.mode,
             model=args.model,
             artifact_ids=args.artifact_ids,
+            rules=rules,
         )
     
     if result:
@@ -61,4 +132,6 @@ def query(args):
     else:
         logging.error("Query failed")
     if cache:
-        cache.close() 
\ No newline at end of file
+        cache.close()
+    if owns_client:
+        await client.close() 
\ No newline at end of file
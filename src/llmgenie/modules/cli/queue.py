@@ -0,0 +1,38 @@
+import os
+import logging
+from llmstruct import LLMClient
+from llmstruct.cache import JSONCache
+from llmstruct.modules.cli.utils import (
+    load_config, get_ollama_config, get_semantic_cache_config, get_router_config,
+    get_rules_config, get_context_config
+)
+from llmstruct.modules.commands.queue import process_cli_queue_enhanced
+
+async def queue(args, client=None, cache=None):
+    """Run data/cli_queue.json workflows.
+
+    A long-lived caller (the daemon) may pass its own warm LLMClient and cache.
+    """
+    root_dir = os.path.abspath(args.root_dir)
+    owns_client = client is None
+    owns_cache = cache is None and args.use_cache
+    if owns_client:
+        client = LLMClient()
+        config = load_config(root_dir)
+        client.ollama_pool.configure(get_ollama_config(config))
+        client.configure_semantic_cache(get_semantic_cache_config(config))
+        client.configure_router(get_router_config(config))
+        client.configure_rules(get_rules_config(config), root_dir)
+        client.configure_context(get_context_config(config))
+    if owns_cache:
+        cache = JSONCache()
+    try:
+        await process_cli_queue_enhanced(root_dir, args.context, args, cache, client)
+    except Exception as e:
+        logging.error(f"Queue run failed: {e}")
+        raise
+    finally:
+        if owns_cache:
+            cache.close()
+        if owns_client:
+            await client.close()
@@ -0,0 +1,106 @@
+import asyncio
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import readline  # noqa: F401 - line editing and history for input()
+    READLINE_AVAILABLE = True
+except ImportError:
+    READLINE_AVAILABLE = False
+
+class AsyncLineReader:
+    """Reads stdin lines in a daemon thread so the event loop keeps running while the user types.
+
+    A line is only requested when readline() is awaited, so the prompt appears
+    once per command. echo() prints above the prompt without losing typed input.
+    """
+
+    def __init__(self, prompt: str = "Prompt> "):
+        self.prompt = prompt
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wanted = threading.Event()
+        self._waiting = False
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        threading.Thread(target=self._run, name="repl-reader", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            try:
+                line = input(self.prompt)
+            except (EOFError, OSError):
+                line = None
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, line)
+            if line is None:
+                return
+
+    async def readline(self) -> Optional[str]:
+        """Next input line, or None on EOF/stop."""
+        self._waiting = True
+        self._wanted.set()
+        try:
+            return await self._queue.get()
+        finally:
+            self._waiting = False
+
+    def stop(self) -> None:
+        """Make the pending readline() return None."""
+        self._queue.put_nowait(None)
+
+    def echo(self, text: str) -> None:
+        if self._waiting and sys.stdout.isatty():
+            # Clear the prompt line, print, then redraw the prompt with what was typed so far
+            typed = readline.get_line_buffer() if READLINE_AVAILABLE else ""
+            sys.stdout.write(f"\r\x1b[K{text}\n{self.prompt}{typed}")
+            sys.stdout.flush()
+        else:
+            print(text)
+
+class BackgroundQueries:
+    """In-flight REPL requests, tagged #1, #2, ... in submission order."""
+
+    def __init__(self, on_done: Callable[[int, str, asyncio.Task, float], None]):
+        self._on_done = on_done
+        self._tasks: Dict[int, Tuple[asyncio.Task, str, float]] = {}
+        self._next_tag = 1
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, coro, label: str) -> int:
+        tag = self._next_tag
+        self._next_tag += 1
+        task = asyncio.create_task(coro)
+        started = time.perf_counter()
+        self._tasks[tag] = (task, label, started)
+        task.add_done_callback(lambda t: self._finished(tag, t))
+        return tag
+
+    def _finished(self, tag: int, task: asyncio.Task) -> None:
+        _, label, started = self._tasks.pop(tag)
+        self._on_done(tag, label, task, time.perf_counter() - started)
+
+    def cancel(self, tag: Optional[int] = None) -> Optional[int]:
+        """Cancel one request (the most recent by default). Returns its tag, or None if nothing matched."""
+        if tag is None:
+            tag = max(self._tasks, default=None)
+        entry = self._tasks.get(tag)
+        if entry is None:
+            return None
+        entry[0].cancel()
+        return tag
+
+    def jobs(self) -> List[Tuple[int, str, float]]:
+        now = time.perf_counter()
+        return [(tag, label, now - started) for tag, (_, label, started) in self._tasks.items()]
+
+    async def wait(self) -> None:
+        while self._tasks:
+            await asyncio.wait([task for task, _, _ in self._tasks.values()])
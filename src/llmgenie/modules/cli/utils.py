@@ -1,7 +1,19 @@
+import asyncio
+import fnmatch
+import json
 import logging
+import os
 import re
+import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+try:
+    import pathspec
+
+    PATHSPEC_AVAILABLE = True
+except ImportError:
+    PATHSPEC_AVAILABLE = False
 
 def load_gitignore(root_dir: str) -> List[str]:
     """Load and normalize patterns from .gitignore."""
@@ -19,6 +31,23 @@ def load_gitignore(root_dir: str) -> List[str]:
             logging.error(f"Failed to read .gitignore: {e}")
     return patterns
 
+def gitignore_matcher(root_dir: str) -> Callable[[str, bool], bool]:
+    """is_ignored(root-relative path, is_dir) for the root .gitignore.
+
+    With pathspec git's rules apply (negation, anchoring, directory-only
+    patterns); without it negations are skipped and the other patterns are
+    fnmatch'ed against the name and the path.
+    """
+    patterns = load_gitignore(root_dir)
+    if PATHSPEC_AVAILABLE:
+        spec = pathspec.GitIgnoreSpec.from_lines(patterns)
+        return lambda rel_path, is_dir: spec.match_file(f"{rel_path}/" if is_dir else rel_path)
+    simple = [p.strip("/") for p in patterns if not p.startswith("!")]
+    def ignored(rel_path: str, is_dir: bool) -> bool:
+        name = rel_path.rsplit("/", 1)[-1]
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in simple)
+    return ignored
+
 def load_config(root_dir: str) -> dict:
     """Load settings from llmstruct.toml or return empty dict."""
     import toml
@@ -53,15 +82,36 @@ def write_to_file(content: str, filename: str, base_dir: str = "./tmp") -> str:
     file_path = base_path / safe_filename
     if file_path.exists():
         logging.warning(f"File {file_path} already exists, overwriting")
+    tmp_path = None
     try:
-        with file_path.open("w", encoding="utf-8") as f:
+        fd, tmp_path = tempfile.mkstemp(dir=base_path, prefix=f".{safe_filename}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
             f.write(content)
+        os.chmod(tmp_path, file_path.stat().st_mode & 0o777 if file_path.exists() else 0o644)
+        os.replace(tmp_path, file_path)
         logging.info(f"Wrote content to {file_path}")
         return str(file_path)
     except Exception as e:
         logging.error(f"Failed to write to {file_path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
         return ""
 
+def atomic_write_json(path, data, indent: Optional[int] = None, ensure_ascii: bool = True) -> None:
+    """Write JSON to a temp file in the same directory and os.replace() it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=ensure_ascii)
+        os.chmod(tmp_path, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
 def parse_files_from_response(response: str) -> List[tuple[str, str]]:
     """Extract filenames and content from LLM response (e.g., ```filename\ncontent```)."""
     files = []
@@ -71,6 +121,79 @@ def parse_files_from_response(response: str) -> List[tuple[str, str]]:
         files.append((filename.strip(), content.strip()))
     return files
 
+FENCE_OPEN_RE = re.compile(r"```(\S+?)\n")
+
+class FencedBlockParser:
+    """Incremental version of parse_files_from_response.
+
+    feed() takes response chunks as they stream in and returns every
+    (filename, content) block whose closing fence has arrived, with the same
+    matching rules as the regex in parse_files_from_response.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._filename: Optional[str] = None
+        self._content: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self._buffer += chunk
+        files = []
+        while True:
+            if self._filename is None:
+                match = FENCE_OPEN_RE.search(self._buffer)
+                if match is None:
+                    self._buffer = self._pending_opening(self._buffer)
+                    return files
+                self._filename = match.group(1)
+                self._buffer = self._buffer[match.end():]
+            else:
+                end = self._buffer.find("```")
+                if end == -1:
+                    # Keep a possible partial fence for the next chunk
+                    keep = 2 if len(self._buffer) > 2 else len(self._buffer)
+                    self._content.append(self._buffer[:len(self._buffer) - keep])
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    return files
+                self._content.append(self._buffer[:end])
+                files.append((self._filename.strip(), "".join(self._content).strip()))
+                self._filename = None
+                self._content = []
+                self._buffer = self._buffer[end + 3:]
+
+    @staticmethod
+    def _pending_opening(buffer: str) -> str:
+        """Return the tail of buffer that could still become an opening fence."""
+        last_space = max((i for i, ch in enumerate(buffer) if ch.isspace()), default=-1)
+        tail = buffer[last_space + 1:]
+        tick = tail.find("`")
+        return tail[tick:] if tick != -1 else ""
+
+async def write_files_from_stream(chunks: AsyncIterator[str], base_dir: str = "./tmp") -> Tuple[str, List[str]]:
+    """Write fenced files from a streamed LLM response as soon as each block closes.
+
+    Writes run in worker threads; blocks with the same filename are written in
+    order. Returns (full response text, written paths).
+    """
+    parser = FencedBlockParser()
+    parts = []
+    writes = []
+    last_write = {}
+
+    async def _write(previous, content, filename):
+        if previous is not None:
+            await previous
+        return await asyncio.to_thread(write_to_file, content, filename, base_dir)
+
+    async for chunk in chunks:
+        parts.append(chunk)
+        for filename, content in parser.feed(chunk):
+            task = asyncio.create_task(_write(last_write.get(filename), content, filename))
+            last_write[filename] = task
+            writes.append(task)
+    written = await asyncio.gather(*writes)
+    return "".join(parts), [path for path in written if path]
+
 def get_cache_config(config: dict) -> dict:
     return config.get("cache", {})
 
@@ -83,6 +206,24 @@ def get_queue_config(config: dict) -> dict:
 def get_context_config(config: dict) -> dict:
     return config.get("context", {})
 
+def get_daemon_config(config: dict) -> dict:
+    return config.get("daemon", {})
+
+def get_ollama_config(config: dict) -> dict:
+    return config.get("ollama", {})
+
+def get_semantic_cache_config(config: dict) -> dict:
+    return config.get("semantic_cache", {})
+
+def get_router_config(config: dict) -> dict:
+    return config.get("router", {})
+
+def get_rules_config(config: dict) -> dict:
+    return config.get("rules", {})
+
+def get_event_log_config(config: dict) -> dict:
+    return config.get("event_log", {})
+
 def get_exclude_dirs(config: dict) -> list:
     default_excludes = [
         "venv", "build", "tmp", ".git", "__pycache__", "node_modules"
@@ -1,11 +1,19 @@
 import os
 import json
+import asyncio
 import logging
 import time
-from llmstruct.modules.cli.utils import load_gitignore, read_file_content, write_to_file
-from llmstruct.generators.json_generator import get_folder_structure
+from llmstruct.modules.cli.utils import read_file_content, write_to_file
+from llmstruct.modules.commands.scan import ScanService
+from llmstruct.modules.commands.validate import ValidationService, validate_document
+from llmstruct.ollama_pool import group_by_model
+from llmstruct.prompt_templates import get_template_collection
+from llmstruct.rules_engine import RuleQuery
 from llmstruct.self_run import attach_to_llm_request
 
+# Commands that change files later commands may read
+MUTATING_COMMANDS = ("write",)
+
 async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client):
     """Enhanced queue processing with workflow support, performance tracking, and safety validation."""
     queue_path = os.path.join(root_dir, "data", "cli_queue.json")
@@ -42,6 +50,124 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
         logging.error("Invalid queue format")
         return
 
+    pool = client.ollama_pool
+    uses_ollama = args.mode in ("ollama", "hybrid", "auto")
+    if uses_ollama and pool.preload_models and not pool.preloaded:
+        for model, seconds in (await pool.preload()).items():
+            if seconds is None:
+                print(f"[QUEUE] ⚠️ Could not preload Ollama model {model}")
+            else:
+                print(f"[QUEUE] Preloaded Ollama model {model} in {seconds:.2f}s")
+
+    scan_service = ScanService(root_dir)
+    validation_service = ValidationService()
+    try:
+        await _run_workflows(
+            workflows, root_dir, context_path, args, cache, client, scan_service, validation_service
+        )
+    finally:
+        validation_service.close()
+        if scan_service.dirs_listed:
+            print(
+                f"[QUEUE] Scan cache: {scan_service.dirs_listed} directories listed, "
+                f"{scan_service.cache_hits} cache hits"
+            )
+        scan_service.close()
+        if uses_ollama:
+            for model, stats in pool.stats().items():
+                print(
+                    f"[QUEUE] Ollama {model}: {stats['requests']} requests, "
+                    f"{stats['cold_loads']} loads ({stats['load_seconds']:.2f}s)"
+                )
+        _report_prefix_cache(client)
+
+def _report_prefix_cache(client):
+    prefix_stats = client.prefix_cache.stats()
+    for provider, stats in prefix_stats.items():
+        print(
+            f"[QUEUE] Prefix cache {provider}: {stats['hits']}/{stats['hits'] + stats['misses']} hits "
+            f"({stats['hit_rate']:.0%}), {stats['cached_tokens']} cached input tokens"
+        )
+    if client.semantic_cache is not None:
+        semantic = client.semantic_cache.stats()
+        print(
+            f"[QUEUE] Semantic cache: {semantic['hits']} hits, {semantic['misses']} misses, "
+            f"{semantic['entries']} entries"
+        )
+    coalescing = client.single_flight.stats()
+    if coalescing["coalesced"]:
+        print(
+            f"[QUEUE] Coalesced {coalescing['coalesced']} of {coalescing['requests']} LLM queries "
+            f"into in-flight requests"
+        )
+    if prefix_stats:
+        try:
+            from llmstruct.metrics_tracker import track_workflow_event
+            track_workflow_event("prefix_cache", prefix_stats)
+        except ImportError:
+            pass
+
+def _render_templates(commands, root_dir):
+    """Prompts of llm items that use a template ("template", "vars"), rendered in one batch.
+
+    Index -> prompt text (followed by the item's own "prompt", if any) or the TemplateError.
+    """
+    templated = [
+        i for i, item in enumerate(commands) if item.get("cmd") == "llm" and item.get("template")
+    ]
+    if not templated:
+        return {}
+    collection = get_template_collection(root_dir)
+    rendered = collection.render_many(
+        (commands[i]["template"], commands[i].get("vars")) for i in templated
+    )
+    prompts = {}
+    for i, text in zip(templated, rendered):
+        extra = commands[i].get("prompt")
+        prompts[i] = f"{text}\n\n{extra}" if extra and isinstance(text, str) else text
+    return prompts
+
+def _rule_query(item):
+    """Per-item rule selection ("role", "scope", "rules"); None keeps the configured default."""
+    if not any(item.get(key) for key in ("role", "scope", "rules")):
+        return None
+    return RuleQuery(item.get("role"), item.get("scope"), tuple(item.get("rules") or ()))
+
+def _llm_model(item, args):
+    return item.get("model") or args.model or "mixtral"
+
+def _execution_order(commands, args, warm_model):
+    """Command indices in run order: consecutive llm items are grouped by model.
+
+    Only runs of llm items are reordered, so writes/scans/validations still see
+    the results of everything queued before them.
+    """
+    order, run = [], []
+    for i, item in enumerate([*commands, None]):
+        if item is not None and item.get("cmd") == "llm":
+            run.append(i)
+            continue
+        if run:
+            grouped = group_by_model(run, lambda j: _llm_model(commands[j], args), warm_model)
+            order.extend(grouped)
+            warm_model = _llm_model(commands[grouped[-1]], args)
+            run = []
+        if item is not None:
+            order.append(i)
+    return order
+
+def _validate_paths(root_dir, item):
+    json_path = item.get("json_path")
+    schema_path = item.get("schema_path")
+    if not json_path or not schema_path:
+        return None
+    full_json_path = os.path.join(root_dir, json_path)
+    full_schema_path = os.path.join(root_dir, schema_path)
+    if not (os.path.exists(full_json_path) and os.path.exists(full_schema_path)):
+        return None
+    return full_json_path, full_schema_path
+
+async def _run_workflows(workflows, root_dir, context_path, args, cache, client, scan_service, validation_service):
     for workflow in workflows:
         workflow_id = workflow.get("workflow_id", "unknown")
         workflow_desc = workflow.get("description", "No description")
@@ -52,7 +178,38 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
 
         workflow_start_time = time.time()
 
-        for i, item in enumerate(commands):
+        # Commands before the first write see the tree as it is now, so only those are started early
+        prefetch_end = next(
+            (i for i, item in enumerate(commands) if item.get("cmd") in MUTATING_COMMANDS), len(commands)
+        )
+
+        # Start metadata scans up front so they walk in parallel while earlier commands run
+        scan_futures = {}
+        for i, item in enumerate(commands[:prefetch_end]):
+            if item.get("cmd") == "scan" and item.get("options", {}).get("include_metadata"):
+                full_path = os.path.join(root_dir, item.get("path") or "")
+                if os.path.isdir(full_path):
+                    scan_futures[i] = scan_service.submit_count(item.get("path") or "")
+
+        # Validate many documents in parallel worker processes
+        validate_items = {
+            i: paths for i, item in enumerate(commands[:prefetch_end])
+            if item.get("cmd") == "validate" and (paths := _validate_paths(root_dir, item))
+        }
+        validate_futures = {}
+        if len(validate_items) > 1:
+            validate_futures = {
+                i: validation_service.submit(*paths) for i, paths in validate_items.items()
+            }
+
+        prompts = _render_templates(commands, root_dir)
+
+        order = range(len(commands))
+        if args.mode in ("ollama", "hybrid", "auto") and not workflow.get("preserve_order"):
+            order = _execution_order(commands, args, client.ollama_pool.last_model)
+
+        for i in order:
+            item = commands[i]
             cmd = item.get("cmd")
             if not cmd:
                 continue
@@ -68,7 +225,7 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
                     if expected_result == "blocked":
                         print(f"[QUEUE] Testing security boundary for: {filename}")
 
-                    write_dir = "./tmp"
+                    write_dir = os.path.join(root_dir, "tmp")
                     file_path = write_to_file(content, filename, write_dir)
 
                     if file_path:
@@ -84,16 +241,13 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
                     full_path = os.path.join(root_dir, scan_path)
 
                     if os.path.isdir(full_path):
-                        structure = get_folder_structure(
-                            root_dir=full_path,
-                            gitignore_patterns=load_gitignore(root_dir),
-                            include_patterns=None,
-                            exclude_patterns=None,
-                            exclude_dirs=["venv", "build", "tmp"],
-                        )
-                        print(f"[QUEUE] ✅ Scanned {full_path}")
                         if options.get("include_metadata"):
-                            print(f"[QUEUE] Found {len(structure)} items")
+                            future = scan_futures.get(i) or scan_service.submit_count(scan_path)
+                            item_count = await asyncio.wrap_future(future)
+                            print(f"[QUEUE] ✅ Scanned {full_path}")
+                            print(f"[QUEUE] Found {item_count} items")
+                        else:
+                            print(f"[QUEUE] ✅ Scanned {full_path}")
                     elif os.path.isfile(full_path):
                         content = read_file_content(full_path)
                         if content:
@@ -104,7 +258,10 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
                         print(f"[QUEUE] ❌ Path not found: {full_path}")
 
                 elif cmd == "llm":
-                    prompt = item.get("prompt", "")
+                    prompt = prompts.get(i, item.get("prompt", ""))
+                    if isinstance(prompt, Exception):
+                        print(f"[QUEUE] ❌ {prompt}")
+                        continue
                     context_preference = item.get("context_preference", "init")
                     options = item.get("options", {})
 
@@ -146,8 +303,10 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
                             prompt=prompt_with_context,
                             context_path=context_path_to_use,
                             mode=args.mode,
-                            model=args.model,
+                            model=_llm_model(item, args),
                             artifact_ids=args.artifact_ids,
+                            coalesce=item.get("coalesce"),
+                            rules=_rule_query(item),
                         )
                         if result:
                             print(
@@ -165,21 +324,26 @@ async def process_cli_queue_enhanced(root_dir, context_path, args, cache, client
                 elif cmd == "validate":
                     json_path = item.get("json_path")
                     schema_path = item.get("schema_path")
-                    options = item.get("options", {})
+                    paths = validate_items.get(i) or _validate_paths(root_dir, item)
 
-                    if json_path and schema_path:
-                        full_json_path = os.path.join(root_dir, json_path)
-                        full_schema_path = os.path.join(root_dir, schema_path)
-
-                        if os.path.exists(full_json_path) and os.path.exists(
-                            full_schema_path
-                        ):
-                            print(f"[QUEUE] ✅ Validation attempted for {json_path}")
-                            # Note: Actual validation would require jsonschema library
-                        else:
-                            print(f"[QUEUE] ❌ Validation failed: files not found")
-                    else:
+                    if not json_path or not schema_path:
                         print(f"[QUEUE] ❌ Validation failed: missing paths")
+                    elif paths is None:
+                        print(f"[QUEUE] ❌ Validation failed: files not found")
+                    else:
+                        if i in validate_futures:
+                            result = await asyncio.wrap_future(validate_futures[i])
+                        else:
+                            result = await asyncio.to_thread(validate_document, *paths)
+                        timing = f"{result['seconds'] * 1000:.1f} ms"
+                        if result["streamed"]:
+                            timing += ", streamed"
+                        if result["valid"]:
+                            print(f"[QUEUE] ✅ {json_path} is valid ({timing})")
+                        else:
+                            print(f"[QUEUE] ❌ {json_path} failed validation ({timing})")
+                            for error in result["errors"]:
+                                print(f"[QUEUE]    - {error}")
 
                 elif cmd == "analyze":
                     target_path = item.get("target_path")
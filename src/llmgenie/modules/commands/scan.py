@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from llmstruct.modules.cli.utils import gitignore_matcher
+
+DEFAULT_SCAN_EXCLUDE_DIRS = ["venv", "build", "tmp", ".git", "__pycache__"]
+
+class ScanService:
+    """Shared directory scanner for one queue run.
+
+    .gitignore is read once, directory listings are cached by (path, mtime) so
+    overlapping scans reuse them, and scans run in a thread pool.
+    """
+
+    def __init__(self, root_dir: str, exclude_dirs: Optional[List[str]] = None, max_workers: Optional[int] = None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.exclude_dirs = set(exclude_dirs or DEFAULT_SCAN_EXCLUDE_DIRS)
+        self._gitignored = gitignore_matcher(self.root_dir)
+        self._listings: Dict[str, Tuple[int, List[Tuple[str, bool]]]] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="queue-scan")
+        self.dirs_listed = 0
+        self.cache_hits = 0
+
+    def _ignored(self, rel_path: str, name: str, is_dir: bool) -> bool:
+        return name in self.exclude_dirs or self._gitignored(rel_path, is_dir)
+
+    def _listdir(self, path: str) -> List[Tuple[str, bool]]:
+        """Return sorted (name, is_dir) entries, listing each directory once per mtime."""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached and cached[0] == mtime:
+                self.cache_hits += 1
+                return cached[1]
+            pending = self._pending.get(path)
+            owner = pending is None
+            if owner:
+                pending = self._pending[path] = threading.Event()
+        if not owner:
+            # Another scan is listing this directory right now
+            pending.wait()
+            with self._lock:
+                cached = self._listings.get(path)
+                if cached and cached[0] == mtime:
+                    self.cache_hits += 1
+                    return cached[1]
+        try:
+            with os.scandir(path) as it:
+                entries = sorted((e.name, e.is_dir(follow_symlinks=False)) for e in it)
+            with self._lock:
+                self._listings[path] = (mtime, entries)
+                self.dirs_listed += 1
+            return entries
+        finally:
+            if owner:
+                with self._lock:
+                    self._pending.pop(path, None)
+                pending.set()
+
+    def walk(self, path: str):
+        """Yield (root-relative path, is_dir) for everything under path, honouring .gitignore."""
+        stack = [os.path.join(self.root_dir, path)]
+        while stack:
+            current = stack.pop()
+            for name, is_dir in self._listdir(current):
+                full_path = os.path.join(current, name)
+                rel_path = os.path.relpath(full_path, self.root_dir).replace(os.sep, "/")
+                if self._ignored(rel_path, name, is_dir):
+                    continue
+                yield rel_path, is_dir
+                if is_dir:
+                    stack.append(full_path)
+
+    def count(self, path: str) -> int:
+        """Number of files and directories under path."""
+        return sum(1 for _ in self.walk(path))
+
+    def submit_count(self, path: str) -> Future:
+        return self._executor.submit(self.count, path)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
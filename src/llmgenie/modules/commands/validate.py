@@ -0,0 +1,202 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    import jsonschema
+
+    JSONSCHEMA_AVAILABLE = True
+except ImportError:
+    JSONSCHEMA_AVAILABLE = False
+
+try:
+    import ijson
+
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Errors that fail one document rather than the whole run
+DOCUMENT_ERRORS: tuple = (OSError, ValueError)
+if JSONSCHEMA_AVAILABLE:
+    try:
+        from referencing.exceptions import Unresolvable as RefResolutionError
+    except ImportError:  # jsonschema < 4.18
+        from jsonschema import RefResolutionError
+    DOCUMENT_ERRORS += (jsonschema.SchemaError, RefResolutionError)
+if IJSON_AVAILABLE:
+    DOCUMENT_ERRORS += (ijson.JSONError,)
+
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+MAX_REPORTED_ERRORS = 5
+
+# Root keywords _stream_errors checks exactly; any other keyword means full validation
+ANNOTATION_KEYWORDS = {"$schema", "$id", "$comment", "$defs", "definitions", "title", "description", "default", "examples"}
+STREAMED_ARRAY_KEYWORDS = ANNOTATION_KEYWORDS | {"type", "items", "minItems", "maxItems"}
+STREAMED_OBJECT_KEYWORDS = ANNOTATION_KEYWORDS | {"type", "properties", "additionalProperties", "required"}
+
+# Compiled validators per process, keyed by schema content hash (+ sub-schema path)
+_validator_cache = {}
+
+def _load_validator(schema_path: str) -> Tuple[object, dict, str]:
+    with open(schema_path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    cached = _validator_cache.get(digest)
+    if cached is None:
+        schema = json.loads(raw)
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        cached = (cls(schema), schema)
+        _validator_cache[digest] = cached
+    return cached[0], cached[1], digest
+
+def _sub_validator(schema: dict, subschema: dict, key: str):
+    """Validator for a sub-schema that still resolves the root's local $defs/definitions."""
+    validator = _validator_cache.get(key)
+    if validator is None:
+        rooted = dict(subschema)
+        for defs_key in ("$defs", "definitions"):
+            if defs_key in schema and defs_key not in rooted:
+                rooted[defs_key] = schema[defs_key]
+        cls = jsonschema.validators.validator_for(schema)
+        validator = cls(rooted)
+        _validator_cache[key] = validator
+    return validator
+
+def _error_text(error, base: tuple = ()) -> str:
+    location = "/".join(str(p) for p in (*base, *error.absolute_path))
+    return f"{location or '<root>'}: {error.message}"
+
+def _first_errors(validator, document, base: tuple = ()) -> List[str]:
+    errors = itertools.islice(validator.iter_errors(document), MAX_REPORTED_ERRORS)
+    return [_error_text(e, base) for e in errors]
+
+def _refs_resolvable(node) -> bool:
+    """True if every local $ref points into $defs/definitions, which _sub_validator carries over."""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#") and not ref.startswith(("#/$defs/", "#/definitions/")):
+            return False
+        return all(_refs_resolvable(value) for value in node.values())
+    if isinstance(node, list):
+        return all(_refs_resolvable(value) for value in node)
+    return True
+
+def _root_char(json_path: str) -> str:
+    with open(json_path, "rb") as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return ""
+            stripped = chunk.lstrip()
+            if stripped:
+                return chr(stripped[0])
+
+def _stream_errors(json_path: str, schema: dict, digest: str) -> Optional[List[str]]:
+    """Validate a top-level array or object item by item.
+
+    None unless the schema only uses keywords checked here (type, items,
+    min/maxItems; or properties, additionalProperties, required) and the
+    document's root has the schema's type; the caller then validates in full.
+    """
+    schema_type = schema.get("type")
+    errors = []
+    if not _refs_resolvable(schema):
+        return None
+    if (
+        schema_type == "array"
+        and isinstance(schema.get("items"), dict)
+        and set(schema) <= STREAMED_ARRAY_KEYWORDS
+        and _root_char(json_path) == "["
+    ):
+        validator = _sub_validator(schema, schema["items"], f"{digest}:items")
+        count = 0
+        with open(json_path, "rb") as f:
+            for count, item in enumerate(ijson.items(f, "item", use_float=True), 1):
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.extend(_first_errors(validator, item, (count - 1,)))
+        if "minItems" in schema and count < schema["minItems"]:
+            errors.append(f"<root>: expected at least {schema['minItems']} items, got {count}")
+        if "maxItems" in schema and count > schema["maxItems"]:
+            errors.append(f"<root>: expected at most {schema['maxItems']} items, got {count}")
+        return errors[:MAX_REPORTED_ERRORS]
+    if (
+        schema_type == "object"
+        and isinstance(schema.get("properties"), dict)
+        and isinstance(schema.get("additionalProperties", True), (bool, dict))
+        and set(schema) <= STREAMED_OBJECT_KEYWORDS
+        and _root_char(json_path) == "{"
+    ):
+        properties = schema["properties"]
+        additional = schema.get("additionalProperties", True)
+        seen = set()
+        with open(json_path, "rb") as f:
+            for key, value in ijson.kvitems(f, "", use_float=True):
+                seen.add(key)
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    continue
+                if key in properties:
+                    subschema, sub_key = properties[key], f"{digest}:properties/{key}"
+                elif isinstance(additional, dict):
+                    subschema, sub_key = additional, f"{digest}:additionalProperties"
+                elif additional is False:
+                    errors.append(f"<root>: additional property {key!r} is not allowed")
+                    continue
+                else:
+                    continue
+                errors.extend(_first_errors(_sub_validator(schema, subschema, sub_key), value, (key,)))
+        for key in schema.get("required", []):
+            if key not in seen:
+                errors.append(f"<root>: {key!r} is a required property")
+        return errors[:MAX_REPORTED_ERRORS]
+    return None
+
+def validate_document(json_path: str, schema_path: str) -> dict:
+    """Validate one JSON document against a JSON Schema.
+
+    Returns {"json_path", "valid", "errors", "streamed", "seconds"}.
+    """
+    start = time.perf_counter()
+    result = {"json_path": json_path, "valid": False, "errors": [], "streamed": False}
+    if not JSONSCHEMA_AVAILABLE:
+        result["errors"] = ["jsonschema is not installed (pip install jsonschema)"]
+        result["seconds"] = time.perf_counter() - start
+        return result
+    try:
+        validator, schema, digest = _load_validator(schema_path)
+        errors = None
+        if IJSON_AVAILABLE and os.path.getsize(json_path) > STREAMING_THRESHOLD:
+            errors = _stream_errors(json_path, schema, digest)
+            result["streamed"] = errors is not None
+        if errors is None:
+            with open(json_path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+            errors = _first_errors(validator, document)
+        result["valid"] = not errors
+        result["errors"] = errors
+    except DOCUMENT_ERRORS as e:
+        result["errors"] = [str(e)]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+class ValidationService:
+    """Runs validate_document in a process pool, created only when needed."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self._pool = None
+
+    def submit(self, json_path: str, schema_path: str) -> Future:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool.submit(validate_document, json_path, schema_path)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,268 @@
+"""Load balancing over several Ollama hosts.
+
+Configured with `[ollama] hosts = [...]` in llmstruct.toml or OLLAMA_HOSTS
+(comma-separated); a single OLLAMA_HOST behaves exactly as before. Each host
+gets its own OllamaModelPool (keep_alive, preloading, load timings).
+
+A request for a model goes to the healthy host with the fewest outstanding
+requests (`balancing = "least-outstanding"`) or the less busy of two random
+hosts (`"power-of-two"`). Hosts that already have the model loaded are
+preferred unless they are `affinity_slack` requests busier than the least
+busy host, since a cold load costs far more than a short queue. A host is
+ejected after `max_failures` consecutive connection errors or 5xx responses
+and re-probed (GET /api/ps) every `eject_seconds` until it answers again.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import aiohttp
+
+from llmstruct.ollama_pool import OllamaModelPool, model_tag
+
+BALANCING = ("least-outstanding", "power-of-two")
+# Failures that say something about the host rather than the request
+HOST_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError, OSError)
+
+
+class OllamaHost:
+    """One Ollama endpoint: its model pool, load and health."""
+
+    def __init__(self, url: str, pool: OllamaModelPool):
+        self.url = url.rstrip("/")
+        self.pool = pool
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.loaded: Set[str] = set()  # model_tag() names
+        self.loaded_checked_at = 0.0
+        self.status: Optional[int] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    def observe(self, status: int) -> None:
+        """Record the HTTP status of the current response (5xx counts as a host failure)."""
+        self.status = status
+
+    def as_dict(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "loaded_models": sorted(self.loaded),
+            "models": self.pool.stats(),
+        }
+
+
+class OllamaBalancer:
+    """Spreads Ollama requests over hosts; exposes the OllamaModelPool interface for all of them."""
+
+    def __init__(
+        self,
+        hosts: Iterable[str],
+        get_session: Callable[[], Awaitable],
+        keep_alive: str = "30m",
+        preload_models: Optional[List[str]] = None,
+        options: Optional[dict] = None,
+    ):
+        self._get_session = get_session
+        self.keep_alive = keep_alive
+        self.preload_models = list(preload_models or [])
+        self.options = dict(options or {})
+        self.balancing = "least-outstanding"
+        self.affinity_slack = 2
+        self.max_failures = 3
+        self.eject_seconds = 30.0
+        self.loaded_refresh_seconds = 30.0
+        self.preloaded = False
+        self.last_model: Optional[str] = None
+        self.hosts: List[OllamaHost] = []
+        self._probes: Set[asyncio.Task] = set()
+        self._rng = random.Random()
+        self.set_hosts(hosts)
+
+    def set_hosts(self, urls: Iterable[str]) -> None:
+        existing = {h.url: h for h in self.hosts}
+        hosts = []
+        for url in urls:
+            url = url.rstrip("/")
+            host = existing.get(url) or OllamaHost(url, OllamaModelPool(
+                url, self._get_session, self.keep_alive, self.preload_models, self.options
+            ))
+            hosts.append(host)
+        self.hosts = hosts
+
+    @property
+    def host(self) -> str:
+        """First configured host (single-host setups and log messages)."""
+        return self.hosts[0].url
+
+    def configure(self, config: dict) -> None:
+        """Apply an [ollama] section from llmstruct.toml."""
+        self.keep_alive = config.get("keep_alive", self.keep_alive)
+        self.preload_models = list(config.get("preload_models", self.preload_models))
+        self.options = {**self.options, **config.get("options", {})}
+        if config.get("hosts"):
+            self.set_hosts(config["hosts"])
+        balancing = config.get("balancing", self.balancing)
+        if balancing not in BALANCING:
+            logging.warning(f"Unknown Ollama balancing '{balancing}', using {self.balancing}")
+        else:
+            self.balancing = balancing
+        self.affinity_slack = config.get("affinity_slack", self.affinity_slack)
+        self.max_failures = config.get("max_failures", self.max_failures)
+        self.eject_seconds = config.get("eject_seconds", self.eject_seconds)
+        for host in self.hosts:
+            host.pool.configure(config)
+
+    def request_options(self, model: str) -> dict:
+        return self.hosts[0].pool.request_options(model)
+
+    def pick(self, model: str) -> OllamaHost:
+        """Host for the next request to `model`."""
+        self._probe_ejected()
+        self._refresh_loaded()
+        candidates = [h for h in self.hosts if h.healthy]
+        if not candidates:
+            # Everything is ejected: the host that has been out longest is the best guess
+            return min(self.hosts, key=lambda h: h.ejected_until)
+        least = min(h.outstanding for h in candidates)
+        tagged = model_tag(model)
+        warm = [h for h in candidates if tagged in h.loaded and h.outstanding <= least + self.affinity_slack]
+        if warm:
+            candidates = warm
+        if self.balancing == "power-of-two" and len(candidates) > 2:
+            candidates = self._rng.sample(candidates, 2)
+        fewest = min(h.outstanding for h in candidates)
+        return self._rng.choice([h for h in candidates if h.outstanding == fewest])
+
+    @asynccontextmanager
+    async def host_for(self, model: str) -> AsyncIterator[OllamaHost]:
+        """Pick a host and track the request on it. Call host.observe(status) on the response."""
+        host = self.pick(model)
+        host.outstanding += 1
+        host.requests += 1
+        host.status = None
+        try:
+            yield host
+        except HOST_ERRORS as e:
+            self._failed(host, str(e) or type(e).__name__)
+            raise
+        else:
+            if host.status is not None and host.status >= 500:
+                self._failed(host, f"HTTP {host.status}")
+            elif host.status is not None:
+                host.consecutive_failures = 0
+                if host.status == 200:
+                    host.loaded.add(model_tag(model))
+                    self.last_model = model
+        finally:
+            host.outstanding -= 1
+
+    def _failed(self, host: OllamaHost, reason: str) -> None:
+        host.failures += 1
+        host.consecutive_failures += 1
+        if host.healthy and host.consecutive_failures >= self.max_failures:
+            host.ejected_until = time.monotonic() + self.eject_seconds
+            host.ejections += 1
+            host.loaded.clear()
+            logging.warning(
+                f"Ollama host {host.url} ejected after {host.consecutive_failures} failures ({reason})"
+            )
+
+    def _probe_ejected(self) -> None:
+        now = time.monotonic()
+        for host in self.hosts:
+            if host.ejected_until is not None and host.ejected_until <= now:
+                host.ejected_until = now + self.eject_seconds
+                self._spawn(self._probe(host))
+
+    def _refresh_loaded(self) -> None:
+        """Re-read /api/ps in the background, since Ollama unloads idle models on its own."""
+        if len(self.hosts) < 2:
+            return
+        now = time.monotonic()
+        for host in self.hosts:
+            if host.healthy and now - host.loaded_checked_at >= self.loaded_refresh_seconds:
+                host.loaded_checked_at = now
+                self._spawn(self._probe(host))
+
+    def _spawn(self, coro) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+            return
+        self._probes.add(task)
+        task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, host: OllamaHost) -> bool:
+        try:
+            models = await host.pool.loaded_models()
+        except Exception as e:
+            logging.debug(f"Ollama host {host.url} probe failed: {e}")
+            return False
+        host.loaded = {model_tag(m) for m in models if m}
+        host.loaded_checked_at = time.monotonic()
+        if not host.healthy:
+            host.ejected_until = None
+            host.consecutive_failures = 0
+            logging.info(f"Ollama host {host.url} is back")
+        return True
+
+    async def preload(
+        self, models: Optional[Iterable[str]] = None, all_hosts: bool = True
+    ) -> Dict[str, Optional[float]]:
+        """Load models on every healthy host in parallel, or only on the host pick() chooses.
+
+        Returns the slowest wall-clock seconds per model (None where no host loaded it).
+        """
+        models = list(models if models is not None else self.preload_models)
+        if all_hosts:
+            plans = [(h, models) for h in self.hosts if h.healthy]
+        else:
+            by_host: Dict[str, tuple] = {}
+            for model in models:
+                host = self.pick(model)
+                by_host.setdefault(host.url, (host, []))[1].append(model)
+            plans = list(by_host.values())
+        results = await asyncio.gather(*(host.pool.preload(host_models) for host, host_models in plans))
+        timings: Dict[str, Optional[float]] = {m: None for m in models}
+        for (host, _), host_timings in zip(plans, results):
+            for model, seconds in host_timings.items():
+                if seconds is not None:
+                    host.loaded.add(model_tag(model))
+                    timings[model] = max(seconds, timings[model] or 0.0)
+        self.preloaded = True
+        return timings
+
+    async def loaded_models(self) -> List[str]:
+        models = set()
+        for host in self.hosts:
+            if host.healthy and await self._probe(host):
+                models |= host.loaded
+        return sorted(models)
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-model timings summed over hosts (the OllamaModelPool.stats() shape)."""
+        merged: Dict[str, dict] = {}
+        for host in self.hosts:
+            for model, stats in host.pool.stats().items():
+                entry = merged.setdefault(model, {k: 0 for k in stats})
+                for key, value in stats.items():
+                    entry[key] = max(entry[key], value) if key == "last_load_seconds" else entry[key] + value
+        return merged
+
+    def host_stats(self) -> Dict[str, dict]:
+        return {h.url: h.as_dict() for h in self.hosts}
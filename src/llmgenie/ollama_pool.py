@@ -0,0 +1,119 @@
+"""Ollama model warm-pool: preloading, explicit keep_alive and model-load timings."""
+
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+COLD_LOAD_THRESHOLD = 0.1  # seconds of load_duration that count as a model (re)load
+NS_PER_SECOND = 1_000_000_000
+
+
+def model_tag(name: str) -> str:
+    """`name:tag` as Ollama reports it in /api/ps; an untagged name means `:latest`."""
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+class OllamaModelPool:
+    """Keeps configured models resident on one Ollama host and records load costs."""
+
+    def __init__(
+        self,
+        host: str,
+        get_session: Callable[[], Awaitable],
+        keep_alive: str = "30m",
+        preload_models: Optional[List[str]] = None,
+        options: Optional[dict] = None,
+    ):
+        self.host = host.rstrip("/")
+        self._get_session = get_session
+        self.keep_alive = keep_alive
+        self.preload_models = list(preload_models or [])
+        self.options = dict(options or {})
+        self.last_model: Optional[str] = None
+        self.preloaded = False
+        self._stats: Dict[str, dict] = {}
+
+    def configure(self, config: dict) -> None:
+        """Apply an [ollama] section from llmstruct.toml."""
+        self.keep_alive = config.get("keep_alive", self.keep_alive)
+        self.preload_models = list(config.get("preload_models", self.preload_models))
+        self.options = {**self.options, **config.get("options", {})}
+
+    def request_options(self, model: str) -> dict:
+        """Extra /api/generate fields for a request to `model`."""
+        extra = {"keep_alive": self.keep_alive}
+        if self.options:
+            extra["options"] = dict(self.options)
+        return extra
+
+    def _model_stats(self, model: str) -> dict:
+        return self._stats.setdefault(
+            model,
+            {"requests": 0, "cold_loads": 0, "load_seconds": 0.0, "last_load_seconds": 0.0},
+        )
+
+    def record(self, model: str, result: dict, preload: bool = False) -> None:
+        """Record timings from an /api/generate response (or the final stream event)."""
+        stats = self._model_stats(model)
+        if not preload:
+            stats["requests"] += 1
+        load_seconds = result.get("load_duration", 0) / NS_PER_SECOND
+        if load_seconds >= COLD_LOAD_THRESHOLD:
+            stats["cold_loads"] += 1
+            stats["load_seconds"] += load_seconds
+            stats["last_load_seconds"] = load_seconds
+            logging.info(f"Ollama loaded model {model} in {load_seconds:.2f}s")
+        self.last_model = model
+
+    async def _load(self, model: str) -> Optional[float]:
+        # A generate request without a prompt only loads the model
+        url = f"{self.host}/api/generate"
+        data = {"model": model, "keep_alive": self.keep_alive}
+        session = await self._get_session()
+        start = time.perf_counter()
+        async with session.post(url, json=data) as response:
+            if response.status != 200:
+                logging.error(f"Failed to preload Ollama model {model}: {response.status}")
+                return None
+            result = await response.json()
+        self.record(model, result, preload=True)
+        return time.perf_counter() - start
+
+    async def preload(self, models: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+        """Load models one after another (parallel loads compete for VRAM). Returns wall-clock seconds."""
+        timings = {}
+        for model in models if models is not None else self.preload_models:
+            try:
+                timings[model] = await self._load(model)
+            except Exception as e:
+                logging.error(f"Failed to preload Ollama model {model}: {e}")
+                timings[model] = None
+        self.preloaded = True
+        return timings
+
+    async def loaded_models(self) -> List[str]:
+        """Models currently resident according to /api/ps."""
+        session = await self._get_session()
+        async with session.get(f"{self.host}/api/ps") as response:
+            if response.status != 200:
+                return []
+            result = await response.json()
+        return [m.get("name") or m.get("model") for m in result.get("models", [])]
+
+    def stats(self) -> Dict[str, dict]:
+        return {model: dict(stats) for model, stats in self._stats.items()}
+
+
+def group_by_model(items: List, model_of: Callable, warm_model: Optional[str] = None) -> List:
+    """Stable-group items by model so each model is loaded once.
+
+    Groups keep first-appearance order, except that the already warm model goes first.
+    """
+    groups: Dict[str, list] = {}
+    for item in items:
+        groups.setdefault(model_of(item), []).append(item)
+    order = list(groups)
+    if warm_model in groups:
+        order.remove(warm_model)
+        order.insert(0, warm_model)
+    return [item for model in order for item in groups[model]]
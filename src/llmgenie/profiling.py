@@ -0,0 +1,289 @@
+"""Profiling for a single CLI command (`llmstruct --profile <command>`).
+
+Modes, combined with commas (`--profile-modes cpu,memory,async`, default cpu):
+
+    cpu     cProfile -> <command>.pstats, plus a wall-clock stack sampler
+            -> <command>.collapsed (one "frame;frame;frame count" line per
+            stack, accepted by flamegraph.pl and speedscope)
+    memory  tracemalloc -> <command>.tracemalloc snapshot, peak and top allocations
+    async   samples the await chain of every running asyncio task
+            -> <command>.async.collapsed and per-task wall-clock time
+
+Every mode adds its top-N to <command>.summary.txt. cli.py only imports this
+module when --profile or --profile-modes is given, so unprofiled runs pay nothing.
+"""
+
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+PROFILE_MODES = ("cpu", "memory", "async")
+DEFAULT_PROFILE_DIR = ".llmstruct_profile"
+TRACEMALLOC_FRAMES = 25
+
+
+def parse_profile_modes(value: str) -> List[str]:
+    """'cpu,memory' -> ['cpu', 'memory']; 'all' -> every mode."""
+    if value == "all":
+        return list(PROFILE_MODES)
+    modes = [m.strip() for m in value.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in PROFILE_MODES]
+    if unknown:
+        raise ValueError(f"Unknown profile mode(s): {', '.join(unknown)} (choose from {', '.join(PROFILE_MODES)}, all)")
+    return modes
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _await_chain(coro) -> List[str]:
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first."""
+    labels = []
+    obj = coro
+    while obj is not None:
+        frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+        code = getattr(obj, "cr_code", None) or getattr(obj, "gi_code", None) or getattr(obj, "ag_code", None)
+        if code is None:
+            break
+        labels.append(_frame_label(frame.f_code if frame is not None else code))
+        obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+    return labels
+
+
+class StackSampler(threading.Thread):
+    """Samples thread stacks and/or asyncio task await chains every `interval` seconds."""
+
+    def __init__(self, interval: float, threads: bool = True, tasks: bool = False):
+        super().__init__(name="llmstruct-profiler", daemon=True)
+        self.interval = interval
+        self.sample_threads = threads
+        self.sample_tasks = tasks
+        self.stacks: Counter = Counter()
+        self.task_stacks: Counter = Counter()
+        # id(task) -> [name, first seen, last seen]
+        self.task_times: Dict[int, list] = {}
+        self.samples = 0
+        self._loops: Set[asyncio.AbstractEventLoop] = set()
+        self._stop_event = threading.Event()
+
+    def watch_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loops.add(loop)
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+            if self.sample_threads:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    labels.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(labels))] += 1
+            if self.sample_tasks:
+                self._sample_tasks()
+
+    def _sample_tasks(self) -> None:
+        now = time.perf_counter()
+        for loop in list(self._loops):
+            if loop.is_closed():
+                self._loops.discard(loop)
+                continue
+            try:
+                tasks = asyncio.all_tasks(loop)
+            except RuntimeError:
+                continue
+            for task in tasks:
+                coro = task.get_coro()
+                name = getattr(coro, "__qualname__", task.get_name())
+                chain = _await_chain(coro)
+                if chain:
+                    self.task_stacks[";".join([name] + chain[1:])] += 1
+                entry = self.task_times.setdefault(id(task), [f"{task.get_name()} {name}", now, now])
+                entry[2] = now
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class CommandProfiler:
+    """Profiles everything between start() and stop(); write_reports() saves the results."""
+
+    def __init__(
+        self,
+        command: str,
+        modes: List[str],
+        output_dir: str = DEFAULT_PROFILE_DIR,
+        top_n: int = 30,
+        interval: float = 0.005,
+    ):
+        self.command = command
+        self.modes = modes
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.interval = interval
+        self.elapsed = 0.0
+        self.peak_bytes = 0
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._policy_patched = False
+        self._start = 0.0
+
+    def start(self) -> None:
+        if "memory" in self.modes:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if "cpu" in self.modes or "async" in self.modes:
+            self._sampler = StackSampler(self.interval, threads="cpu" in self.modes, tasks="async" in self.modes)
+            if "async" in self.modes:
+                self._watch_new_loops()
+            self._sampler.start()
+        if "cpu" in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._start = time.perf_counter()
+
+    def _watch_new_loops(self) -> None:
+        """Hand every event loop created by asyncio.run() to the sampler."""
+        policy = asyncio.get_event_loop_policy()
+        create = policy.new_event_loop
+
+        def new_event_loop():
+            loop = create()
+            self._sampler.watch_loop(loop)
+            return loop
+
+        policy.new_event_loop = new_event_loop
+        self._policy_patched = True
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self._start
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._policy_patched:
+            del asyncio.get_event_loop_policy().new_event_loop
+            self._policy_patched = False
+        if tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def _path(self, suffix: str) -> Path:
+        return self.output_dir / f"{self.command}{suffix}"
+
+    @staticmethod
+    def _write_collapsed(path: Path, stacks: Counter) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def write_reports(self) -> Dict[str, str]:
+        """Write every report for the enabled modes. Returns {report: path}."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        written = {}
+        lines = [
+            f"Profile of '{self.command}' ({', '.join(self.modes)})",
+            f"Wall time: {self.elapsed:.3f}s",
+        ]
+
+        if self._profile is not None:
+            written["pstats"] = str(self._path(".pstats"))
+            self._profile.dump_stats(written["pstats"])
+            for sort_key in ("cumulative", "tottime"):
+                out = io.StringIO()
+                pstats.Stats(self._profile, stream=out).strip_dirs().sort_stats(sort_key).print_stats(self.top_n)
+                lines += ["", f"== cProfile top {self.top_n} by {sort_key} ==", out.getvalue().strip()]
+
+        sampler = self._sampler
+        if sampler is not None and sampler.stacks:
+            written["collapsed"] = str(self._path(".collapsed"))
+            self._write_collapsed(self._path(".collapsed"), sampler.stacks)
+            self_samples = Counter()
+            for stack, count in sampler.stacks.items():
+                self_samples[stack.rsplit(";", 1)[-1]] += count
+            total = sum(self_samples.values())
+            lines += ["", f"== Sampled wall-clock top {self.top_n} (self, {sampler.samples} samples every {self.interval * 1000:g}ms) =="]
+            for frame, count in self_samples.most_common(self.top_n):
+                lines.append(f"{count / total:7.1%}  {frame}")
+
+        if sampler is not None and sampler.sample_tasks:
+            written["async_collapsed"] = str(self._path(".async.collapsed"))
+            self._write_collapsed(self._path(".async.collapsed"), sampler.task_stacks)
+            durations = sorted(
+                ((last - first, name) for name, first, last in sampler.task_times.values()), reverse=True
+            )
+            lines += ["", f"== Async tasks by sampled wall-clock time (top {self.top_n} of {len(durations)}) =="]
+            for seconds, name in durations[:self.top_n]:
+                lines.append(f"{seconds:9.3f}s  {name}")
+            waiting = Counter()
+            for stack, count in sampler.task_stacks.items():
+                waiting[stack.rsplit(";", 1)[-1]] += count
+            if waiting:
+                lines += ["", f"== Async await points (top {self.top_n}, samples) =="]
+                for frame, count in waiting.most_common(self.top_n):
+                    lines.append(f"{count:7d}  {frame}")
+
+        if self._snapshot is not None:
+            written["tracemalloc"] = str(self._path(".tracemalloc"))
+            self._snapshot.dump(written["tracemalloc"])
+            snapshot = self._snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            stats = snapshot.statistics("lineno")
+            lines += [
+                "",
+                f"== Memory: peak {self.peak_bytes / 1024 / 1024:.1f} MiB, "
+                f"still allocated {sum(s.size for s in stats) / 1024 / 1024:.1f} MiB; top {self.top_n} by line ==",
+            ]
+            for stat in stats[:self.top_n]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+
+        written["summary"] = str(self._path(".summary.txt"))
+        self._path(".summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return written
+
+
+@contextmanager
+def profile_command(
+    command: str,
+    modes: List[str],
+    output_dir: str = DEFAULT_PROFILE_DIR,
+    top_n: int = 30,
+    interval: float = 0.005,
+) -> Iterator[CommandProfiler]:
+    """Profile the body of the with-block and write the reports when it exits (even on error)."""
+    profiler = CommandProfiler(command, modes, output_dir, top_n, interval)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            written = profiler.write_reports()
+        except OSError as e:
+            logging.error(f"Failed to write profile reports to {output_dir}: {e}")
+        else:
+            print(f"✅ Profile of '{command}' ({profiler.elapsed:.2f}s) written to {output_dir}:", file=sys.stderr)
+            for name, path in written.items():
+                print(f"  {name:<16} {path}", file=sys.stderr)
@@ -0,0 +1,90 @@
+"""Prompt prefix caching: stable prefix (context, artifacts) + variable suffix (the question).
+
+Providers that cache prompt prefixes (Anthropic cache_control, Ollama context
+reuse, and automatic prefix caching elsewhere) only help when the shared part
+comes first and is byte-identical between calls.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MIN_CACHED_PREFIX_CHARS = 2048  # shorter prefixes are not worth a separate cache entry
+OLLAMA_CONTEXT_SLOTS = 8
+
+
+class PromptParts(NamedTuple):
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.suffix}".strip() if self.prefix else self.suffix
+
+    @property
+    def continuation(self) -> str:
+        """`text` after the prefix, for providers that resume from an evaluated prefix."""
+        return f"\n\n{self.suffix}".rstrip() if self.prefix else self.suffix
+
+    @property
+    def cacheable(self) -> bool:
+        return len(self.prefix) >= MIN_CACHED_PREFIX_CHARS
+
+    @property
+    def prefix_hash(self) -> str:
+        return hashlib.sha256(self.prefix.encode("utf-8")).hexdigest()
+
+
+class PrefixCacheStats:
+    """Per-provider prefix-cache hits, misses and input tokens served from cache."""
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+
+    def record(self, provider: str, hit: bool, cached_tokens: int = 0) -> None:
+        stats = self._stats.setdefault(provider, {"hits": 0, "misses": 0, "cached_tokens": 0})
+        stats["hits" if hit else "misses"] += 1
+        stats["cached_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, dict]:
+        result = {}
+        for provider, stats in self._stats.items():
+            total = stats["hits"] + stats["misses"]
+            result[provider] = {**stats, "hit_rate": stats["hits"] / total if total else 0.0}
+        return result
+
+
+class OllamaContextCache:
+    """LRU of Ollama `context` token states for evaluated prefixes, keyed by (model, prefix hash)."""
+
+    def __init__(self, slots: int = OLLAMA_CONTEXT_SLOTS):
+        self.slots = slots
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[int], int]]" = OrderedDict()
+
+    def get(self, model: str, prefix_hash: str) -> Optional[Tuple[List[int], int]]:
+        key = (model, prefix_hash)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, model: str, prefix_hash: str, context: List[int], prefix_tokens: int) -> None:
+        self._entries[(model, prefix_hash)] = (context, prefix_tokens)
+        self._entries.move_to_end((model, prefix_hash))
+        while len(self._entries) > self.slots:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def anthropic_content(prompt) -> list:
+    """Message content blocks with the prefix marked for Anthropic prompt caching."""
+    if not isinstance(prompt, PromptParts):
+        return [{"type": "text", "text": prompt}]
+    if not prompt.prefix:
+        return [{"type": "text", "text": prompt.suffix}]
+    prefix_block = {"type": "text", "text": prompt.prefix}
+    if prompt.cacheable:
+        prefix_block["cache_control"] = {"type": "ephemeral"}
+    return [prefix_block, {"type": "text", "text": prompt.suffix}]
@@ -0,0 +1,195 @@
+"""Prompt templates from prompts_collection.json.
+
+Every list in the collection (`prompts`, `code`, `debug`, ...) contributes
+its entries by `id`. Placeholders are `{name}` or `<name>`; other braces (JSON
+examples in the templates) are literal text. Templates are compiled once into
+literal/placeholder segments and recompiled when the file's mtime or size
+changes. render() checks that exactly the template's placeholders are given
+and memoizes results per (template, arguments), so expanding the same
+template over thousands of queue items costs a dictionary lookup each.
+"""
+
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+COLLECTION_FILE = "prompts_collection.json"
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_]\w*)\}|<([A-Za-z_]\w*)>")
+MEMO_SIZE = 4096
+# Placeholder values are substituted with str(); containers would also break the memo key
+SCALAR_TYPES = (str, int, float, bool)
+
+# Collections per file, reused by long-lived processes (the daemon)
+_collection_cache: Dict[str, "TemplateCollection"] = {}
+
+
+class TemplateError(ValueError):
+    """Unknown template id or arguments that don't match its placeholders."""
+
+
+class PromptTemplate:
+    """A template split into literal text and placeholder names."""
+
+    def __init__(self, template_id: str, text: str, title: str = ""):
+        self.id = template_id
+        self.title = title
+        self.text = text
+        segments: List[Tuple[bool, str]] = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            if match.start() > pos:
+                segments.append((False, text[pos:match.start()]))
+            segments.append((True, match.group(1) or match.group(2)))
+            pos = match.end()
+        if pos < len(text):
+            segments.append((False, text[pos:]))
+        self.segments = tuple(segments)
+        self.placeholders = frozenset(value for is_var, value in segments if is_var)
+
+    def check(self, variables: Dict[str, str]) -> None:
+        missing = self.placeholders - variables.keys()
+        unknown = variables.keys() - self.placeholders
+        if missing or unknown:
+            problems = []
+            if missing:
+                problems.append(f"missing {', '.join(sorted(missing))}")
+            if unknown:
+                problems.append(f"unknown {', '.join(sorted(unknown))}")
+            expected = ", ".join(sorted(self.placeholders)) or "none"
+            raise TemplateError(f"Template {self.id}: {'; '.join(problems)} (placeholders: {expected})")
+
+    def render(self, variables: Dict[str, str]) -> str:
+        self.check(variables)
+        return "".join(str(variables[value]) if is_var else value for is_var, value in self.segments)
+
+
+class TemplateCollection:
+    """Compiled prompts_collection.json."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.templates: Dict[str, PromptTemplate] = {}
+        self._signature = None
+        self._memo: "OrderedDict[tuple, str]" = OrderedDict()
+        self.memo_hits = 0
+        self.renders = 0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Recompile if the file changed. True if it was (re)loaded."""
+        try:
+            stat = self.path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.templates = {}
+        self._memo.clear()
+        if signature is None:
+            return True
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load prompt templates from {self.path}: {e}")
+            return True
+        for section, entries in data.items():
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                if not isinstance(entry, dict) or not entry.get("id") or "template" not in entry:
+                    continue
+                if entry["id"] in self.templates:
+                    logging.warning(f"Duplicate prompt template id {entry['id']} in section {section}, keeping the first")
+                    continue
+                self.templates[entry["id"]] = PromptTemplate(entry["id"], entry["template"], entry.get("title", ""))
+        logging.info(f"Compiled {len(self.templates)} prompt templates from {self.path}")
+        return True
+
+    def get(self, template_id: str) -> PromptTemplate:
+        if not isinstance(template_id, str):
+            raise TemplateError(f"Prompt template id must be a string, got {type(template_id).__name__}")
+        template = self.templates.get(template_id)
+        if template is None:
+            raise TemplateError(f"Unknown prompt template {template_id} in {self.path}")
+        return template
+
+    @staticmethod
+    def _variables(template_id: str, variables) -> Dict[str, str]:
+        """Copy of variables; TemplateError unless it maps names to strings or numbers."""
+        if variables is None:
+            return {}
+        if not isinstance(variables, dict):
+            raise TemplateError(
+                f"Template {template_id}: vars must be an object of name -> value, got {type(variables).__name__}"
+            )
+        for name, value in variables.items():
+            if not isinstance(name, str):
+                raise TemplateError(f"Template {template_id}: variable names must be strings, got {name!r}")
+            if not isinstance(value, SCALAR_TYPES):
+                raise TemplateError(
+                    f"Template {template_id}: value of {name} must be a string or number, got {type(value).__name__}"
+                )
+        return dict(variables)
+
+    def _render(self, template_id: str, variables) -> str:
+        template = self.get(template_id)
+        variables = self._variables(template_id, variables)
+        # Keyed by the text each value renders as (1 and True are equal dict keys but render differently)
+        key = (template_id, tuple(sorted((name, str(value)) for name, value in variables.items())))
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            return cached
+        result = template.render(variables)
+        self.renders += 1
+        self._memo[key] = result
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return result
+
+    def render(self, template_id: str, variables: Optional[Dict[str, str]] = None) -> str:
+        self.refresh()
+        return self._render(template_id, variables)
+
+    def render_many(
+        self, requests: Iterable[Tuple[str, Optional[Dict[str, str]]]]
+    ) -> List[object]:
+        """Render (template id, variables) pairs after one freshness check.
+
+        Each result is the rendered text or the TemplateError for that request.
+        """
+        self.refresh()
+        results = []
+        for template_id, variables in requests:
+            try:
+                results.append(self._render(template_id, variables))
+            except TemplateError as e:
+                results.append(e)
+        return results
+
+
+def get_template_collection(root_dir: str = ".", path: str = COLLECTION_FILE) -> TemplateCollection:
+    full_path = os.path.abspath(os.path.join(root_dir, path))
+    collection = _collection_cache.get(full_path)
+    if collection is None:
+        collection = _collection_cache[full_path] = TemplateCollection(full_path)
+    return collection
+
+
+def parse_vars(pairs: Optional[Iterable[str]]) -> Dict[str, str]:
+    """["file=a.json", "epic_id=42"] -> {"file": "a.json", "epic_id": "42"}."""
+    variables = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition("=")
+        if not sep or not name:
+            raise TemplateError(f"Template variable must be name=value: {pair}")
+        variables[name.strip()] = value
+    return variables
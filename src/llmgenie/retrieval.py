@@ -0,0 +1,342 @@
+"""BM25 retrieval over struct.json and project docs for FOCUSED context selection.
+
+Chunks are modules, functions/methods (name, parameters, docstring) and doc
+sections (markdown headings, top-level keys of JSON knowledge files). The
+index is grouped by source and persisted to .llmstruct_index/bm25.json;
+on refresh only sources whose struct hash or file stat changed are re-chunked.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from llmstruct.incremental import INDEX_DIR
+from llmstruct.struct_io import StructReader, dumps, read_struct, write_struct
+
+INDEX_FILE = "bm25.json"
+INDEX_VERSION = 2
+DEFAULT_DOC_SOURCES = ["docs", "decision_memos", "data/knowledge"]
+DOC_SUFFIXES = (".md", ".json")
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_TOP_K = 20
+MAX_CHUNK_CHARS = 4000
+CHARS_PER_TOKEN = 4
+K1 = 1.5
+B = 0.75
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_HEADING_RE = re.compile(r"^#{1,3}\s+(.+)$", re.MULTILINE)
+
+# Built indexes per root, reused by long-lived processes (the daemon)
+_index_cache: Dict[str, "BM25Index"] = {}
+# The daemon refreshes and searches them from worker threads
+_index_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; identifiers also yield their snake/camel-case parts."""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        parts = [p for piece in word.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _term_counts(text: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def _chunk(chunk_id: str, source: str, kind: str, title: str, text: str) -> dict:
+    text = text[:MAX_CHUNK_CHARS]
+    tf = _term_counts(f"{title}\n{text}")
+    return {
+        "id": chunk_id,
+        "source": source,
+        "kind": kind,
+        "title": title,
+        "text": text,
+        "tf": tf,
+        "length": sum(tf.values()),
+    }
+
+
+def _function_text(func: dict, owner: str = "") -> Tuple[str, str]:
+    name = f"{owner}.{func.get('name')}" if owner else str(func.get("name"))
+    params = ", ".join(str(p) for p in func.get("parameters") or [])
+    text = f"def {name}({params})"
+    if func.get("docstring"):
+        text += f"\n{func['docstring']}"
+    return name, text
+
+
+def module_chunks(module: dict) -> List[dict]:
+    path = module.get("path") or "<unknown>"
+    source = f"struct:{path}"
+    functions = module.get("functions") or []
+    classes = module.get("classes") or []
+    summary = [module.get("module_doc") or module.get("docstring") or ""]
+    if classes:
+        summary.append("Classes: " + ", ".join(str(c.get("name")) for c in classes))
+    if functions:
+        summary.append("Functions: " + ", ".join(str(f.get("name")) for f in functions))
+    if module.get("dependencies"):
+        summary.append("Imports: " + ", ".join(str(d) for d in module["dependencies"]))
+    chunks = [_chunk(source, source, "module", path, "\n".join(s for s in summary if s))]
+    seen: Dict[str, int] = {}
+
+    def chunk_id(name: str) -> str:
+        # Redefined or conditionally defined functions share a name; ids must stay unique
+        seen[name] = seen.get(name, 0) + 1
+        return f"{source}::{name}" if seen[name] == 1 else f"{source}::{name}#{seen[name]}"
+
+    for func in functions:
+        name, text = _function_text(func)
+        chunks.append(_chunk(chunk_id(name), source, "function", f"{path}::{name}", text))
+    for cls in classes:
+        cls_name = str(cls.get("name"))
+        if cls.get("docstring"):
+            chunks.append(
+                _chunk(chunk_id(cls_name), source, "class", f"{path}::{cls_name}", cls["docstring"])
+            )
+        for method in cls.get("methods") or []:
+            name, text = _function_text(method, cls_name)
+            chunks.append(_chunk(chunk_id(name), source, "function", f"{path}::{name}", text))
+    return chunks
+
+
+def doc_chunks(rel_path: str, content: str) -> List[dict]:
+    """Markdown split at #, ## and ### headings; JSON split by top-level key."""
+    source = f"doc:{rel_path}"
+    chunks = []
+    if rel_path.endswith(".json"):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            for key, value in data.items():
+                text = json.dumps(value, ensure_ascii=False, indent=1)
+                chunks.append(_chunk(f"{source}#{key}", source, "doc", f"{rel_path} {key}", text))
+            return chunks
+        return [_chunk(source, source, "doc", rel_path, content)]
+    starts = [m.start() for m in _HEADING_RE.finditer(content)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    for i, start in enumerate(starts):
+        section = content[start:starts[i + 1] if i + 1 < len(starts) else len(content)].strip()
+        if not section:
+            continue
+        heading = _HEADING_RE.match(section)
+        title = f"{rel_path} {heading.group(1).strip()}" if heading else rel_path
+        chunks.append(_chunk(f"{source}#{i}", source, "doc", title, section))
+    return chunks
+
+
+def _module_signature(module: dict) -> str:
+    # Modules parsed with --include-hashes carry a content hash; otherwise hash the entry
+    if module.get("hash"):
+        return str(module["hash"])
+    return hashlib.sha256(dumps(module)).hexdigest()
+
+
+def _iter_doc_files(root_dir: Path, doc_sources: List[str]) -> Iterator[Tuple[str, os.stat_result]]:
+    for source in doc_sources:
+        base = root_dir / source
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.endswith(DOC_SUFFIXES):
+                    full_path = Path(dirpath) / filename
+                    yield full_path.relative_to(root_dir).as_posix(), full_path.stat()
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring, updated per source."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir).absolute()
+        self.path = self.root_dir / INDEX_DIR / INDEX_FILE
+        self.sources: Dict[str, dict] = {}  # source -> {"signature", "chunks"}
+        self.struct_signature = None
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._chunks: Dict[str, dict] = {}
+        self._total_length = 0
+
+    def load(self) -> bool:
+        try:
+            data = read_struct(self.path)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION:
+            return False
+        self.struct_signature = data.get("struct_signature")
+        for source, entry in data.get("sources", {}).items():
+            self._add_source(source, entry["signature"], entry["chunks"])
+        return True
+
+    def save(self) -> None:
+        write_struct(
+            self.path,
+            {
+                "version": INDEX_VERSION,
+                "struct_signature": self.struct_signature,
+                "sources": self.sources,
+            },
+            index=False,
+        )
+
+    def _add_source(self, source: str, signature: str, chunks: List[dict]) -> None:
+        self.sources[source] = {"signature": signature, "chunks": chunks}
+        for chunk in chunks:
+            self._chunks[chunk["id"]] = chunk
+            self._total_length += chunk["length"]
+            for term, count in chunk["tf"].items():
+                self._postings.setdefault(term, {})[chunk["id"]] = count
+
+    def _remove_source(self, source: str) -> None:
+        entry = self.sources.pop(source, None)
+        if entry is None:
+            return
+        for chunk in entry["chunks"]:
+            self._chunks.pop(chunk["id"], None)
+            self._total_length -= chunk["length"]
+            for term in chunk["tf"]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk["id"], None)
+                    if not postings:
+                        del self._postings[term]
+
+    def _replace_source(self, source: str, signature: str, chunks: List[dict]) -> None:
+        self._remove_source(source)
+        self._add_source(source, signature, chunks)
+
+    def refresh(self, struct_path: Optional[str], doc_sources: List[str]) -> int:
+        """Re-chunk sources that changed since the last refresh. Returns how many changed."""
+        changed = 0
+        seen = set()
+        struct_signature = None
+        if struct_path and os.path.exists(struct_path):
+            stat = os.stat(struct_path)
+            struct_signature = [os.path.abspath(struct_path), stat.st_mtime_ns, stat.st_size]
+        if struct_signature is not None and struct_signature == self.struct_signature:
+            seen.update(s for s in self.sources if s.startswith("struct:"))
+        elif struct_signature is not None:
+            for module in StructReader(struct_path).iter_modules():
+                source = f"struct:{module.get('path')}"
+                seen.add(source)
+                signature = _module_signature(module)
+                if self.sources.get(source, {}).get("signature") != signature:
+                    self._replace_source(source, signature, module_chunks(module))
+                    changed += 1
+        self.struct_signature = struct_signature
+
+        for rel_path, stat in _iter_doc_files(self.root_dir, doc_sources):
+            source = f"doc:{rel_path}"
+            seen.add(source)
+            signature = f"{stat.st_mtime_ns}:{stat.st_size}"
+            if self.sources.get(source, {}).get("signature") == signature:
+                continue
+            try:
+                content = (self.root_dir / rel_path).read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError) as e:
+                logging.warning(f"Skipping {rel_path} in retrieval index: {e}")
+                continue
+            self._replace_source(source, signature, doc_chunks(rel_path, content))
+            changed += 1
+
+        for source in [s for s in self.sources if s not in seen]:
+            self._remove_source(source)
+            changed += 1
+        return changed
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[float, dict]]:
+        """Top-k chunks by BM25 score."""
+        if not self._chunks:
+            return []
+        n = len(self._chunks)
+        avg_length = self._total_length / n
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                length = self._chunks[chunk_id]["length"]
+                norm = tf + K1 * (1 - B + B * length / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self._chunks[chunk_id]) for chunk_id, score in ranked]
+
+    def select(self, query: str, token_budget: int = DEFAULT_TOKEN_BUDGET, top_k: int = DEFAULT_TOP_K) -> List[dict]:
+        """Highest-scoring chunks that fit in token_budget, best first."""
+        selected, used = [], 0
+        for score, chunk in self.search(query, top_k):
+            tokens = estimate_tokens(chunk["text"])
+            if used + tokens > token_budget:
+                continue
+            used += tokens
+            selected.append(
+                {
+                    "source": chunk["source"].split(":", 1)[1],
+                    "kind": chunk["kind"],
+                    "title": chunk["title"],
+                    "score": round(score, 3),
+                    "text": chunk["text"],
+                }
+            )
+        return selected
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+
+def get_index(root_dir: str, struct_path: Optional[str], doc_sources: Optional[List[str]] = None) -> BM25Index:
+    """Load (or reuse) the index for root_dir and bring it up to date."""
+    key = str(Path(root_dir).absolute())
+    index = _index_cache.get(key)
+    if index is None:
+        index = BM25Index(root_dir)
+        index.load()
+        _index_cache[key] = index
+    changed = index.refresh(struct_path, doc_sources if doc_sources is not None else DEFAULT_DOC_SOURCES)
+    if changed:
+        index.save()
+        logging.info(f"Retrieval index updated: {changed} sources changed, {len(index)} chunks")
+    return index
+
+
+def build_focused_context(
+    root_dir: str,
+    struct_path: Optional[str],
+    prompt: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    top_k: int = DEFAULT_TOP_K,
+    doc_sources: Optional[List[str]] = None,
+) -> Optional[dict]:
+    """Context holding only the chunks relevant to prompt, or None if nothing matched."""
+    with _index_lock:
+        chunks = get_index(root_dir, struct_path, doc_sources).select(prompt, token_budget, top_k)
+    if not chunks:
+        return None
+    return {"context_mode": "FOCUSED", "token_budget": token_budget, "chunks": chunks}
@@ -0,0 +1,189 @@
+"""Latency-aware backend selection for `LLMClient.query(mode="auto")`.
+
+Each backend has a latency model `base_seconds + seconds_per_1k_tokens * prompt
+size`, scaled by an EWMA of observed/predicted latency so it follows what the
+backend actually does. A request's score is
+
+    predicted latency * (1 + in_flight / concurrency)   # queueing behind running requests
+                      / (1 - error rate)                # expected retries
+    + cost_weight * cost per 1k prompt tokens * size
+
+and the lowest score wins. Backends whose context window can't hold the prompt
+(plus `output_reserve_tokens`) or that have no API key are skipped. With the
+default priors small prompts go to local Ollama and large ones to Grok or
+Anthropic. Settings come from `[router]` in llmstruct.toml; every decision is
+logged, and appended as JSON to `decision_log` when one is configured.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from llmstruct.retrieval import CHARS_PER_TOKEN
+
+BACKENDS = ("grok", "anthropic", "ollama")
+DEFAULTS = {
+    "grok": {"base_seconds": 2.0, "seconds_per_1k_tokens": 0.1, "context_window": 131072,
+             "concurrency": 8, "cost_per_1k_tokens": 0.3},
+    "anthropic": {"base_seconds": 2.5, "seconds_per_1k_tokens": 0.1, "context_window": 200000,
+                  "concurrency": 8, "cost_per_1k_tokens": 1.5},
+    "ollama": {"base_seconds": 1.0, "seconds_per_1k_tokens": 1.5, "context_window": 4096,
+               "concurrency": 1, "cost_per_1k_tokens": 0.0},
+}
+SETTINGS = tuple(DEFAULTS["grok"])
+# Error rates are capped so a failing backend keeps a finite score and stays a fallback.
+# Error rates and latency corrections fade while a backend isn't used, so a recovered one gets picked again
+MAX_ERROR_RATE = 0.95
+STATS_HALF_LIFE_SECONDS = 60.0
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class BackendStats:
+    """Live EWMA latency correction, error rate and in-flight count for one backend."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.latency_ratio = 1.0  # observed / predicted
+        self.latency = None  # EWMA seconds, for reporting
+        self.error_rate = 0.0
+        self.updated_at = time.monotonic()
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds: float, predicted: float, ok: bool) -> None:
+        a = self.alpha
+        self.requests += 1
+        error_rate, latency_ratio = self.current_error_rate(), self.current_latency_ratio()
+        self.updated_at = time.monotonic()
+        self.error_rate = (1 - a) * error_rate + a * (0.0 if ok else 1.0)
+        self.latency_ratio = latency_ratio
+        if not ok:
+            self.errors += 1
+            return
+        self.latency = seconds if self.latency is None else (1 - a) * self.latency + a * seconds
+        self.latency_ratio = (1 - a) * latency_ratio + a * (seconds / max(predicted, 1e-3))
+
+    def _fade(self) -> float:
+        return 0.5 ** ((time.monotonic() - self.updated_at) / STATS_HALF_LIFE_SECONDS)
+
+    def current_error_rate(self) -> float:
+        return self.error_rate * self._fade()
+
+    def current_latency_ratio(self) -> float:
+        return 1.0 + (self.latency_ratio - 1.0) * self._fade()
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.current_error_rate(),
+            "ewma_latency_seconds": self.latency,
+            "latency_ratio": self.current_latency_ratio(),
+            "in_flight": self.in_flight,
+        }
+
+
+class BackendRouter:
+    """Scores backends per request and tracks their live statistics."""
+
+    def __init__(self, config: Optional[dict] = None):
+        self.settings: Dict[str, dict] = {b: dict(DEFAULTS[b]) for b in BACKENDS}
+        self.cost_weight = 1.0
+        self.output_reserve_tokens = 1024
+        self.decision_log: Optional[str] = None
+        self.alpha = 0.2
+        self.configure(config or {})
+        self.stats: Dict[str, BackendStats] = {b: BackendStats(self.alpha) for b in BACKENDS}
+        self.decisions: Dict[str, int] = {b: 0 for b in BACKENDS}
+
+    def configure(self, config: dict) -> None:
+        """Apply a [router] section: per-setting tables ({backend: value}) plus scalars."""
+        for setting in SETTINGS:
+            for backend, value in (config.get(setting) or {}).items():
+                if backend in self.settings:
+                    self.settings[backend][setting] = value
+        # Plural aliases read better in toml: context_windows = { ollama = 8192 }
+        for backend, value in (config.get("context_windows") or {}).items():
+            if backend in self.settings:
+                self.settings[backend]["context_window"] = value
+        for backend, value in (config.get("costs") or {}).items():
+            if backend in self.settings:
+                self.settings[backend]["cost_per_1k_tokens"] = value
+        self.cost_weight = config.get("cost_weight", self.cost_weight)
+        self.output_reserve_tokens = config.get("output_reserve_tokens", self.output_reserve_tokens)
+        self.decision_log = config.get("decision_log", self.decision_log)
+        self.alpha = config.get("ewma_alpha", self.alpha)
+        for stats in getattr(self, "stats", {}).values():
+            stats.alpha = self.alpha
+
+    def predicted_latency(self, backend: str, tokens: int) -> float:
+        s = self.settings[backend]
+        ratio = self.stats[backend].current_latency_ratio()
+        return (s["base_seconds"] + s["seconds_per_1k_tokens"] * tokens / 1000) * ratio
+
+    def score(self, backend: str, tokens: int) -> float:
+        s, stats = self.settings[backend], self.stats[backend]
+        latency = self.predicted_latency(backend, tokens)
+        latency *= 1 + stats.in_flight / max(1, s["concurrency"])
+        latency /= 1 - min(stats.current_error_rate(), MAX_ERROR_RATE)
+        return latency + self.cost_weight * s["cost_per_1k_tokens"] * tokens / 1000
+
+    def rank(self, tokens: int, available: List[str]) -> Tuple[List[str], Dict[str, Optional[float]]]:
+        """Usable backends best first, and every backend's score (None when skipped)."""
+        scores = {}
+        for backend in BACKENDS:
+            fits = tokens + self.output_reserve_tokens <= self.settings[backend]["context_window"]
+            scores[backend] = self.score(backend, tokens) if backend in available and fits else None
+        ranked = sorted((b for b in BACKENDS if scores[b] is not None), key=lambda b: scores[b])
+        return ranked, scores
+
+    def choose(self, prompt_text: str, available: List[str]) -> List[str]:
+        """Rank backends for a prompt and log the decision. Empty if nothing can take it."""
+        tokens = estimate_tokens(prompt_text)
+        ranked, scores = self.rank(tokens, available)
+        shown = ", ".join(f"{b}={s:.2f}" if s is not None else f"{b}=skip" for b, s in scores.items())
+        if ranked:
+            self.decisions[ranked[0]] += 1
+            logging.info(f"Router: {tokens} tokens -> {ranked[0]} ({shown})")
+        else:
+            logging.error(f"Router: no backend can take a {tokens}-token prompt ({shown})")
+        if self.decision_log:
+            self._log_decision(tokens, ranked, scores)
+        return ranked
+
+    def _log_decision(self, tokens: int, ranked: List[str], scores: Dict[str, Optional[float]]) -> None:
+        entry = {
+            "timestamp": time.time(),
+            "prompt_tokens": tokens,
+            "chosen": ranked[0] if ranked else None,
+            "scores": scores,
+            "in_flight": {b: s.in_flight for b, s in self.stats.items()},
+            "error_rate": {b: round(s.current_error_rate(), 4) for b, s in self.stats.items()},
+            "latency_ratio": {b: round(s.current_latency_ratio(), 4) for b, s in self.stats.items()},
+        }
+        try:
+            with open(self.decision_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logging.warning(f"Failed to write router decision log {self.decision_log}: {e}")
+
+    def begin(self, backend: str) -> float:
+        self.stats[backend].in_flight += 1
+        return time.perf_counter()
+
+    def cancel(self, backend: str) -> None:
+        """A request that was cancelled says nothing about the backend."""
+        self.stats[backend].in_flight -= 1
+
+    def end(self, backend: str, started: float, tokens: int, ok: bool) -> None:
+        stats = self.stats[backend]
+        stats.in_flight -= 1
+        stats.record(time.perf_counter() - started, self.predicted_latency(backend, tokens), ok)
+
+    def stats_dict(self) -> Dict[str, dict]:
+        return {b: {**s.as_dict(), "chosen": self.decisions[b]} for b, s in self.stats.items()}
@@ -0,0 +1,201 @@
+"""Selects the rules from rules_manifest.json that apply to a request.
+
+Activation values in the manifest:
+
+    always   active for every request
+    auto     active when the request scope (code, debug, test, ...) is in
+             `applies_to` ("all" matches any scope), or when one of the rule's
+             `triggers` (default: its applies_to scopes) appears in the prompt
+    by_role  active when the request role is in `roles`
+    manual   active only when asked for by id
+
+The manifest is compiled once into dictionaries keyed by role, scope and
+trigger word, so select() is a few set unions plus a sort of the (small)
+active set, and repeated selections are memoized. The manifest is re-read
+when its mtime or size changes. LLMClient puts render() of the selection into
+the prompt prefix, so a request only pays tokens for the rules it needs.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+MANIFEST_FILE = "rules_manifest.json"
+ANY_SCOPE = "all"
+# Manifest changes are noticed within this many seconds
+CHECK_INTERVAL = 1.0
+MEMO_SIZE = 1024
+WORD_RE = re.compile(r"[\w-]+")
+
+# Engines per manifest path, reused by long-lived processes (the daemon)
+_engine_cache: Dict[str, "RulesEngine"] = {}
+
+
+class RuleQuery(NamedTuple):
+    """What a request asks for: its role, its scope and rules requested by id."""
+    role: Optional[str] = None
+    scope: Optional[str] = None
+    ids: Tuple[str, ...] = ()
+
+
+class RulesEngine:
+    """Compiled rules_manifest.json."""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = Path(manifest_path)
+        self.rules: Dict[str, dict] = {}
+        self._signature = None
+        self._checked_at = 0.0
+        self._memo: Dict[tuple, Tuple[dict, ...]] = {}
+        self.compiles = 0
+        self._load()
+
+    def _stat_signature(self):
+        try:
+            stat = self.manifest_path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> None:
+        signature = self._stat_signature()
+        rules = []
+        if signature is not None:
+            try:
+                with self.manifest_path.open("r", encoding="utf-8") as f:
+                    rules = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Failed to load rules from {self.manifest_path}: {e}")
+        if isinstance(rules, dict):
+            rules = rules.get("rules", [])
+        self._compile([r for r in rules if isinstance(r, dict) and r.get("id")])
+        self._signature = signature
+        self._checked_at = time.monotonic()
+
+    def _compile(self, rules: List[dict]) -> None:
+        self.rules = {r["id"]: r for r in rules}
+        # Rank fixes the output order once, so selections sort plain ints
+        ordered = sorted(rules, key=lambda r: (r.get("priority", 100), r["id"]))
+        self._rank = {r["id"]: i for i, r in enumerate(ordered)}
+        self._always: FrozenSet[str] = frozenset()
+        self._by_role: Dict[str, FrozenSet[str]] = {}
+        self._by_scope: Dict[str, FrozenSet[str]] = {}
+        self._by_trigger: Dict[str, FrozenSet[str]] = {}
+        always, by_role, by_scope, by_trigger = set(), {}, {}, {}
+        for rule in rules:
+            rule_id = rule["id"]
+            activation = set(rule.get("activation") or [])
+            if "always" in activation:
+                always.add(rule_id)
+            if "by_role" in activation:
+                for role in rule.get("roles") or []:
+                    by_role.setdefault(role, set()).add(rule_id)
+            if "auto" in activation:
+                scopes = rule.get("applies_to") or [ANY_SCOPE]
+                for scope in scopes:
+                    by_scope.setdefault(scope, set()).add(rule_id)
+                triggers = rule.get("triggers") or [s for s in scopes if s != ANY_SCOPE]
+                for trigger in triggers:
+                    by_trigger.setdefault(trigger.lower(), set()).add(rule_id)
+        self._always = frozenset(always)
+        self._by_role = {k: frozenset(v) for k, v in by_role.items()}
+        self._by_scope = {k: frozenset(v) for k, v in by_scope.items()}
+        self._by_trigger = {k: frozenset(v) for k, v in by_trigger.items()}
+        self._memo = {}
+        self.compiles += 1
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recompile if the manifest changed. True if it was reloaded."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        if self._stat_signature() == self._signature:
+            return False
+        logging.info(f"Rules manifest {self.manifest_path} changed, recompiling")
+        self._load()
+        return True
+
+    def _triggered(self, prompt: str) -> FrozenSet[str]:
+        if not prompt or not self._by_trigger:
+            return frozenset()
+        hits = set()
+        for word in set(WORD_RE.findall(prompt.lower())):
+            rules = self._by_trigger.get(word)
+            if rules:
+                hits |= rules
+        return frozenset(hits)
+
+    def select(self, query: RuleQuery = RuleQuery(), prompt: str = "") -> Tuple[dict, ...]:
+        """Active rules for a request, highest priority (lowest number) first."""
+        self.refresh()
+        triggered = self._triggered(prompt)
+        key = (query.role, query.scope, tuple(query.ids), triggered)
+        selected = self._memo.get(key)
+        if selected is not None:
+            return selected
+        active = set(self._always) | triggered
+        if query.role:
+            active |= self._by_role.get(query.role, frozenset())
+        active |= self._by_scope.get(ANY_SCOPE, frozenset())
+        if query.scope:
+            active |= self._by_scope.get(query.scope, frozenset())
+        active.update(rule_id for rule_id in query.ids if rule_id in self.rules)
+        unknown = [rule_id for rule_id in query.ids if rule_id not in self.rules]
+        if unknown:
+            logging.warning(f"Unknown rule ids requested: {', '.join(unknown)}")
+        selected = tuple(self.rules[r] for r in sorted(active, key=self._rank.__getitem__))
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = selected
+        return selected
+
+
+def render_rules(rules: Sequence[dict]) -> str:
+    """Prompt text for the selected rules ("" for none)."""
+    if not rules:
+        return ""
+    lines = ["Rules:"]
+    for rule in rules:
+        line = f"- [{rule.get('type', 'rule')}, P{rule.get('priority', '-')}] {rule.get('name', rule['id'])}"
+        if rule.get("description"):
+            line += f": {rule['description']}"
+        if rule.get("examples"):
+            line += f" (e.g. {'; '.join(rule['examples'])})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def get_rules_engine(root_dir: str, manifest: str = MANIFEST_FILE) -> Optional[RulesEngine]:
+    """Engine for root_dir's manifest, or None if there is no manifest."""
+    path = os.path.abspath(os.path.join(root_dir, manifest))
+    engine = _engine_cache.get(path)
+    if engine is None:
+        if not os.path.exists(path):
+            return None
+        engine = _engine_cache[path] = RulesEngine(path)
+    return engine
+
+
+def benchmark(selections: int = 100000) -> dict:
+    """Average select() latency on the project manifest, memoized and with manifest checks."""
+    engine = RulesEngine(MANIFEST_FILE)
+    queries = [
+        (RuleQuery("llm_engineer", "code"), "fix the failing test in the parser"),
+        (RuleQuery("reviewer", "debug"), "why does the daemon hang"),
+        (RuleQuery(None, None, ("cursor_rules",)), "rename rule files"),
+    ]
+    start = time.perf_counter()
+    for i in range(selections):
+        query, prompt = queries[i % len(queries)]
+        engine.select(query, prompt)
+    elapsed = time.perf_counter() - start
+    return {"rules": len(engine.rules), "selections": selections, "avg_us": elapsed / selections * 1e6}
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
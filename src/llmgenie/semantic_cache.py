@@ -0,0 +1,297 @@
+"""Local semantic response cache: hashed n-gram TF-IDF vectors + NumPy cosine search.
+
+Near-identical prompts ("show status of epic X", "status of epic X?") hit the
+same entry. Entries are scoped (LLMClient uses mode, model and the prompt
+prefix hash), so an answer is only reused for the same context. Runs offline
+on CPU; the only dependency is NumPy.
+
+Run `python -m llmstruct.semantic_cache` for a precision/latency benchmark.
+"""
+
+import logging
+import math
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_DIM = 2048
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_ENTRIES = 2000
+MAX_PROMPT_CHARS = 1000  # long prompts carry their own context text and all look alike
+CHAR_NGRAMS = (3, 4, 5)
+REFRESH_GROWTH = 0.25  # re-weight a scope once it grew by this fraction since the last IDF snapshot
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_DIGIT_RE = re.compile(r"\d")
+# Filler words that change phrasing but not the request
+STOPWORDS = frozenset(
+    ["a", "an", "the", "s", "is", "are", "what", "please", "me", "can", "you", "could", "show"]
+)
+
+
+def normalize(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def guard_tokens(words: List[str]) -> frozenset:
+    """Tokens that must match exactly: numbers and ids ("42", "epic-7" -> "7")."""
+    return frozenset(w for w in words if _DIGIT_RE.search(w))
+
+
+class HashedNgramEmbedder:
+    """Term-frequency vectors over hashed word unigrams/bigrams and character n-grams.
+
+    crc32 keeps bucket assignment stable across processes; a second hash bit
+    picks the sign so collisions cancel out on average.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+
+    def features(self, words: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for word in words:
+            counts["w:" + word] = counts.get("w:" + word, 0) + 1
+        for first, second in zip(words, words[1:]):
+            key = f"b:{first} {second}"
+            counts[key] = counts.get(key, 0) + 1
+        joined = f" {' '.join(words)} "
+        for n in CHAR_NGRAMS:
+            for i in range(len(joined) - n + 1):
+                key = "c:" + joined[i:i + n]
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def embed(self, words: List[str]) -> "np.ndarray":
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self.features(words).items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * (1.0 + math.log(count))
+        return vector
+
+
+class _Scope:
+    """Rows for one scope: raw TF vectors, their TF-IDF unit vectors and the answers."""
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.tf = np.zeros((capacity, dim), dtype=np.float32)
+        self.weighted = np.zeros((capacity, dim), dtype=np.float32)
+        self.df = np.zeros(dim, dtype=np.float32)
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.size = 0
+        self.snapshot_size = 0
+        self.guards: List[frozenset] = []
+        self.prompts: List[str] = []
+        self.responses: List[str] = []
+        self.last_used: List[int] = []
+
+    def _grow(self) -> None:
+        capacity = self.tf.shape[0] * 2
+        for name in ("tf", "weighted"):
+            matrix = getattr(self, name)
+            grown = np.zeros((capacity, matrix.shape[1]), dtype=np.float32)
+            grown[: self.size] = matrix[: self.size]
+            setattr(self, name, grown)
+
+    def _weight(self, tf: "np.ndarray") -> "np.ndarray":
+        weighted = tf * self.idf
+        norm = np.linalg.norm(weighted, axis=-1, keepdims=True)
+        return weighted / np.maximum(norm, 1e-12)
+
+    def refresh_idf(self) -> None:
+        """Recompute IDF from the current rows and re-weight them (smoothed, like sklearn)."""
+        self.idf = (np.log((1.0 + self.size) / (1.0 + self.df)) + 1.0).astype(np.float32)
+        self.weighted[: self.size] = self._weight(self.tf[: self.size])
+        self.snapshot_size = self.size
+
+    def add(self, tf, guard, prompt, response, tick) -> None:
+        if self.size == self.tf.shape[0]:
+            self._grow()
+        row = self.size
+        self.tf[row] = tf
+        self.df += tf != 0
+        self.size += 1
+        self.guards.append(guard)
+        self.prompts.append(prompt)
+        self.responses.append(response)
+        self.last_used.append(tick)
+        if self.size > self.snapshot_size * (1.0 + REFRESH_GROWTH):
+            self.refresh_idf()
+        else:
+            self.weighted[row] = self._weight(tf)
+
+    def remove(self, row: int) -> None:
+        """Drop a row by moving the last row into its place."""
+        last = self.size - 1
+        self.df -= self.tf[row] != 0
+        if row != last:
+            self.tf[row] = self.tf[last]
+            self.weighted[row] = self.weighted[last]
+            for items in (self.guards, self.prompts, self.responses, self.last_used):
+                items[row] = items[last]
+        for items in (self.guards, self.prompts, self.responses, self.last_used):
+            items.pop()
+        self.size = last
+
+    def search(self, tf) -> Tuple[int, float]:
+        """Best row by cosine similarity, or (-1, 0.0) when empty."""
+        if not self.size:
+            return -1, 0.0
+        scores = self.weighted[: self.size] @ self._weight(tf)
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+
+class SemanticCache:
+    """Size-bounded semantic cache. The least recently used entry is evicted across all scopes."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        dim: int = DEFAULT_DIM,
+    ):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for the semantic cache (pip install numpy)")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedder = HashedNgramEmbedder(dim)
+        self._scopes: Dict[str, _Scope] = {}
+        self._tick = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = 0.0
+
+    def accepts(self, prompt: str) -> bool:
+        return len(prompt) <= MAX_PROMPT_CHARS
+
+    def lookup(self, scope: str, prompt: str) -> Optional[str]:
+        """Return the cached response for a similar prompt in the same scope."""
+        start = time.perf_counter()
+        response = None
+        entries = self._scopes.get(scope)
+        if entries is not None:
+            words = normalize(prompt)
+            row, score = entries.search(self.embedder.embed(words))
+            # Numbers and ids must match exactly: "epic 12" is not "epic 13"
+            if row >= 0 and score >= self.threshold and entries.guards[row] == guard_tokens(words):
+                self._tick += 1
+                entries.last_used[row] = self._tick
+                response = entries.responses[row]
+                logging.debug(f"Semantic cache hit ({score:.3f}): {entries.prompts[row]!r}")
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.lookup_seconds += time.perf_counter() - start
+        return response
+
+    def store(self, scope: str, prompt: str, response: str) -> None:
+        while self.entries >= self.max_entries:
+            self._evict()
+        words = normalize(prompt)
+        self._tick += 1
+        entries = self._scopes.setdefault(scope, _Scope(self.embedder.dim))
+        entries.add(self.embedder.embed(words), guard_tokens(words), prompt, response, self._tick)
+        self.entries += 1
+
+    def _evict(self) -> None:
+        victim = None
+        for name, entries in self._scopes.items():
+            if not entries.size:
+                continue
+            row = min(range(entries.size), key=entries.last_used.__getitem__)
+            if victim is None or entries.last_used[row] < victim[2]:
+                victim = (name, row, entries.last_used[row])
+        if victim is None:
+            return
+        name, row, _ = victim
+        self._scopes[name].remove(row)
+        if not self._scopes[name].size:
+            del self._scopes[name]
+        self.entries -= 1
+        self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_lookup_ms": self.lookup_seconds * 1000 / lookups if lookups else 0.0,
+        }
+
+
+# Paraphrase pairs that should hit, and near-misses that must not
+BENCHMARK_PAIRS = [
+    ("show status of epic 12", "status of epic 12?", True),
+    ("Show the status of epic 12", "what's the status of epic 12", True),
+    ("list open tasks for epic 7", "list the open tasks for epic 7", True),
+    ("summarize the parse module", "summarize parse module", True),
+    ("explain how the queue processes workflows", "explain how queue processes workflows?", True),
+    ("what does LLMClient.query do", "What does LLMClient.query do?", True),
+    ("list open tasks for epic 7", "open tasks in epic 7", True),
+    ("summarize the parse module", "summary of the parse module", True),
+    ("status of epic 12", "give me the current status of epic 12", True),
+    ("show status of epic 12", "show status of epic 13", False),
+    ("list open tasks for epic 7", "list closed tasks for epic 7", False),
+    ("summarize the parse module", "summarize the daemon module", False),
+    ("explain how the queue processes workflows", "explain how the watcher detects changes", False),
+    ("delete file tmp/a.txt", "create file tmp/a.txt", False),
+    ("what does LLMClient.query do", "what does LLMClient.close do", False),
+]
+
+
+def benchmark(threshold: float = DEFAULT_THRESHOLD, sizes=(100, 1000, 2000), lookups: int = 200) -> dict:
+    """Precision/recall on BENCHMARK_PAIRS and lookup latency at several cache sizes."""
+    cache = SemanticCache(threshold=threshold)
+    tp = fp = fn = tn = 0
+    for i, (stored, asked, should_hit) in enumerate(BENCHMARK_PAIRS):
+        scope = f"pair-{i}"
+        cache.store(scope, stored, stored)
+        hit = cache.lookup(scope, asked) is not None
+        tp += hit and should_hit
+        fp += hit and not should_hit
+        fn += not hit and should_hit
+        tn += not hit and not should_hit
+    result = {
+        "threshold": threshold,
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 1.0,
+        "false_positives": fp,
+        "true_negatives": tn,
+        "latency": {},
+    }
+    templates = ["show status of epic {}", "list open tasks for module m{}", "explain function f{} in parse.py"]
+    for size in sizes:
+        cache = SemanticCache(threshold=threshold, max_entries=size)
+        for i in range(size):
+            cache.store("bench", templates[i % len(templates)].format(i), "answer")
+        start = time.perf_counter()
+        for i in range(lookups):
+            cache.lookup("bench", templates[i % len(templates)].format(i) + "?")
+        result["latency"][size] = {
+            "avg_lookup_ms": (time.perf_counter() - start) * 1000 / lookups,
+            "hit_rate": cache.stats()["hit_rate"],
+        }
+    return result
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark(), indent=2))
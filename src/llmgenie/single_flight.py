@@ -0,0 +1,75 @@
+"""Single-flight deduplication of identical concurrent LLM requests.
+
+The first caller with a given key starts the provider request; callers that
+arrive with the same key while it is in flight await the same result instead
+of sending their own. Nothing is kept once the request finishes, so this only
+merges requests that overlap in time (the semantic cache covers reuse later).
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+
+def request_key(mode: str, model: Optional[str], prefix_hash: str, prompt: str) -> str:
+    """Identity of an LLM request: same mode, model, context prefix and prompt."""
+    digest = hashlib.sha256()
+    for part in (mode, model or "", prefix_hash, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Shares one in-flight task per key between concurrent callers.
+
+    The task runs independently of whoever started it: a caller that is
+    cancelled only stops waiting. The task itself is cancelled once every
+    caller waiting on it has gone.
+    """
+
+    def __init__(self):
+        # key -> [task, waiting callers]
+        self._in_flight: Dict[str, list] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        entry = self._in_flight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(factory())
+            entry = [task, 0]
+            self._in_flight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logging.info(f"Coalesced with in-flight request {key[:12]} ({entry[1]} already waiting)")
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            # Only reachable with the task unfinished when this caller was cancelled
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        entry = self._in_flight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._in_flight[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.coalesced
+        return {
+            "requests": total,
+            "provider_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / total if total else 0.0,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,380 @@
+"""Fast, atomic struct.json serialization and lazy reading.
+
+The writer streams struct data module by module into a temp file next to the
+target and os.replace()s it into place, so readers never see a torn file.
+Output is compact by default; pretty mode matches json.dump(indent=2).
+orjson is used when installed; its output matches the stdlib backend byte
+for byte except for float exponent notation (1e-07 vs 1e-7).
+
+While streaming, the writer records the byte range of every module and
+top-level key in a sidecar `<file>.idx`. StructReader uses it to seek to
+single modules instead of loading the whole tree.
+"""
+
+import io
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import abc
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+STREAMED_KEY = "modules"
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+
+def _resolve_backend(backend: str) -> str:
+    if backend == "auto":
+        return "orjson" if ORJSON_AVAILABLE else "json"
+    if backend == "orjson" and not ORJSON_AVAILABLE:
+        logging.warning("orjson is not installed, falling back to json")
+        return "json"
+    return backend
+
+
+def dumps(obj, pretty: bool = False, backend: str = "auto") -> bytes:
+    """Serialize one value to UTF-8 JSON bytes."""
+    if _resolve_backend(backend) == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the stdlib handles them
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _indent(chunk: bytes, level: int) -> bytes:
+    # JSON strings never contain raw newlines, so re-indenting by line is safe
+    return chunk.replace(b"\n", b"\n" + b"  " * level)
+
+
+class _CountingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.offset = 0
+
+    def write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.offset += len(data)
+
+
+def _write_streaming(out: _CountingWriter, struct_data: dict, pretty: bool, backend: str) -> dict:
+    """Write struct_data, emitting the modules list one module at a time.
+
+    Returns the offset index: {"keys": {key: [offset, length]},
+    "modules": [{"path", "offset", "length"}]}.
+    """
+    if not isinstance(struct_data, dict) or not struct_data:
+        out.write(dumps(struct_data, pretty, backend))
+        return {"keys": {}, "modules": []}
+    return _write_items(out, struct_data.items(), pretty, backend)
+
+
+def _write_items(out: _CountingWriter, items, pretty: bool, backend: str) -> dict:
+    """Write a non-empty object from (key, value) pairs; the modules value may be any iterable."""
+    index = {"keys": {}, "modules": []}
+    newline = b"\n" if pretty else b""
+    key_sep = b": " if pretty else b":"
+    out.write(b"{")
+    for i, (key, value) in enumerate(items):
+        if i:
+            out.write(b",")
+        out.write(newline + (b"  " if pretty else b"") + dumps(str(key), backend=backend) + key_sep)
+        modules = iter(value) if key == STREAMED_KEY and isinstance(value, (list, abc.Iterator)) else None
+        first = next(modules, None) if modules is not None else None
+        if first is None:
+            if modules is not None:
+                value = []
+            chunk = _indent(dumps(value, pretty, backend), 1) if pretty else dumps(value, False, backend)
+            index["keys"][str(key)] = [out.offset, len(chunk)]
+            out.write(chunk)
+            continue
+        index["keys"][str(key)] = [out.offset, 0]
+        out.write(b"[")
+        for j, module in enumerate(itertools.chain([first], modules)):
+            if j:
+                out.write(b",")
+            out.write(newline + (b"    " if pretty else b""))
+            chunk = dumps(module, pretty, backend)
+            if pretty:
+                chunk = _indent(chunk, 2)
+            path = module.get("path") if isinstance(module, dict) else None
+            index["modules"].append({"path": path, "offset": out.offset, "length": len(chunk)})
+            out.write(chunk)
+        out.write(newline + (b"  " if pretty else b"") + b"]")
+        start = index["keys"][str(key)][0]
+        index["keys"][str(key)][1] = out.offset - start
+    out.write(newline + b"}")
+    return index
+
+
+def write_struct(
+    path, struct_data: dict, pretty: bool = False, backend: str = "auto", index: bool = True
+) -> dict:
+    """Atomically write struct_data to `path`, plus its offset index unless index=False.
+
+    Returns {"bytes", "modules", "seconds", "backend"}.
+    """
+    start = time.perf_counter()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb", buffering=1024 * 1024) as f:
+            out = _CountingWriter(f)
+            offsets = _write_streaming(out, struct_data, pretty, backend)
+        os.chmod(tmp_path, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        tmp_stat = os.stat(tmp_path)
+        if index:
+            offsets.update(
+                version=INDEX_VERSION, size=tmp_stat.st_size, mtime_ns=tmp_stat.st_mtime_ns
+            )
+            write_struct(index_path(path), offsets, index=False)
+        else:
+            _remove_stale_index(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    stats = {
+        "bytes": out.offset,
+        "modules": len(offsets["modules"]),
+        "seconds": time.perf_counter() - start,
+        "backend": _resolve_backend(backend),
+    }
+    logging.debug(f"Wrote {path}: {stats}")
+    return stats
+
+
+def index_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _remove_stale_index(path) -> None:
+    stale = index_path(path)
+    if stale.exists() and not str(path).endswith(INDEX_SUFFIX):
+        stale.unlink()
+
+
+def loads(data: bytes):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_struct(path) -> Optional[dict]:
+    """Load a whole struct.json (orjson when available)."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def project(obj: dict, fields: Iterable[str]) -> dict:
+    """Keep only `fields` of obj. Dotted fields descend into dicts and lists of dicts,
+    e.g. ["path", "functions.name", "functions.parameters"]."""
+    result = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        if head not in obj:
+            continue
+        value = obj[head]
+        if rest and isinstance(value, list):
+            targets = result.setdefault(head, [{} for _ in value])
+            for target, item in zip(targets, value):
+                if isinstance(item, dict):
+                    target.update(project(item, [rest]))
+        elif rest and isinstance(value, dict):
+            result.setdefault(head, {}).update(project(value, [rest]))
+        else:
+            result[head] = value
+    return result
+
+
+def strip_fields(module: dict, function_fields: Iterable[str]) -> dict:
+    """Return module without the given per-function/method fields (e.g. "source")."""
+    drop = set(function_fields)
+
+    def _strip_functions(functions):
+        return [
+            {k: v for k, v in func.items() if k not in drop} if isinstance(func, dict) else func
+            for func in functions
+        ]
+
+    result = dict(module)
+    if isinstance(result.get("functions"), list):
+        result["functions"] = _strip_functions(result["functions"])
+    if isinstance(result.get("classes"), list):
+        result["classes"] = [
+            {**cls, "methods": _strip_functions(cls["methods"])}
+            if isinstance(cls, dict) and isinstance(cls.get("methods"), list) else cls
+            for cls in result["classes"]
+        ]
+    return result
+
+
+class StructReader:
+    """Lazy access to struct.json: iterate or seek modules without loading the whole tree.
+
+    Uses the offset index written by write_struct. Without a valid index it
+    streams with ijson when installed, otherwise it loads the file once.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._index = self._load_index()
+        self._by_path: Optional[Dict[str, dict]] = None
+        self._full: Optional[dict] = None
+        if self._index is None:
+            logging.debug(f"No valid offset index for {self.path}, using fallback reader")
+
+    def _load_index(self) -> Optional[dict]:
+        idx_path = index_path(self.path)
+        try:
+            index = read_struct(idx_path)
+            stat = self.path.stat()
+        except (OSError, ValueError):
+            return None
+        if (
+            index.get("version") != INDEX_VERSION
+            or index.get("size") != stat.st_size
+            or index.get("mtime_ns") != stat.st_mtime_ns
+        ):
+            return None
+        return index
+
+    @property
+    def indexed(self) -> bool:
+        return self._index is not None
+
+    def _read_range(self, f, offset: int, length: int):
+        f.seek(offset)
+        return loads(f.read(length))
+
+    def _load_full(self) -> dict:
+        if self._full is None:
+            logging.warning(f"Loading all of {self.path} (no offset index, ijson not installed)")
+            self._full = read_struct(self.path)
+        return self._full
+
+    def module_paths(self) -> List[str]:
+        if self._index is not None:
+            return [entry["path"] for entry in self._index["modules"]]
+        return [module.get("path") for module in self.iter_modules(fields=["path"])]
+
+    def get(self, key: str, default=None):
+        """Read one top-level value other than the modules list (e.g. "metadata")."""
+        if self._index is not None:
+            entry = self._index["keys"].get(key)
+            if entry is None:
+                return default
+            with self.path.open("rb") as f:
+                return self._read_range(f, *entry)
+        return self._load_full().get(key, default)
+
+    def top_level_keys(self) -> List[str]:
+        if self._index is not None:
+            return list(self._index["keys"])
+        return list(self._load_full())
+
+    def iter_modules(self, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """Yield modules one at a time, optionally projected to `fields`."""
+        fields = list(fields) if fields is not None else None
+        if self._index is not None:
+            with self.path.open("rb") as f:
+                for entry in self._index["modules"]:
+                    module = self._read_range(f, entry["offset"], entry["length"])
+                    yield project(module, fields) if fields is not None else module
+        elif IJSON_AVAILABLE:
+            with self.path.open("rb") as f:
+                for module in ijson.items(f, f"{STREAMED_KEY}.item", use_float=True):
+                    yield project(module, fields) if fields is not None else module
+        else:
+            for module in self._load_full().get(STREAMED_KEY, []):
+                yield project(module, fields) if fields is not None else module
+
+    def get_module(self, path: str, fields: Optional[Iterable[str]] = None) -> Optional[dict]:
+        """Read the module whose "path" equals `path`."""
+        if self._index is not None:
+            if self._by_path is None:
+                self._by_path = {entry["path"]: entry for entry in self._index["modules"]}
+            entry = self._by_path.get(path)
+            if entry is None:
+                return None
+            with self.path.open("rb") as f:
+                module = self._read_range(f, entry["offset"], entry["length"])
+            return project(module, fields) if fields is not None else module
+        for module in self.iter_modules():
+            if module.get("path") == path:
+                return project(module, fields) if fields is not None else module
+        return None
+
+    def dump(self, drop_function_fields: Iterable[str] = (), pretty: bool = True) -> str:
+        """Serialize the document as json.dumps(indent=2, ensure_ascii=False) would (compact
+        with pretty=False), without the given per-function fields.
+
+        With an offset index, modules are read, stripped and written one at a
+        time, so the tree is never materialized; without one the file is
+        loaded once. Either way the output is the same.
+        """
+        drop = list(drop_function_fields)
+
+        def strip(modules):
+            return (strip_fields(m, drop) for m in modules) if drop else modules
+
+        if self._index is None:
+            document = read_struct(self.path)
+            if not isinstance(document, dict) or not document:
+                return dumps(document, pretty).decode("utf-8")
+            items = (
+                (key, strip(value) if key == STREAMED_KEY and isinstance(value, list) else value)
+                for key, value in document.items()
+            )
+        else:
+            if not self._index["keys"]:
+                return dumps(read_struct(self.path), pretty).decode("utf-8")
+            streamed = bool(self._index["modules"])
+            items = (
+                (key, strip(self.iter_modules()) if key == STREAMED_KEY and streamed else self.get(key))
+                for key in self._index["keys"]
+            )
+        buffer = io.BytesIO()
+        _write_items(_CountingWriter(buffer), items, pretty, "auto")
+        return buffer.getvalue().decode("utf-8")
+
+    def load(self, drop_function_fields: Iterable[str] = ()) -> dict:
+        """Materialize the document, dropping per-function fields (e.g. "source") module by module."""
+        drop = list(drop_function_fields)
+        result = {}
+        for key in self.top_level_keys():
+            if key == STREAMED_KEY:
+                result[key] = [
+                    strip_fields(module, drop) if drop else module
+                    for module in self.iter_modules()
+                ]
+            else:
+                result[key] = self.get(key)
+        return result
@@ -0,0 +1,295 @@
+"""Local stand-in for the Grok, Anthropic and Ollama HTTP APIs.
+
+Benchmarks and `loadtest --provider stub` point LLMClient here (GROK_API_URL,
+ANTHROPIC_API_URL, OLLAMA_HOST) so the query path runs offline with a known
+latency. Each provider gets its own latency distribution:
+
+    "50" / "fixed:50"        always 50 ms
+    "uniform:20:80"          uniformly between 20 and 80 ms
+    "normal:100:15"          mean 100 ms, standard deviation 15 ms
+    "lognormal:80:0.5"       median 80 ms, sigma 0.5 (long tail, like real APIs)
+
+Run standalone with `python -m llmstruct.stub_provider --port 11435`.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import Dict, List, Optional, Union
+
+from aiohttp import web
+
+PROVIDERS = ("grok", "anthropic", "ollama")
+DEFAULT_LATENCY = "lognormal:80:0.4"
+RESPONSE_WORDS = ("the", "module", "parses", "struct", "json", "and", "returns", "context")
+
+
+class LatencyDistribution:
+    """Samples response latencies (seconds) from a spec string (milliseconds)."""
+
+    def __init__(self, spec: Union[str, float, int] = DEFAULT_LATENCY, rng: Optional[random.Random] = None):
+        self.spec = str(spec)
+        self._rng = rng or random.Random()
+        kind, *params = self.spec.split(":")
+        if not params:
+            kind, params = "fixed", [kind]
+        try:
+            self.kind, self.params = kind, [float(p) for p in params]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {self.spec}") from None
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if expected.get(kind) != len(self.params):
+            raise ValueError(f"Invalid latency spec: {self.spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = self._rng.gauss(p[0], p[1])
+        else:
+            ms = p[0] * math.exp(self._rng.gauss(0, p[1]))
+        return max(ms, 0.0) / 1000
+
+    def mean(self) -> float:
+        """Expected latency in seconds."""
+        p = self.params
+        if self.kind == "fixed":
+            return p[0] / 1000
+        if self.kind == "uniform":
+            return (p[0] + p[1]) / 2000
+        if self.kind == "normal":
+            return p[0] / 1000
+        return p[0] * math.exp(p[1] ** 2 / 2) / 1000
+
+
+class StubProvider:
+    """aiohttp server answering /v1/chat/completions, /v1/messages and /api/generate.
+
+    latency: one spec for every provider, or {provider: spec}.
+    error_rate: fraction of requests answered with HTTP 500.
+    """
+
+    def __init__(
+        self,
+        latency: Union[str, Dict[str, str]] = DEFAULT_LATENCY,
+        error_rate: float = 0.0,
+        response_words: int = 40,
+        model_load_ms: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self._rng = random.Random(seed)
+        specs = latency if isinstance(latency, dict) else {p: latency for p in PROVIDERS}
+        self.latency = {
+            p: LatencyDistribution(specs.get(p, DEFAULT_LATENCY), self._rng) for p in PROVIDERS
+        }
+        self.error_rate = error_rate
+        self.response_words = response_words
+        self.model_load_ms = model_load_ms
+        self.requests = {p: 0 for p in PROVIDERS}
+        self.errors = {p: 0 for p in PROVIDERS}
+        # Bodies of /api/generate requests, in arrival order
+        self.ollama_requests: List[dict] = []
+        self._loaded_models = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url: Optional[str] = None
+
+    def _app(self) -> web.Application:
+        app = web.Application(client_max_size=256 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._grok)
+        app.router.add_post("/v1/messages", self._anthropic)
+        app.router.add_post("/api/generate", self._ollama)
+        app.router.add_get("/api/ps", self._ollama_ps)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; port 0 picks a free port. Returns the base URL."""
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points a new LLMClient at this server."""
+        return {
+            "GROK_API_URL": f"{self.base_url}/v1/chat/completions",
+            "ANTHROPIC_API_URL": f"{self.base_url}/v1/messages",
+            "OLLAMA_HOST": self.base_url,
+            "GROK_API_KEY": "stub",
+            "ANTHROPIC_API_KEY": "stub",
+        }
+
+    def configure_client(self, client) -> None:
+        """Point an existing LLMClient at this server."""
+        client.grok_url = f"{self.base_url}/v1/chat/completions"
+        client.anthropic_url = f"{self.base_url}/v1/messages"
+        client.ollama_host = self.base_url
+        client.ollama_pool.set_hosts([self.base_url])
+        client.grok_api_key = client.grok_api_key or "stub"
+        client.anthropic_api_key = client.anthropic_api_key or "stub"
+
+    def stats(self) -> Dict[str, dict]:
+        return {p: {"requests": self.requests[p], "errors": self.errors[p]} for p in PROVIDERS}
+
+    async def _respond(self, provider: str) -> bool:
+        """Wait out the sampled latency. False if this request should fail."""
+        self.requests[provider] += 1
+        await asyncio.sleep(self.latency[provider].sample())
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors[provider] += 1
+            return False
+        return True
+
+    def _words(self):
+        return [RESPONSE_WORDS[i % len(RESPONSE_WORDS)] for i in range(self.response_words)]
+
+    @staticmethod
+    def _prompt_tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    async def _sse(self, request, events) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in events:
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _grok(self, request: web.Request) -> web.StreamResponse:
+        data = await request.json()
+        if not await self._respond("grok"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        prompt = "".join(m.get("content", "") for m in data.get("messages", []) if isinstance(m.get("content"), str))
+        words = self._words()
+        if data.get("stream"):
+            return await self._sse(request, ({"choices": [{"delta": {"content": w + " "}}]} for w in words))
+        return web.json_response({
+            "choices": [{"message": {"role": "assistant", "content": " ".join(words)}}],
+            "usage": {
+                "prompt_tokens": self._prompt_tokens(prompt),
+                "completion_tokens": len(words),
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    async def _anthropic(self, request: web.Request) -> web.StreamResponse:
+        data = await request.json()
+        if not await self._respond("anthropic"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        words = self._words()
+        usage = {"input_tokens": 0, "output_tokens": len(words), "cache_read_input_tokens": 0}
+        if data.get("stream"):
+            events = [{"type": "message_start", "message": {"usage": usage}}]
+            events += [{"type": "content_block_delta", "delta": {"text": w + " "}} for w in words]
+            events.append({"type": "message_stop"})
+            return await self._sse(request, events)
+        return web.json_response({"content": [{"type": "text", "text": " ".join(words)}], "usage": usage})
+
+    async def _ollama(self, request: web.Request) -> web.StreamResponse:
+        data = await request.json()
+        self.ollama_requests.append(data)
+        model = data.get("model", "")
+        load_duration = 0
+        if model not in self._loaded_models:
+            self._loaded_models.add(model)
+            await asyncio.sleep(self.model_load_ms / 1000)
+            load_duration = int(self.model_load_ms * 1e6)
+        if not await self._respond("ollama"):
+            return web.json_response({"error": "stub failure"}, status=500)
+        words = self._words()
+        num_predict = data.get("options", {}).get("num_predict")
+        if num_predict is not None and num_predict >= 0:
+            words = words[:num_predict]
+        final = {
+            "model": model,
+            "done": True,
+            # Like Ollama: the context continues the previous one with this prompt and reply
+            "context": list((self.ollama_prompt(data) + " ".join(words)).encode("utf-8")),
+            "load_duration": load_duration,
+            "prompt_eval_count": self._prompt_tokens(data.get("prompt", "")),
+            "eval_count": len(words),
+        }
+        if data.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            for w in words:
+                await response.write(json.dumps({"response": w + " ", "done": False}).encode("utf-8") + b"\n")
+            await response.write(json.dumps({**final, "response": ""}).encode("utf-8") + b"\n")
+            await response.write_eof()
+            return response
+        return web.json_response({**final, "response": " ".join(words)})
+
+    @staticmethod
+    def ollama_prompt(data: dict) -> str:
+        """Full text a /api/generate body asks the model to continue (its context + prompt)."""
+        return bytes(data.get("context") or []).decode("utf-8") + data.get("prompt", "")
+
+    async def _ollama_ps(self, request: web.Request) -> web.Response:
+        # Ollama reports resident models tagged, e.g. "mixtral:latest" for "mixtral"
+        names = sorted(m if ":" in m.rsplit("/", 1)[-1] else f"{m}:latest" for m in self._loaded_models)
+        return web.json_response({"models": [{"name": name, "model": name} for name in names]})
+
+
+def parse_latency_specs(values) -> Union[str, Dict[str, str]]:
+    """["lognormal:80:0.4"] or ["grok=fixed:200", "ollama=uniform:20:40"] -> spec or {provider: spec}."""
+    specs: Dict[str, str] = {}
+    default = DEFAULT_LATENCY
+    for value in values or []:
+        provider, sep, spec = value.partition("=")
+        if sep:
+            if provider not in PROVIDERS:
+                raise ValueError(f"Unknown provider in latency spec: {provider}")
+            LatencyDistribution(spec)
+            specs[provider] = spec
+        else:
+            LatencyDistribution(value)
+            default = value
+    if not specs:
+        return default
+    return {p: specs.get(p, default) for p in PROVIDERS}
+
+
+async def _serve(args) -> None:
+    stub = StubProvider(parse_latency_specs(args.latency), args.error_rate, model_load_ms=args.model_load_ms)
+    base_url = await stub.start(args.host, args.port)
+    print(f"Stub LLM provider on {base_url}")
+    for key, value in stub.env().items():
+        print(f"  export {key}={value}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await stub.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve fake Grok/Anthropic/Ollama endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument(
+        "--latency", action="append",
+        help="Latency spec in ms, optionally per provider: 'lognormal:80:0.4' or 'ollama=uniform:20:40'",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--model-load-ms", type=float, default=0.0, help="Extra latency on a model's first Ollama request")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
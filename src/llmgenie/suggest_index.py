@@ -0,0 +1,407 @@
+"""Persistent ranked search over copilot context layers for `copilot suggest`.
+
+Every layer source is reduced to short entries (module paths, path::function,
+"TSK-12: title", markdown headings) that are indexed by term. A query token
+matches exactly, as a prefix of a term (bisect over the sorted term list), or
+fuzzily through character trigrams. The index lives in
+.llmstruct_index/suggest.json and `copilot refresh` only re-extracts layers
+whose source files changed.
+
+Run `python -m llmstruct.suggest_index` for a benchmark over synthetic layers.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from llmstruct.context_layers import layer_signature, layer_sources, load_layer_definitions, read_source
+from llmstruct.incremental import INDEX_DIR
+from llmstruct.retrieval import tokenize
+from llmstruct.struct_io import read_struct, write_struct
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+INDEX_FILE = "suggest.json"
+INDEX_VERSION = 1
+LABEL_KEYS = ("name", "title", "path")
+DETAIL_KEYS = ("description", "summary", "docstring", "module_doc", "goal")
+MAX_DETAIL_CHARS = 120
+MAX_PREFIX_TERMS = 200
+MIN_TRIGRAM_SIMILARITY = 0.4
+# Longer terms are whole identifiers; their snake/camel parts are indexed on their own
+MAX_FUZZY_TERM_CHARS = 16
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.5
+
+_HEADING_RE = re.compile(r"^#{1,4}\s+(.+)$", re.MULTILINE)
+
+# Loaded indexes per root, reused by long-lived processes (the daemon)
+_index_cache: Dict[str, "SuggestionIndex"] = {}
+
+
+def _detail(obj: dict) -> str:
+    for key in DETAIL_KEYS:
+        value = obj.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip().splitlines()[0][:MAX_DETAIL_CHARS]
+    return ""
+
+
+def _label(obj: dict, owner: str) -> Optional[str]:
+    name = next((obj[k] for k in LABEL_KEYS if isinstance(obj.get(k), str) and obj[k]), None)
+    if name is None:
+        return str(obj["id"]) if isinstance(obj.get("id"), (str, int)) else None
+    if isinstance(obj.get("id"), (str, int)) and str(obj["id"]) != name:
+        name = f"{obj['id']}: {name}"
+    # Functions and classes inside a module read as path::name
+    if owner and "path" not in obj:
+        name = f"{owner}::{name}"
+    return name
+
+
+def extract_entries(data, source: str) -> List[List[str]]:
+    """[label, detail, source] entries for one parsed layer source."""
+    entries = []
+    if isinstance(data, str):
+        for match in _HEADING_RE.finditer(data):
+            entries.append([match.group(1).strip(), "", source])
+        return entries
+    seen = set()
+    stack = [(data, "")]
+    while stack:
+        obj, owner = stack.pop()
+        if isinstance(obj, list):
+            stack.extend((item, owner) for item in reversed(obj))
+            continue
+        if not isinstance(obj, dict):
+            continue
+        label = _label(obj, owner)
+        if label and label not in seen:
+            seen.add(label)
+            entries.append([label, _detail(obj), source])
+        child_owner = obj["path"] if isinstance(obj.get("path"), str) else owner
+        stack.extend((value, child_owner) for value in reversed(list(obj.values())) if isinstance(value, (dict, list)))
+    return entries
+
+
+def _trigrams(term: str) -> set:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestionIndex:
+    """Term and trigram index over layer entries, refreshed per layer."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = Path(root_dir).absolute()
+        self.path = self.root_dir / INDEX_DIR / INDEX_FILE
+        self.layers: Dict[str, dict] = {}  # name -> {"signature", "priority", "entries"}
+        self._entries: List[Tuple[List[str], str, int]] = []  # (entry, layer, priority)
+        self._postings: Dict[str, List[int]] = {}
+        self._terms: List[str] = []
+        self._trigram_terms: Optional[Dict[str, List[int]]] = None
+        self._arrays: Dict[str, "np.ndarray"] = {}
+        self._rank = None
+        self.saved_mtime_ns: Optional[int] = None
+
+    def load(self) -> bool:
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+            data = read_struct(self.path)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION:
+            return False
+        self.saved_mtime_ns = mtime_ns
+        self.layers = data["layers"]
+        self._flatten()
+        self._postings = {term: ids for term, ids in data["postings"]}
+        self._terms = [term for term, _ in data["postings"]]
+        self._arrays, self._rank = {}, None
+        return True
+
+    def save(self) -> None:
+        write_struct(
+            self.path,
+            {
+                "version": INDEX_VERSION,
+                "layers": self.layers,
+                "postings": [[term, self._postings[term]] for term in self._terms],
+            },
+            index=False,
+        )
+        self.saved_mtime_ns = self.path.stat().st_mtime_ns
+
+    def _flatten(self) -> None:
+        self._entries = [
+            (entry, name, layer.get("priority", 99))
+            for name, layer in self.layers.items()
+            for entry in layer["entries"]
+        ]
+
+    def _rebuild(self) -> None:
+        self._flatten()
+        postings: Dict[str, List[int]] = {}
+        for entry_id, (entry, _, _) in enumerate(self._entries):
+            for term in set(tokenize(entry[0])):
+                postings.setdefault(term, []).append(entry_id)
+        self._postings = postings
+        self._terms = sorted(postings)
+        self._trigram_terms = None
+        self._arrays, self._rank = {}, None
+
+    def refresh(self, layer_manager=None) -> List[str]:
+        """Re-extract layers whose sources changed. Returns the names of changed layers.
+
+        With a ContextLayerManager, layer contents come from it (and count
+        against its budget) instead of being read here.
+        """
+        if layer_manager is not None:
+            layer_manager.refresh_changed()
+        definitions = load_layer_definitions(str(self.root_dir))
+        changed = [name for name in self.layers if name not in definitions]
+        for name in changed:
+            del self.layers[name]
+        for name, definition in definitions.items():
+            signature = layer_signature(str(self.root_dir), definition)
+            current = self.layers.get(name)
+            if current is not None and current["signature"] == signature:
+                continue
+            entries = []
+            if layer_manager is not None:
+                for source, data in (layer_manager.get_layer(name) or {}).items():
+                    entries.extend(extract_entries(data, source))
+            else:
+                for path in layer_sources(str(self.root_dir), definition):
+                    data = read_source(path)
+                    if data is not None:
+                        entries.extend(extract_entries(data, path.relative_to(self.root_dir).as_posix()))
+            self.layers[name] = {
+                "signature": signature,
+                "priority": definition.get("priority", 99),
+                "entries": entries,
+            }
+            changed.append(name)
+        if changed:
+            self._rebuild()
+        return changed
+
+    def _fuzzy_terms(self, token: str) -> List[Tuple[int, float]]:
+        if self._trigram_terms is None:
+            trigram_terms: Dict[str, List[int]] = {}
+            for term_id, term in enumerate(self._terms):
+                if len(term) > MAX_FUZZY_TERM_CHARS:
+                    continue
+                for trigram in _trigrams(term):
+                    trigram_terms.setdefault(trigram, []).append(term_id)
+            self._trigram_terms = trigram_terms
+        query_trigrams = _trigrams(token)
+        shared: Dict[int, int] = {}
+        for trigram in query_trigrams:
+            for term_id in self._trigram_terms.get(trigram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        matches = []
+        for term_id, count in shared.items():
+            term_trigrams = max(len(self._terms[term_id]), 1)  # "$term$" has len(term) trigrams
+            similarity = count / (len(query_trigrams) + term_trigrams - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches.append((term_id, similarity))
+        return matches
+
+    def _token_matches(self, token: str) -> List[Tuple[str, float]]:
+        """(term, score) pairs for one query token: exact, prefixes, or fuzzy when neither."""
+        matches = []
+        if token in self._postings:
+            matches.append((token, EXACT_SCORE))
+        start = bisect.bisect_right(self._terms, token)
+        for term in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            matches.append((term, PREFIX_SCORE * len(token) / len(term)))
+        if not matches and len(token) >= 3:
+            for term_id, similarity in self._fuzzy_terms(token):
+                matches.append((self._terms[term_id], FUZZY_SCORE * similarity))
+        return matches
+
+    def _rank_key(self, entry_id: int) -> Tuple[int, int]:
+        _, _, priority = self._entries[entry_id]
+        return priority, len(self._entries[entry_id][0][0])
+
+    def _top_python(self, tokens: List[str], limit: int, allowed: Optional[set]) -> List[Tuple[int, float]]:
+        totals: Dict[int, float] = {}
+        for token in tokens:
+            # An entry counts its best-matching term once per query token
+            best: Dict[int, float] = {}
+            for term, score in self._token_matches(token):
+                for entry_id in self._postings[term]:
+                    if best.get(entry_id, 0.0) < score:
+                        best[entry_id] = score
+            for entry_id, score in best.items():
+                totals[entry_id] = totals.get(entry_id, 0.0) + score
+        if allowed is not None:
+            totals = {i: s for i, s in totals.items() if self._entries[i][1] in allowed}
+        return heapq.nsmallest(
+            limit, totals.items(), key=lambda item: (-item[1], *self._rank_key(item[0]), item[0])
+        )
+
+    def _ids(self, term: str) -> "np.ndarray":
+        ids = self._arrays.get(term)
+        if ids is None:
+            ids = self._arrays[term] = np.asarray(self._postings[term], dtype=np.int32)
+        return ids
+
+    def _top_numpy(self, tokens: List[str], limit: int, allowed: Optional[set]) -> List[Tuple[int, float]]:
+        if self._rank is None:
+            # Tie-break keys: layer priority first, then label length (both ascending)
+            self._rank = (
+                np.array([priority for _, _, priority in self._entries], dtype=np.int64),
+                np.array([len(entry[0]) for entry, _, _ in self._entries], dtype=np.int64),
+            )
+        totals = np.zeros(len(self._entries), dtype=np.float64)
+        for token in tokens:
+            best = np.zeros(len(self._entries), dtype=np.float64)
+            for term, score in self._token_matches(token):
+                ids = self._ids(term)
+                best[ids] = np.maximum(best[ids], score)
+            totals += best
+        if allowed is not None:
+            totals *= np.array([layer in allowed for _, layer, _ in self._entries])
+        candidates = np.flatnonzero(totals)
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            # Everything scoring at least the limit-th best score; ties are settled below
+            cutoff = np.partition(totals[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[totals[candidates] >= cutoff]
+        priority, length = self._rank
+        # Same order as _top_python: score descending, then priority, label length, entry id
+        order = np.lexsort((candidates, length[candidates], priority[candidates], -totals[candidates]))
+        return [(int(i), float(totals[i])) for i in candidates[order[:limit]]]
+
+    def search(self, query: str, limit: int = 10, layers: Optional[List[str]] = None) -> List[dict]:
+        """Ranked entries: summed token scores, then layer priority, then shorter labels."""
+        tokens = list(dict.fromkeys(t.lower() for t in tokenize(query)))
+        allowed = set(layers) if layers else None
+        if NUMPY_AVAILABLE and self._entries:
+            best = self._top_numpy(tokens, limit, allowed)
+        else:
+            best = self._top_python(tokens, limit, allowed)
+        results = []
+        for entry_id, score in best:
+            (label, detail, source), layer, _ = self._entries[entry_id]
+            results.append(
+                {"label": label, "detail": detail, "source": source, "layer": layer, "score": round(score, 3)}
+            )
+        return results
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_suggestion_index(root_dir: str, refresh: bool = False, layer_manager=None) -> SuggestionIndex:
+    """Loaded index for root_dir; built on first use, re-checked against sources when refresh=True.
+
+    layer_manager (a ContextLayerManager) supplies layer contents when indexing.
+    """
+    key = str(Path(root_dir).absolute())
+    index = _index_cache.get(key)
+    if index is not None and not refresh:
+        # Another process (copilot refresh) may have rewritten the index
+        try:
+            if index.path.stat().st_mtime_ns != index.saved_mtime_ns:
+                index = None
+        except OSError:
+            pass
+    if index is None:
+        index = SuggestionIndex(root_dir)
+        refresh = not index.load() or refresh
+        _index_cache[key] = index
+    if refresh:
+        changed = index.refresh(layer_manager)
+        if changed or not index.path.exists():
+            index.save()
+            logging.info(f"Suggestion index updated for layers: {', '.join(changed) or 'none'}")
+    return index
+
+
+def benchmark(entries_per_layer: int = 25000, queries: int = 300) -> dict:
+    """Build/refresh/load times and query latency over four synthetic layers."""
+    import json
+    import random
+    import statistics
+    import tempfile
+
+    rng = random.Random(42)
+    words = ["parse", "query", "cache", "daemon", "queue", "struct", "index", "context", "layer",
+             "render", "validate", "watch", "stream", "token", "budget", "session", "epic", "task"]
+    result = {"entries_per_layer": entries_per_layer}
+    with tempfile.TemporaryDirectory() as root:
+        layers = {}
+        for layer_no in range(4):
+            source = f"data/layer{layer_no}.json"
+            modules = [
+                {
+                    "path": f"src/{rng.choice(words)}_{i}/{rng.choice(words)}.py",
+                    "functions": [{"name": f"{rng.choice(words)}_{rng.choice(words)}_{i}_{j}"} for j in range(4)],
+                }
+                for i in range(entries_per_layer // 5)
+            ]
+            Path(root, source).parent.mkdir(parents=True, exist_ok=True)
+            Path(root, source).write_text(json.dumps({"modules": modules}), encoding="utf-8")
+            layers[f"layer{layer_no}"] = {"priority": layer_no + 1, "sources": [source]}
+        Path(root, "data", "copilot_init.json").write_text(json.dumps({"context_layers": layers}))
+
+        index = SuggestionIndex(root)
+        start = time.perf_counter()
+        index.refresh()
+        index.save()
+        result["build_seconds"] = time.perf_counter() - start
+        result["entries"] = len(index)
+
+        start = time.perf_counter()
+        index.refresh()
+        result["unchanged_refresh_seconds"] = time.perf_counter() - start
+
+        Path(root, "data/layer0.json").write_text(json.dumps({"modules": []}), encoding="utf-8")
+        start = time.perf_counter()
+        index.refresh()
+        result["one_layer_refresh_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        SuggestionIndex(root).load()
+        result["cold_load_seconds"] = time.perf_counter() - start
+
+        kinds = {
+            "exact": lambda: f"{rng.choice(words)} {rng.choice(words)}",
+            "prefix": lambda: rng.choice(words)[:3],
+            "typo": lambda: rng.choice(words).replace("e", "a", 1) + "x",
+        }
+        for kind, make_query in kinds.items():
+            timings = []
+            for _ in range(queries):
+                text = make_query()
+                start = time.perf_counter()
+                index.search(text)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            result[f"{kind}_ms"] = {
+                "p50": statistics.median(timings),
+                "p95": timings[int(len(timings) * 0.95) - 1],
+            }
+    return result
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,172 @@
+"""Filesystem watchers for `parse --watch`: inotify on Linux, polling elsewhere."""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from llmstruct.incremental import ALWAYS_EXCLUDED_DIRS, scan_fingerprints
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detects changes by comparing (mtime, size) fingerprints every `interval` seconds."""
+
+    def __init__(self, root_dir: str, options: dict, interval: float = 1.0):
+        self.root_dir = os.path.abspath(root_dir)
+        self.options = options
+        self.interval = interval
+        self._fingerprints = self._scan()
+
+    def _scan(self) -> Dict[str, List[int]]:
+        return scan_fingerprints(
+            self.root_dir,
+            include_patterns=self.options.get("include_patterns"),
+            exclude_patterns=self.options.get("exclude_patterns"),
+            exclude_dirs=self.options.get("exclude_dirs"),
+        )
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        """Return root-relative paths that changed, waiting at most `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {
+                path for path in set(current) | set(self._fingerprints)
+                if current.get(path) != self._fingerprints.get(path)
+            }
+            self._fingerprints = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0))
+            time.sleep(delay)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher. Raises OSError if inotify is unavailable."""
+
+    def __init__(self, root_dir: str, options: dict):
+        self.root_dir = os.path.abspath(root_dir)
+        self.skip_dirs = ALWAYS_EXCLUDED_DIRS | {
+            d.strip("/") for d in (options.get("exclude_dirs") or [])
+        }
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        self._add_tree(self.root_dir)
+
+    def _skipped(self, dir_path: str) -> bool:
+        rel_path = Path(dir_path).relative_to(self.root_dir).as_posix()
+        return Path(dir_path).name in self.skip_dirs or rel_path in self.skip_dirs
+
+    def _add_tree(self, top: str) -> None:
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if not self._skipped(os.path.join(dirpath, d))]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                logging.warning(f"Cannot watch {dirpath}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self._dirs[wd] = dirpath
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        """Return root-relative paths that changed, waiting at most `timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0").decode("utf-8", "replace")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("inotify queue overflow, rescanning everything")
+                changed.add("*")
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            dir_path = self._dirs.get(wd)
+            if dir_path is None or not name:
+                continue
+            full_path = os.path.join(dir_path, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self._skipped(full_path):
+                    self._add_tree(full_path)
+                    changed.update(
+                        Path(root, f).relative_to(self.root_dir).as_posix()
+                        for root, _, files in os.walk(full_path) for f in files
+                    )
+                continue
+            changed.add(Path(full_path).relative_to(self.root_dir).as_posix())
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(root_dir: str, options: dict, polling_interval: float = 1.0):
+    """Return an inotify watcher when possible, otherwise a polling watcher."""
+    try:
+        watcher = InotifyWatcher(root_dir, options)
+        logging.info("Watching with inotify")
+        return watcher
+    except OSError as e:
+        logging.info(f"inotify unavailable ({e}), falling back to polling every {polling_interval}s")
+        return PollingWatcher(root_dir, options, interval=polling_interval)
+
+
+def collect_changes(watcher, debounce: float = 0.3, timeout: Optional[float] = None) -> Set[str]:
+    """Wait for a change, then keep collecting until `debounce` seconds pass without events."""
+    changed = watcher.poll(timeout)
+    if not changed:
+        return changed
+    while True:
+        more = watcher.poll(debounce)
+        if not more:
+            return changed
+        changed |= more
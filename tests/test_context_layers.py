@@ -0,0 +1,75 @@
+import json
+
+from llmstruct.context_layers import ContextLayerManager
+from llmstruct.suggest_index import SuggestionIndex
+
+
+def make_root(tmp_path):
+    layers = {
+        "essential": {"priority": 1, "sources": ["struct.json"]},
+        "notes": {"priority": 2, "sources": ["notes.md"]},
+        "extra": {"priority": 3, "sources": ["extra.json"]},
+    }
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "copilot_init.json").write_text(json.dumps({"context_layers": layers}))
+    struct = {"modules": [{"path": "pkg/parser.py", "module_doc": "Parses things", "functions": []}]}
+    (tmp_path / "struct.json").write_text(json.dumps(struct))
+    (tmp_path / "notes.md").write_text("n" * 400)
+    (tmp_path / "extra.json").write_text(json.dumps({"items": ["x" * 400]}))
+    return tmp_path
+
+
+def test_budget_unloads_least_recently_used(tmp_path):
+    manager = ContextLayerManager(str(make_root(tmp_path)), max_bytes=900)
+    manager.get_layer("notes")
+    manager.get_layer("essential")
+    manager.get_layer("notes")
+    manager.get_layer("extra")
+    assert manager.loaded_layers == ["notes", "extra"]
+    status = manager.get_context_status()["layers"]
+    assert status["essential"]["evictions"] == 1
+    assert status["notes"]["hits"] == 1
+
+
+def test_refresh_changed_reloads_only_changed_layers(tmp_path):
+    root = make_root(tmp_path)
+    manager = ContextLayerManager(str(root), max_bytes=950)
+    for name in ("notes", "essential", "extra"):
+        manager.get_layer(name)
+    assert manager.refresh_changed() == []
+
+    (root / "notes.md").write_text("m" * 500)
+    assert manager.refresh_changed() == ["notes"]
+    assert manager.get_layer("notes")["notes.md"] == "m" * 500
+    # The grown layer pushes the least recently used one out of the budget
+    assert manager.loaded_layers == ["extra", "notes"]
+    assert manager.used_bytes == (root / "extra.json").stat().st_size + 500 <= 950
+    status = manager.get_context_status()["layers"]
+    assert [status[name]["loads"] for name in ("essential", "notes", "extra")] == [1, 2, 1]
+    assert status["essential"]["evictions"] == 1
+    assert manager.refresh_changed() == []
+
+
+def test_get_source_reads_through_the_listing_layer(tmp_path):
+    manager = ContextLayerManager(str(make_root(tmp_path)))
+    assert manager.get_source("struct.json")["modules"][0]["path"] == "pkg/parser.py"
+    assert manager.loaded_layers == ["essential"]
+    assert manager.get_source("missing.json") is None
+
+
+def test_export_context(tmp_path):
+    manager = ContextLayerManager(str(make_root(tmp_path)))
+    exported = json.loads(manager.export_context(["notes", "essential"]))
+    assert list(exported) == ["notes", "essential"]
+    assert exported["notes"] == {"notes.md": "n" * 400}
+    assert list(json.loads(manager.export_context())) == ["essential", "notes", "extra"]
+
+
+def test_suggestion_index_reads_layers_from_manager(tmp_path):
+    root = make_root(tmp_path)
+    manager = ContextLayerManager(str(root))
+    index = SuggestionIndex(str(root))
+    assert set(index.refresh(manager)) == {"essential", "notes", "extra"}
+    assert manager.get_context_status()["layers"]["essential"]["misses"] == 1
+    assert index.search("parser")[0]["label"] == "pkg/parser.py"
+    assert index.refresh(manager) == []
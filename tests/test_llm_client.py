@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from llmstruct import LLMClient
+from llmstruct.stub_provider import StubProvider
+
+
+def write_context(path, name):
+    path.write_text(json.dumps({"metadata": {"project_name": name}, "modules": []}))
+    return str(path)
+
+
+def test_context_cache_keeps_most_recently_used_files(tmp_path):
+    client = LLMClient()
+    client.configure_context({"cache_entries": 2})
+    a, b, c = (write_context(tmp_path / f"{name}.json", name) for name in "abc")
+
+    assert '"a"' in client._context_text(a)
+    client._context_text(b)
+    client._context_text(a)
+    client._context_text(c)
+    assert list(client._context_cache) == [str((tmp_path / name).resolve()) for name in ("a.json", "c.json")]
+
+    client.configure_context({"cache_entries": 1})
+    assert list(client._context_cache) == [str((tmp_path / "c.json").resolve())]
+
+
+def test_ollama_prefix_reuse_sends_the_uncached_prompt(tmp_path):
+    context_path = tmp_path / "struct.json"
+    modules = [{"path": f"pkg/module_{i}.py", "module_doc": "Parses things. " * 10} for i in range(20)]
+    context_path.write_text(json.dumps({"metadata": {}, "modules": modules}))
+
+    async def generated_prompts(prefix_cache):
+        stub = StubProvider(latency="fixed:0")
+        await stub.start()
+        client = LLMClient()
+        stub.configure_client(client)
+        client.prefix_cache_enabled = prefix_cache
+        try:
+            for question in ("What parses things?", "Which module is first?"):
+                await client.query(question, str(context_path), mode="ollama", model="m", coalesce=False)
+        finally:
+            await client.close()
+            await stub.stop()
+        evaluations = [r for r in stub.ollama_requests if "num_predict" in r.get("options", {})]
+        questions = [r for r in stub.ollama_requests if r not in evaluations]
+        # One prefix evaluation, generating nothing, then both questions resume from its context
+        assert [r["options"]["num_predict"] for r in evaluations] == ([0] if prefix_cache else [])
+        assert all(("context" in r) == prefix_cache for r in questions)
+        return [stub.ollama_prompt(r) for r in questions]
+
+    cached = asyncio.run(generated_prompts(True))
+    uncached = asyncio.run(generated_prompts(False))
+    assert len(cached) == len(uncached) == 2
+    assert cached == uncached
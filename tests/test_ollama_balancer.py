@@ -0,0 +1,149 @@
+import asyncio
+import random
+
+from llmstruct import LLMClient
+from llmstruct.ollama_pool import model_tag
+from llmstruct.stub_provider import StubProvider
+
+
+def run_with_stubs(test, count, **stub_options):
+    async def main():
+        stubs = [StubProvider(**{"latency": "fixed:0", **stub_options}) for _ in range(count)]
+        for stub in stubs:
+            await stub.start()
+        client = LLMClient()
+        stubs[0].configure_client(client)
+        client.prefix_cache_enabled = False
+        balancer = client.ollama_pool
+        balancer.set_hosts([stub.base_url for stub in stubs])
+        balancer._rng = random.Random(0)
+        try:
+            return await test(client, balancer, stubs)
+        finally:
+            await client.close()
+            for stub in stubs:
+                await stub.stop()
+
+    return asyncio.run(main())
+
+
+def ollama_requests(stubs):
+    return [stub.requests["ollama"] for stub in stubs]
+
+
+async def query(client, model, prompt="hello"):
+    return await client.query(prompt, mode="ollama", model=model, coalesce=False)
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    async def test(client, balancer, stubs):
+        balancer.loaded_refresh_seconds = float("inf")
+        results = await asyncio.gather(*(query(client, "m", f"prompt {i}") for i in range(9)))
+        assert all(results)
+        assert ollama_requests(stubs) == [3, 3, 3]
+        assert all(host["outstanding"] == 0 for host in balancer.host_stats().values())
+
+    run_with_stubs(test, 3, latency="fixed:50")
+
+
+def test_power_of_two_uses_every_host():
+    async def test(client, balancer, stubs):
+        balancer.configure({"balancing": "power-of-two", "affinity_slack": 0})
+        balancer.loaded_refresh_seconds = float("inf")
+        await asyncio.gather(*(query(client, "m", f"prompt {i}") for i in range(40)))
+        counts = ollama_requests(stubs)
+        assert sum(counts) == 40
+        assert min(counts) >= 5
+
+    run_with_stubs(test, 4, latency="fixed:50")
+
+
+def test_model_affinity_prefers_host_with_model_loaded():
+    async def test(client, balancer, stubs):
+        for _ in range(5):
+            await query(client, "m")
+        assert sorted(ollama_requests(stubs)) == [0, 5]
+
+        warm, cold = sorted(balancer.hosts, key=lambda h: model_tag("m") in h.loaded, reverse=True)
+        assert model_tag("m") in warm.loaded and model_tag("m") not in cold.loaded
+        warm.outstanding = balancer.affinity_slack
+        assert balancer.pick("m") is warm
+        warm.outstanding = balancer.affinity_slack + 1
+        assert balancer.pick("m") is cold
+        warm.outstanding = 0
+
+    run_with_stubs(test, 2)
+
+
+def test_model_affinity_survives_api_ps_refresh_with_tagged_names():
+    async def test(client, balancer, stubs):
+        balancer.loaded_refresh_seconds = float("inf")
+        await query(client, "m")
+        warm = next(h for h in balancer.hosts if h.loaded)
+
+        # /api/ps answers "m:latest"; both spellings must still find the warm host
+        assert await balancer.loaded_models() == ["m:latest"]
+        assert warm.loaded == {"m:latest"}
+        for model in ("m", "m:latest", "m", "m:latest"):
+            await query(client, model)
+        assert sorted(ollama_requests(stubs)) == [0, 5]
+        assert balancer.pick("m") is warm
+
+    run_with_stubs(test, 2)
+
+
+def test_host_is_ejected_after_max_failures():
+    async def test(client, balancer, stubs):
+        good, bad = stubs
+        bad.error_rate = 1.0
+        balancer.configure({"max_failures": 2, "eject_seconds": 60})
+        for i in range(50):
+            if bad.requests["ollama"] >= 2:
+                break
+            await query(client, f"model-{i}")
+        assert bad.requests["ollama"] == 2
+        stats = balancer.host_stats()[bad.base_url]
+        assert not stats["healthy"]
+        assert stats["ejections"] == 1
+        assert stats["failures"] == 2
+
+        for i in range(10):
+            assert await query(client, f"after-{i}")
+        assert bad.requests["ollama"] == 2
+
+    run_with_stubs(test, 2)
+
+
+def test_ejected_host_recovers_when_api_ps_answers():
+    async def test(client, balancer, stubs):
+        good, bad = stubs
+        balancer.configure({"max_failures": 1, "eject_seconds": 0.05})
+        port = int(bad.base_url.rsplit(":", 1)[1])
+        await bad.stop()
+        host = next(h for h in balancer.hosts if h.url == bad.base_url)
+        for i in range(50):
+            if not host.healthy:
+                break
+            await query(client, f"model-{i}")
+        assert not host.healthy
+
+        # The probe fails while the host is down, so it stays ejected
+        await asyncio.sleep(0.06)
+        balancer.pick("m")
+        await asyncio.sleep(0.05)
+        assert not host.healthy
+
+        restarted = StubProvider(latency="fixed:0")
+        stubs[1] = restarted
+        await restarted.start(port=port)
+        await asyncio.sleep(0.06)
+        balancer.pick("m")
+        for _ in range(20):
+            if host.healthy:
+                break
+            await asyncio.sleep(0.01)
+        assert host.healthy
+        assert host.consecutive_failures == 0
+        assert host.ejections == 1
+
+    run_with_stubs(test, 2)
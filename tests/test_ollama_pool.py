@@ -0,0 +1,108 @@
+import asyncio
+
+import aiohttp
+
+from llmstruct import LLMClient
+from llmstruct.ollama_pool import NS_PER_SECOND, OllamaModelPool, group_by_model
+from llmstruct.stub_provider import StubProvider
+
+
+def run_with_stub(test, **stub_options):
+    async def main():
+        stub = StubProvider(latency="fixed:0", **stub_options)
+        await stub.start()
+        session = aiohttp.ClientSession()
+
+        async def get_session():
+            return session
+
+        try:
+            return await test(stub, get_session)
+        finally:
+            await session.close()
+            await stub.stop()
+
+    return asyncio.run(main())
+
+
+def test_preload_loads_each_model_once_with_keep_alive():
+    async def test(stub, get_session):
+        pool = OllamaModelPool(stub.base_url, get_session, keep_alive="5m", preload_models=["a", "b"])
+        timings = await pool.preload()
+        assert set(timings) == {"a", "b"}
+        assert all(seconds >= 0.1 for seconds in timings.values())
+        assert pool.preloaded
+        assert [r["model"] for r in stub.ollama_requests] == ["a", "b"]
+        assert all(r["keep_alive"] == "5m" and "prompt" not in r for r in stub.ollama_requests)
+        assert await pool.loaded_models() == ["a:latest", "b:latest"]
+        stats = pool.stats()
+        assert stats["a"]["requests"] == 0
+        assert stats["a"]["cold_loads"] == 1
+        assert stats["a"]["last_load_seconds"] >= 0.1
+
+    run_with_stub(test, model_load_ms=100)
+
+
+def test_preload_failure_is_reported_as_none():
+    async def test(stub, get_session):
+        pool = OllamaModelPool(stub.base_url, get_session)
+        assert await pool.preload(["a"]) == {"a": None}
+        assert pool.stats() == {}
+
+    run_with_stub(test, error_rate=1.0)
+
+
+def test_queries_send_keep_alive_and_options():
+    async def test(stub, get_session):
+        client = LLMClient()
+        stub.configure_client(client)
+        client.prefix_cache_enabled = False
+        client.ollama_pool.configure({"keep_alive": "1h", "options": {"num_ctx": 4096}})
+        try:
+            assert await client.query("hello", mode="ollama", model="m", coalesce=False)
+        finally:
+            await client.close()
+        (body,) = stub.ollama_requests
+        assert body["keep_alive"] == "1h"
+        assert body["options"] == {"num_ctx": 4096}
+        assert client.ollama_pool.last_model == "m"
+
+    run_with_stub(test)
+
+
+def test_load_duration_counts_only_cold_loads():
+    async def test(stub, get_session):
+        pool = OllamaModelPool(stub.base_url, get_session)
+        client = LLMClient()
+        stub.configure_client(client)
+        client.prefix_cache_enabled = False
+        try:
+            for _ in range(3):
+                await client.query("hello", mode="ollama", model="m", coalesce=False)
+        finally:
+            await client.close()
+        stats = client.ollama_pool.stats()["m"]
+        assert stats["requests"] == 3
+        assert stats["cold_loads"] == 1
+        assert 0.15 <= stats["load_seconds"] < 1
+
+        pool.record("x", {"load_duration": NS_PER_SECOND // 20})
+        pool.record("x", {"load_duration": 2 * NS_PER_SECOND})
+        assert pool.stats()["x"] == {
+            "requests": 2, "cold_loads": 1, "load_seconds": 2.0, "last_load_seconds": 2.0,
+        }
+
+    run_with_stub(test, model_load_ms=200)
+
+
+def test_group_by_model_keeps_first_appearance_order():
+    items = [("a", 1), ("b", 2), ("a", 3), ("c", 4), ("b", 5)]
+    grouped = group_by_model(items, lambda item: item[0])
+    assert grouped == [("a", 1), ("a", 3), ("b", 2), ("b", 5), ("c", 4)]
+
+
+def test_group_by_model_puts_warm_model_first():
+    items = [("a", 1), ("b", 2), ("a", 3), ("c", 4)]
+    assert group_by_model(items, lambda item: item[0], warm_model="c") == [("c", 4), ("a", 1), ("a", 3), ("b", 2)]
+    assert group_by_model(items, lambda item: item[0], warm_model="z")[0] == ("a", 1)
+    assert group_by_model([], lambda item: item) == []
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from llmstruct.prompt_templates import TemplateCollection, TemplateError
+
+
+@pytest.fixture
+def collection(tmp_path):
+    path = tmp_path / "prompts_collection.json"
+    path.write_text(json.dumps({
+        "prompts": [
+            {"id": "review", "template": "Review {file} for <goal>. Output: {\"ok\": true}"},
+            {"id": "plain", "template": "No placeholders"},
+        ],
+    }))
+    return TemplateCollection(str(path))
+
+
+def test_render_substitutes_both_placeholder_styles(collection):
+    text = collection.render("review", {"file": "a.py", "goal": "bugs"})
+    assert text == 'Review a.py for bugs. Output: {"ok": true}'
+    assert collection.render("plain") == "No placeholders"
+
+
+def test_render_is_memoized_by_rendered_text(collection):
+    assert collection.render("review", {"file": 1, "goal": "x"}) == collection.render("review", {"file": 1, "goal": "x"})
+    assert collection.memo_hits == 1
+    assert "True" in collection.render("review", {"file": True, "goal": "x"})
+
+
+@pytest.mark.parametrize("template_id, variables, message", [
+    ("missing", {}, "Unknown prompt template"),
+    (["review"], {}, "id must be a string"),
+    ("review", {"file": "a.py"}, "missing goal"),
+    ("review", {"file": "a.py", "goal": "x", "extra": 1}, "unknown extra"),
+    ("review", ["file", "goal"], "vars must be an object"),
+    ("review", "file=a.py", "vars must be an object"),
+    ("review", {"file": ["a.py"], "goal": "x"}, "value of file must be a string or number"),
+    ("review", {"file": {"name": "a.py"}, "goal": "x"}, "value of file must be a string or number"),
+])
+def test_bad_requests_raise_template_error(collection, template_id, variables, message):
+    with pytest.raises(TemplateError, match=message):
+        collection.render(template_id, variables)
+
+
+def test_render_many_reports_errors_per_item(collection):
+    results = collection.render_many([
+        ("review", {"file": "a.py", "goal": "x"}),
+        ("review", {"file": ["a.py"], "goal": "x"}),
+        ("review", [1, 2]),
+        ("plain", None),
+    ])
+    assert results[0].startswith("Review a.py")
+    assert isinstance(results[1], TemplateError)
+    assert isinstance(results[2], TemplateError)
+    assert results[3] == "No placeholders"
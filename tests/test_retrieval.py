@@ -0,0 +1,39 @@
+from llmstruct.retrieval import BM25Index
+from llmstruct.struct_io import write_struct
+
+
+def make_module(doc):
+    return {
+        "path": "pkg/handlers.py",
+        "module_doc": doc,
+        "functions": [
+            {"name": "handle", "parameters": ["event"], "docstring": "first handle"},
+            {"name": "handle", "parameters": ["event", "retry"], "docstring": "second handle"},
+        ],
+        "classes": [{"name": "handle", "docstring": "class named like the functions", "methods": []}],
+    }
+
+
+def assert_consistent(index):
+    chunks = [chunk for entry in index.sources.values() for chunk in entry["chunks"]]
+    assert len(index) == len(chunks) == len({chunk["id"] for chunk in chunks})
+    assert index._total_length == sum(chunk["length"] for chunk in chunks)
+
+
+def test_reindexing_module_with_duplicate_names_keeps_totals(tmp_path):
+    struct_path = tmp_path / "struct.json"
+    write_struct(struct_path, {"metadata": {}, "modules": [make_module("v1")]})
+    index = BM25Index(str(tmp_path))
+    assert index.refresh(str(struct_path), []) == 1
+    assert_consistent(index)
+    assert len(index) == 4
+    assert {chunk["text"].split("\n")[-1] for _, chunk in index.search("handle")} >= {"first handle", "second handle"}
+
+    write_struct(struct_path, {"metadata": {}, "modules": [make_module("v2 with more words")]})
+    assert index.refresh(str(struct_path), []) == 1
+    assert_consistent(index)
+
+    write_struct(struct_path, {"metadata": {}, "modules": []})
+    index.refresh(str(struct_path), [])
+    assert len(index) == 0
+    assert index._total_length == 0
@@ -0,0 +1,19 @@
+import pytest
+
+from llmstruct.modules.cli.utils import PATHSPEC_AVAILABLE
+from llmstruct.modules.commands.scan import ScanService
+
+
+@pytest.mark.skipif(not PATHSPEC_AVAILABLE, reason="pathspec not installed")
+def test_walk_follows_gitignore_negation_and_anchoring(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\n/dist\nout/\n")
+    for rel_path in ("a.log", "keep.log", "dist/x.py", "src/dist/y.py", "src/out/z.py", "src/out.py"):
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+    service = ScanService(str(tmp_path))
+    try:
+        paths = {rel_path for rel_path, _ in service.walk("")}
+    finally:
+        service.close()
+    assert paths == {".gitignore", "keep.log", "src", "src/dist", "src/dist/y.py", "src/out.py"}
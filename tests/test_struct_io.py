@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from llmstruct.struct_io import ORJSON_AVAILABLE, StructReader, index_path, write_struct
+
+BACKENDS = [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(not ORJSON_AVAILABLE, reason="orjson not installed")),
+]
+
+
+def make_struct():
+    return {
+        "metadata": {"project_name": "демо", "goals": ["Разбор кода", "naïve café"], "stats": {}},
+        "modules": [
+            {
+                "path": "src/модуль.py",
+                "module_doc": "Документация модуля — with “quotes” and \\ escapes\n",
+                "functions": [
+                    {"name": "обработать", "parameters": ["данные"], "line_range": [1, 10], "ratio": 0.5},
+                    {"name": "empty", "parameters": [], "decorators": {}},
+                ],
+                "callgraph": {"обработать": ["empty"]},
+                "dependencies": [],
+            },
+            {"path": "src/日本語.py", "functions": [], "classes": [{"name": "Ω", "methods": []}]},
+            {"path": "big_numbers.py", "sizes": {"1": 2 ** 70, "small": -3}, "flag": None, "ok": True},
+        ],
+        "toc": [],
+        "empty": {},
+    }
+
+
+def expected_bytes(data, pretty):
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("pretty", [False, True])
+def test_output_matches_json_dumps(tmp_path, backend, pretty):
+    data = make_struct()
+    path = tmp_path / "struct.json"
+    stats = write_struct(path, data, pretty=pretty, backend=backend)
+    assert path.read_bytes() == expected_bytes(data, pretty)
+    assert stats["backend"] == backend
+    assert stats["modules"] == len(data["modules"])
+    assert stats["bytes"] == path.stat().st_size
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("pretty", [False, True])
+def test_offset_index_points_at_each_module(tmp_path, backend, pretty):
+    data = make_struct()
+    path = tmp_path / "struct.json"
+    write_struct(path, data, pretty=pretty, backend=backend)
+    assert index_path(path).exists()
+    reader = StructReader(path)
+    assert reader.indexed
+    assert list(reader.iter_modules()) == data["modules"]
+    assert reader.get_module("src/日本語.py") == data["modules"][1]
+    assert reader.get("metadata") == data["metadata"]
+    assert reader.top_level_keys() == list(data)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("data", [{}, {"modules": []}, [1, "два"]])
+def test_degenerate_documents(tmp_path, backend, data):
+    path = tmp_path / "struct.json"
+    for pretty in (False, True):
+        write_struct(path, data, pretty=pretty, backend=backend)
+        assert path.read_bytes() == expected_bytes(data, pretty)
+
+
+def test_backends_agree(tmp_path):
+    if not ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    data = make_struct()
+    for pretty in (False, True):
+        write_struct(tmp_path / "a.json", data, pretty=pretty, backend="json")
+        write_struct(tmp_path / "b.json", data, pretty=pretty, backend="orjson")
+        assert (tmp_path / "a.json").read_bytes() == (tmp_path / "b.json").read_bytes()
+
+
+def strip_sources(data):
+    stripped = json.loads(json.dumps(data))
+    for module in stripped["modules"]:
+        for function in module.get("functions", []):
+            function.pop("source", None)
+    return stripped
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+@pytest.mark.parametrize("pretty", [False, True])
+def test_dump_drops_fields_the_same_with_and_without_index(tmp_path, indexed, pretty):
+    data = make_struct()
+    # orjson reads integers wider than 64 bits back as floats
+    data["modules"].pop()
+    data["modules"][0]["functions"][0]["source"] = "def обработать(данные):\n    return данные\n"
+    path = tmp_path / "struct.json"
+    write_struct(path, data, index=indexed)
+    reader = StructReader(path)
+    assert reader.indexed == indexed
+    text = reader.dump(drop_function_fields=("source",), pretty=pretty)
+    assert text.encode("utf-8") == expected_bytes(strip_sources(data), pretty)
+    assert reader.dump(pretty=pretty).encode("utf-8") == expected_bytes(data, pretty)
+
+
+@pytest.mark.parametrize("data", [{}, {"modules": []}, {"modules": {"a": 1}, "toc": []}, [1, "два"]])
+def test_dump_degenerate_documents(tmp_path, data):
+    path = tmp_path / "struct.json"
+    for indexed in (False, True):
+        write_struct(path, data, index=indexed)
+        assert StructReader(path).dump(("source",)).encode("utf-8") == expected_bytes(data, True)
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from llmstruct import suggest_index
+from llmstruct.suggest_index import SuggestionIndex
+
+
+def make_index(tmp_path, layers):
+    index = SuggestionIndex(str(tmp_path))
+    index.layers = {
+        name: {"signature": [], "priority": priority, "entries": [[label, "", f"{name}.json"] for label in labels]}
+        for name, (priority, labels) in layers.items()
+    }
+    index._rebuild()
+    return index
+
+
+@pytest.mark.skipif(not suggest_index.NUMPY_AVAILABLE, reason="numpy not installed")
+def test_close_scores_beat_layer_priority_on_both_paths(tmp_path):
+    # Prefix scores for "parse" differ only slightly (5/30 vs 5/31 of PREFIX_SCORE)
+    better, worse = "parse" + "a" * 25, "parse" + "b" * 26
+    index = make_index(tmp_path, {"essential": (1, [worse]), "analytical": (4, [better])})
+    python = index._top_python(["parse"], 10, None)
+    numpy = index._top_numpy(["parse"], 10, None)
+    assert python == numpy
+    assert [index._entries[i][0][0] for i, _ in numpy] == [better, worse]
+
+
+@pytest.mark.skipif(not suggest_index.NUMPY_AVAILABLE, reason="numpy not installed")
+def test_numpy_and_python_paths_agree(tmp_path):
+    rng = random.Random(7)
+    words = ["parse", "parser", "parsers", "struct", "structure", "index", "indexer", "query", "queue"]
+    layers = {
+        name: (priority, [" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(60)])
+        for name, priority in (("essential", 1), ("structural", 2), ("analytical", 4))
+    }
+    index = make_index(tmp_path, layers)
+    for query in ("pars", "parse struct", "index que", "strct", "q", "parser indexer queue"):
+        tokens = query.split()
+        for limit in (1, 5, 50):
+            assert index._top_numpy(tokens, limit, None) == index._top_python(tokens, limit, None)
+        allowed = {"structural", "analytical"}
+        assert index._top_numpy(tokens, 5, allowed) == index._top_python(tokens, 5, allowed)
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from llmstruct.modules.commands import validate
+from llmstruct.modules.commands.validate import IJSON_AVAILABLE, JSONSCHEMA_AVAILABLE, validate_document
+
+pytestmark = pytest.mark.skipif(
+    not (JSONSCHEMA_AVAILABLE and IJSON_AVAILABLE), reason="jsonschema and ijson are required"
+)
+
+ITEMS = {"type": "object", "properties": {"id": {"type": "integer"}}, "required": ["id"]}
+
+CASES = [
+    # (schema, document, streamed)
+    ({"type": "array", "items": ITEMS, "minItems": 1}, [{"id": 1}, {"id": 2}], True),
+    ({"type": "array", "items": ITEMS, "maxItems": 1}, [{"id": 1}, {"id": "2"}], True),
+    ({"type": "object", "properties": {"a": ITEMS}, "required": ["a", "b"], "additionalProperties": False},
+     {"a": {"id": 1}, "c": 2}, True),
+    ({"type": "array", "items": {"$ref": "#/$defs/item"}, "$defs": {"item": ITEMS}}, [{"id": 1}, {}], True),
+    ({"type": "array", "items": {"type": "integer"}}, {"not": "an array"}, False),
+    ({"type": "object", "properties": {}}, [1, 2], False),
+    ({"type": "array", "items": {"type": "integer"}, "uniqueItems": True}, [1, 1], False),
+    ({"type": "array", "items": {"type": "integer"}, "contains": {"const": 5}}, [1, 2], False),
+    ({"type": "array", "items": {"type": "integer"}, "prefixItems": [{"const": 0}]}, [1, 2], False),
+    ({"type": "object", "properties": {}, "minProperties": 2}, {"a": 1}, False),
+    ({"type": "object", "properties": {}, "patternProperties": {"^x": {"type": "string"}}}, {"x1": 1}, False),
+    ({"type": "object", "properties": {}, "allOf": [{"required": ["a"]}]}, {"b": 1}, False),
+    ({"type": "object", "properties": {"a": {}}, "if": {"required": ["a"]}, "then": {"required": ["b"]}},
+     {"a": 1}, False),
+    ({"type": "array", "items": {"$ref": "#/properties/x"}, "properties": {"x": {"type": "integer"}}},
+     ["a"], False),
+]
+
+
+@pytest.mark.parametrize("schema, document, streamed", CASES)
+def test_streaming_agrees_with_full_validation(tmp_path, monkeypatch, schema, document, streamed):
+    json_path, schema_path = tmp_path / "doc.json", tmp_path / "schema.json"
+    json_path.write_text(json.dumps(document, indent=2))
+    schema_path.write_text(json.dumps(schema))
+    full = validate_document(str(json_path), str(schema_path))
+    monkeypatch.setattr(validate, "STREAMING_THRESHOLD", 0)
+    result = validate_document(str(json_path), str(schema_path))
+    assert result["streamed"] == streamed
+    assert result["valid"] == full["valid"]
+    assert bool(result["errors"]) == bool(full["errors"])
+
+
+def test_malformed_streamed_document_is_reported(tmp_path, monkeypatch):
+    json_path, schema_path = tmp_path / "doc.json", tmp_path / "schema.json"
+    json_path.write_text('[{"id": 1}, {"id": 2')
+    schema_path.write_text(json.dumps({"type": "array", "items": ITEMS}))
+    monkeypatch.setattr(validate, "STREAMING_THRESHOLD", 0)
+    result = validate_document(str(json_path), str(schema_path))
+    assert not result["valid"]
+    assert result["errors"]
+    assert result["seconds"] >= 0
+
+
+@pytest.mark.parametrize("threshold", [0, validate.STREAMING_THRESHOLD])
+def test_unresolvable_ref_is_reported(tmp_path, monkeypatch, threshold):
+    json_path, schema_path = tmp_path / "doc.json", tmp_path / "schema.json"
+    json_path.write_text(json.dumps([{"id": 1}]))
+    schema_path.write_text(json.dumps({"type": "array", "items": {"$ref": "#/$defs/missing"}}))
+    monkeypatch.setattr(validate, "STREAMING_THRESHOLD", threshold)
+    result = validate_document(str(json_path), str(schema_path))
+    assert not result["valid"]
+    assert "missing" in result["errors"][0]
+    assert result["seconds"] >= 0